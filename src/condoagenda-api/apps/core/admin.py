@@ -1,7 +1,25 @@
 from django.contrib import admin
 
-from .models import Apartamento, Configuracao, Reserva
+from .models import (
+    Apartamento,
+    Configuracao,
+    CotaApartamento,
+    DataBloqueada,
+    Disponibilidade,
+    EventoDisponibilidade,
+    OcupacaoSlot,
+    RegraAndar,
+    Reserva,
+    ReservaTemporaria,
+)
 
 admin.site.register(Apartamento)
 admin.site.register(Reserva)
 admin.site.register(Configuracao)
+admin.site.register(Disponibilidade)
+admin.site.register(CotaApartamento)
+admin.site.register(OcupacaoSlot)
+admin.site.register(RegraAndar)
+admin.site.register(DataBloqueada)
+admin.site.register(EventoDisponibilidade)
+admin.site.register(ReservaTemporaria)
@@ -0,0 +1,159 @@
+from datetime import date, time, timedelta
+from typing import List
+
+import numpy as np
+from django.db.models import Count, Q, QuerySet
+from django.utils import timezone
+
+from apps.core.models import Andar
+from apps.core.services import ApartamentoService, ConfiguracaoService
+
+
+class OcupacaoAnalyticsService:
+    MAX_DIAS = 3 * 366
+    DIAS_PADRAO = 365
+    QUANTIDADE_PICOS = 3
+
+    ANDARES = [andar for andar, _ in Andar.choices]
+
+    @staticmethod
+    def get_periodo_padrao() -> tuple:
+        fim = timezone.localdate()
+        return fim - timedelta(days=OcupacaoAnalyticsService.DIAS_PADRAO - 1), fim
+
+    @staticmethod
+    def get_horarios(horas_reservadas: set) -> List[time]:
+        regras = ConfiguracaoService.get_regras()
+        reservaveis = {
+            slot.inicio
+            for andar in OcupacaoAnalyticsService.ANDARES
+            for slot in regras.template(andar).reservaveis
+        }
+        # hours booked under an older configuration still get a column
+        return sorted(reservaveis | horas_reservadas)
+
+    @staticmethod
+    def rate(parte, total):
+        # 0/0 reads as "no usage" rather than nan
+        return np.divide(
+            parte, total, out=np.zeros(np.shape(parte), dtype=float), where=total > 0
+        )
+
+    @staticmethod
+    def summarize(queryset: QuerySet, inicio: date, fim: date) -> dict:
+        ocupacoes = list(
+            queryset.filter(data__range=(inicio, fim))
+            .order_by()
+            .values_list("data", "hora", "andar")
+            .annotate(
+                quantidade=Count("id"),
+                sem_lembrete=Count("id", filter=Q(enviar_lembrete=False)),
+            )
+        )
+        por_apartamento = list(
+            queryset.filter(data__range=(inicio, fim))
+            .order_by()
+            .values_list("apartamento_id")
+            .annotate(quantidade=Count("id"))
+        )
+
+        horarios = OcupacaoAnalyticsService.get_horarios(
+            {hora for _, hora, _, _, _ in ocupacoes}
+        )
+        andares = OcupacaoAnalyticsService.ANDARES
+        dias = (fim - inicio).days + 1
+
+        # day x slot x andar
+        matriz = np.zeros((dias, len(horarios), len(andares)), dtype=np.int64)
+        sem_lembrete = 0
+        if ocupacoes:
+            # one row per (data, hora, andar) from the aggregate, scattered
+            # into the matrix in a single vectorized assignment
+            coluna = {hora: indice for indice, hora in enumerate(horarios)}
+            datas, horas, andares_reserva, quantidades, sem = zip(*ocupacoes)
+            matriz[
+                [(data - inicio).days for data in datas],
+                [coluna[hora] for hora in horas],
+                [andares.index(andar) for andar in andares_reserva],
+            ] = quantidades
+            sem_lembrete = sum(sem)
+
+        regras = ConfiguracaoService.get_regras()
+        # slot x andar, each floor has its own template
+        reservaveis = np.array(
+            [
+                [regras.template(andar).is_reservavel(hora) for andar in andares]
+                for hora in horarios
+            ],
+            dtype=np.int64,
+        )
+        capacidade_slot = reservaveis * regras.capacidade
+
+        dias_semana = (np.arange(dias) + inicio.weekday()) % 7
+        dias_por_semana = np.bincount(dias_semana, minlength=7)
+
+        por_horario = matriz.sum(axis=0)  # slot x andar
+        por_semana = np.zeros((7, len(andares)), dtype=np.int64)
+        np.add.at(por_semana, dias_semana, matriz.sum(axis=1))
+
+        total = int(matriz.sum())
+        resumo_andares = []
+        for indice, andar in enumerate(andares):
+            capacidade = capacidade_slot[:, indice]
+            utilizacao_horario = OcupacaoAnalyticsService.rate(
+                por_horario[:, indice], capacidade * dias
+            )
+            utilizacao_semana = OcupacaoAnalyticsService.rate(
+                por_semana[:, indice], dias_por_semana * capacidade.sum()
+            )
+            picos = np.argsort(-por_horario[:, indice], kind="stable")[
+                : OcupacaoAnalyticsService.QUANTIDADE_PICOS
+            ]
+
+            resumo_andares.append(
+                {
+                    "andar": andar,
+                    "total_reservas": int(por_horario[:, indice].sum()),
+                    "utilizacao": round(
+                        float(
+                            OcupacaoAnalyticsService.rate(
+                                por_horario[:, indice].sum(), capacidade.sum() * dias
+                            )
+                        ),
+                        4,
+                    ),
+                    "utilizacao_por_horario": utilizacao_horario.round(4).tolist(),
+                    "utilizacao_por_dia_semana": utilizacao_semana.round(4).tolist(),
+                    "horarios_pico": [
+                        horarios[pico].strftime("%H:%M")
+                        for pico in picos
+                        if por_horario[pico, indice] > 0
+                    ],
+                }
+            )
+
+        numeros = {
+            pk: numero for numero, pk in ApartamentoService.get_ids_by_numero().items()
+        }
+        participacao = sorted(
+            (
+                {
+                    "numero_apartamento": numeros.get(apartamento_id),
+                    "quantidade": quantidade,
+                    "participacao": round(quantidade / total, 4),
+                }
+                for apartamento_id, quantidade in por_apartamento
+            ),
+            key=lambda item: -item["quantidade"],
+        )
+
+        return {
+            "inicio": inicio,
+            "fim": fim,
+            "horarios": [hora.strftime("%H:%M") for hora in horarios],
+            "andares": resumo_andares,
+            "matriz": matriz.tolist(),
+            "total_reservas": total,
+            "taxa_sem_lembrete": round(sem_lembrete / total, 4) if total else 0.0,
+            "participacao_apartamentos": participacao,
+        }
@@ -0,0 +1,139 @@
+import hashlib
+from datetime import datetime, time, timedelta
+from functools import wraps
+from typing import Callable, List, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from apps.core.availability import AvailabilityService
+from apps.core.holds import ReservaTemporariaService
+from apps.core.services import (
+    ApartamentoService,
+    ConfiguracaoService,
+    VersionService,
+    stamp_to_datetime,
+)
+
+from .serializers import (
+    CalendarioRequestSerializer,
+    ListarDatasDisponiveisRequestSerializer,
+    ListarSlotsDisponiveisRequestSerializer,
+)
+
+StampKeysFunc = Callable[[object], Optional[List[str]]]
+
+
+def get_validators(request, get_keys: StampKeysFunc) -> Tuple[Optional[str], Optional[datetime]]:
+    # etag_func and last_modified_func are called separately, so the cache
+    # round trip is done once and memoized on the request
+    if hasattr(request, "_condition_validators"):
+        return request._condition_validators
+
+    # expired holds still count in the bitmask until swept, and would end up
+    # in the ETag and the cached response
+    ReservaTemporariaService.sweep_if_due()
+
+    keys = get_keys(request)
+    if keys is None:
+        request._condition_validators = (None, None)
+        return request._condition_validators
+
+    stamps = VersionService.get_many(keys)
+    # availability also depends on the current day (past days are never
+    # bookable, the listed week rolls over on mondays)
+    hoje = timezone.localdate()
+
+    conteudo = ":".join([request.get_full_path(), str(hoje), *(stamps[key] for key in keys)])
+    etag = hashlib.md5(conteudo.encode()).hexdigest()
+
+    inicio_do_dia = timezone.make_aware(datetime.combine(hoje, time.min))
+    last_modified = max(
+        [inicio_do_dia, *(stamp_to_datetime(stamp) for stamp in stamps.values())]
+    )
+
+    request._condition_validators = (etag, last_modified)
+    return request._condition_validators
+
+
+def conditional(get_keys: StampKeysFunc):
+    return condition(
+        etag_func=lambda request, *args, **kwargs: get_validators(request, get_keys)[0],
+        last_modified_func=lambda request, *args, **kwargs: get_validators(
+            request, get_keys
+        )[1],
+    )
+
+
+def aconditional(get_keys: StampKeysFunc):
+    # condition() calls the validator functions synchronously even around an
+    # async view; they are computed in a worker thread first (the apartment
+    # lookup may hit the database) and memoized on the request
+    def decorator(view):
+        conditional_view = conditional(get_keys)(view)
+
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            await sync_to_async(get_validators)(request, get_keys)
+            return await conditional_view(request, *args, **kwargs)
+
+        return inner
+
+    return decorator
+
+
+def slots_stamp_keys(request) -> Optional[List[str]]:
+    serializer = ListarSlotsDisponiveisRequestSerializer(data=request.GET)
+    if not serializer.is_valid():
+        return None
+
+    data = serializer.validated_data
+    return [
+        ConfiguracaoService.VERSION_CACHE_KEY,
+        VersionService.disponibilidade_key(data["data"], data["andar"]),
+    ]
+
+
+def dates_stamp_keys(request) -> Optional[List[str]]:
+    serializer = ListarDatasDisponiveisRequestSerializer(data=request.GET)
+    if not serializer.is_valid():
+        return None
+
+    andar = serializer.validated_data["andar"]
+    return [
+        ConfiguracaoService.VERSION_CACHE_KEY,
+        *(
+            VersionService.disponibilidade_key(dia, andar)
+            for dia in AvailabilityService.get_week_dates()
+        ),
+    ]
+
+
+def calendar_stamp_keys(request) -> Optional[List[str]]:
+    serializer = CalendarioRequestSerializer(data=request.GET)
+    if not serializer.is_valid():
+        return None
+
+    data = serializer.validated_data
+    dias = (data["fim"] - data["inicio"]).days + 1
+    return [
+        ConfiguracaoService.VERSION_CACHE_KEY,
+        *(
+            VersionService.disponibilidade_key(data["inicio"] + timedelta(days=i), andar)
+            for i in range(dias)
+            for andar in data["andares"]
+        ),
+    ]
+
+
+def my_reservations_stamp_keys(request) -> Optional[List[str]]:
+    numero_apartamento = request.GET.get("numero_apartamento")
+    if not numero_apartamento or not numero_apartamento.isdigit():
+        return None
+
+    apartamento_id = ApartamentoService.get_id(int(numero_apartamento))
+    if apartamento_id is None:
+        return None
+
+    return [VersionService.apartamento_key(apartamento_id)]
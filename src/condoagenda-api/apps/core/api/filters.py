@@ -0,0 +1,60 @@
+from typing import Dict, Optional
+
+import django_filters
+from django.utils import timezone
+
+from apps.core.models import Andar, Reserva
+from apps.core.services import ApartamentoService
+
+
+class MinhasReservasFilter(django_filters.FilterSet):
+    numero_apartamento = django_filters.NumberFilter(
+        method="filter_apartamento", required=True
+    )
+
+    class Meta:
+        model = Reserva
+        fields = []
+
+    def __init__(self, *args, apartamentos: Optional[Dict[int, int]] = None, **kwargs):
+        # async callers pass the numero -> id map they already loaded, so
+        # filtering never reaches the database on the event loop
+        super().__init__(*args, **kwargs)
+        self.apartamentos = apartamentos
+
+    def filter_apartamento(self, queryset, name, value):
+        apartamentos = self.apartamentos
+        if apartamentos is None:
+            apartamentos = ApartamentoService.get_ids_by_numero()
+        apartamento_id = apartamentos.get(int(value))
+        if apartamento_id is None:
+            return queryset.none()
+        return queryset.filter(apartamento_id=apartamento_id)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+
+        # without an explicit range only upcoming reservations are listed
+        if self.form.cleaned_data.get("from") is None and self.form.cleaned_data.get("to") is None:
+            queryset = queryset.filter(data__gte=timezone.localdate())
+
+        return queryset
+
+
+class ExportarReservasFilter(django_filters.FilterSet):
+    andar = django_filters.ChoiceFilter(choices=Andar.choices)
+
+    class Meta:
+        model = Reserva
+        fields = []
+
+
+# "from" is a python keyword, so the range filters can't be declared in the
+# class body
+for filterset in (MinhasReservasFilter, ExportarReservasFilter):
+    filterset.base_filters.update(
+        {
+            "from": django_filters.DateFilter(field_name="data", lookup_expr="gte"),
+            "to": django_filters.DateFilter(field_name="data", lookup_expr="lte"),
+        }
+    )
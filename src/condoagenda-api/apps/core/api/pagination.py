@@ -0,0 +1,81 @@
+import base64
+import binascii
+from datetime import date, time
+from typing import List, Optional, Tuple
+
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import ValidationError
+
+from apps.core.models import Reserva
+
+
+class ReservaKeysetPagination:
+    # pages are addressed by the (data, hora, id) of the last row instead of
+    # an offset, so every page costs the same whatever the history size
+    CURSOR_PARAM = "cursor"
+    LIMITE_PARAM = "limite"
+    LIMITE_PADRAO = 50
+    LIMITE_MAXIMO = 200
+
+    ORDERING = ("data", "hora", "id")
+
+    @staticmethod
+    def encode_cursor(reserva: Reserva) -> str:
+        posicao = f"{reserva.data:%Y-%m-%d}_{reserva.hora:%H:%M:%S}_{reserva.id}"
+        return base64.urlsafe_b64encode(posicao.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[date, time, int]:
+        try:
+            data, hora, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split("_")
+            return date.fromisoformat(data), time.fromisoformat(hora), int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise ValidationError({ReservaKeysetPagination.CURSOR_PARAM: "Cursor inválido."})
+
+    @staticmethod
+    def get_limite(query_params) -> int:
+        limite = query_params.get(ReservaKeysetPagination.LIMITE_PARAM)
+        if limite is None:
+            return ReservaKeysetPagination.LIMITE_PADRAO
+        if not limite.isdigit() or int(limite) == 0:
+            raise ValidationError(
+                {ReservaKeysetPagination.LIMITE_PARAM: "Informe um número inteiro positivo."}
+            )
+        return min(int(limite), ReservaKeysetPagination.LIMITE_MAXIMO)
+
+    @staticmethod
+    def page_queryset(queryset: QuerySet, query_params) -> Tuple[QuerySet, int]:
+        # one row past the limit tells whether there is a next page
+        limite = ReservaKeysetPagination.get_limite(query_params)
+        queryset = queryset.order_by(*ReservaKeysetPagination.ORDERING)
+
+        cursor = query_params.get(ReservaKeysetPagination.CURSOR_PARAM)
+        if cursor:
+            data, hora, pk = ReservaKeysetPagination.decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(data__gt=data)
+                | Q(data=data, hora__gt=hora)
+                | Q(data=data, hora=hora, id__gt=pk)
+            )
+
+        return queryset[: limite + 1], limite
+
+    @staticmethod
+    def page(reservas: List[Reserva], limite: int) -> Tuple[List[Reserva], Optional[str]]:
+        if len(reservas) <= limite:
+            return reservas, None
+
+        reservas = reservas[:limite]
+        return reservas, ReservaKeysetPagination.encode_cursor(reservas[-1])
+
+    @staticmethod
+    def paginate(queryset: QuerySet, query_params) -> Tuple[List[Reserva], Optional[str]]:
+        queryset, limite = ReservaKeysetPagination.page_queryset(queryset, query_params)
+        return ReservaKeysetPagination.page(list(queryset), limite)
+
+    @staticmethod
+    async def apaginate(
+        queryset: QuerySet, query_params
+    ) -> Tuple[List[Reserva], Optional[str]]:
+        queryset, limite = ReservaKeysetPagination.page_queryset(queryset, query_params)
+        return ReservaKeysetPagination.page([reserva async for reserva in queryset], limite)
@@ -1,36 +1,77 @@
-from rest_framework import serializers
-from apps.core.models import Andar, Reserva
+from rest_framework import exceptions, serializers, status
+from apps.core.analytics import OcupacaoAnalyticsService
+from apps.core.batch import ReservaBatchService
+from apps.core.holds import ReservaTemporariaService
+from apps.core.models import Andar, Reserva, ReservaTemporaria
 from apps.core.services import ReservaService, ReservaValidationError
 
 
+def to_validation_error(e: ReservaValidationError) -> serializers.ValidationError:
+    if e.field:
+        return serializers.ValidationError({e.field: e.message})
+    return serializers.ValidationError(e.message)
+
+
+class SlotOcupado(exceptions.APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_code = "slot_ocupado"
+
+
 class CriarReservaRequestSerializer(serializers.Serializer):
     data = serializers.DateField()
     hora = serializers.TimeField()
     numero_apartamento = serializers.IntegerField()
     andar = serializers.ChoiceField(choices=Andar.choices)
+    # token from POST /reservas/holds/ for the same slot
+    hold = serializers.CharField(required=False)
 
     def validate(self, attrs):
+        # rules that need the database (slot taken, daily limit) are enforced
+        # atomically by create_reserva
         try:
-            ReservaService.validate_reserva(
-                attrs["data"],
-                attrs["hora"],
-                attrs["numero_apartamento"],
-                attrs["andar"],
-            )
+            ReservaService.validate_horario(attrs["data"], attrs["hora"], attrs["andar"])
         except ReservaValidationError as e:
-            if e.field:
-                raise serializers.ValidationError({e.field: e.message})
-            raise serializers.ValidationError(e.message)
+            raise to_validation_error(e)
 
         return attrs
 
     def create(self, validated_data):
-        return ReservaService.create_reserva(
-            validated_data["data"],
-            validated_data["hora"],
-            validated_data["numero_apartamento"],
-            validated_data["andar"],
-        )
+        try:
+            return ReservaService.create_reserva(
+                validated_data["data"],
+                validated_data["hora"],
+                validated_data["numero_apartamento"],
+                validated_data["andar"],
+                hold=validated_data.get("hold"),
+            )
+        except ReservaValidationError as e:
+            raise to_validation_error(e)
+
+
+class CriarReservaTemporariaRequestSerializer(CriarReservaRequestSerializer):
+    hold = None
+
+    def create(self, validated_data):
+        try:
+            return ReservaTemporariaService.create(
+                validated_data["data"],
+                validated_data["hora"],
+                validated_data["numero_apartamento"],
+                validated_data["andar"],
+            )
+        except ReservaValidationError as e:
+            # the bot tells "someone just took it" apart from the other errors
+            if e.code == "slot_ocupado":
+                raise SlotOcupado(e.message)
+            if e.code == "apartamento_nao_encontrado":
+                raise exceptions.NotFound(e.message)
+            raise to_validation_error(e)
+
+
+class ReservaTemporariaSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ReservaTemporaria
+        fields = ["token", "data", "hora", "hora_saida", "andar", "expira_em"]
 
 
 class ReservaSerializer(serializers.ModelSerializer):
@@ -74,5 +115,129 @@ class ListarSlotsDisponiveisResponseSerializer(serializers.Serializer):
     andar = serializers.ChoiceField(choices=Andar.choices)
 
 
+class EventosDisponibilidadeRequestSerializer(serializers.Serializer):
+    # EventSource sends the header on reconnects; the query parameter lets a
+    # client resume on its first connection
+    ultimo_id = serializers.IntegerField(required=False, min_value=0)
+    andar = serializers.ChoiceField(choices=Andar.choices, required=False)
+
+
+class CalendarioRequestSerializer(serializers.Serializer):
+    MAX_DIAS = 92
+
+    def get_fields(self):
+        # "from" can't be declared as a class attribute
+        return {
+            "from": serializers.DateField(),
+            "to": serializers.DateField(),
+            "andar": serializers.ListField(
+                child=serializers.ChoiceField(choices=Andar.choices), required=False
+            ),
+        }
+
+    def validate(self, attrs):
+        inicio, fim = attrs["from"], attrs["to"]
+        if inicio > fim:
+            raise serializers.ValidationError(
+                {"from": "A data inicial deve ser anterior à data final."}
+            )
+        if (fim - inicio).days >= self.MAX_DIAS:
+            raise serializers.ValidationError(
+                {"to": f"O período máximo é de {self.MAX_DIAS} dias."}
+            )
+
+        andares = sorted(set(attrs.get("andar") or Andar.values))
+        return {"inicio": inicio, "fim": fim, "andares": andares}
+
+
+class CalendarioDiaSerializer(serializers.Serializer):
+    data = serializers.DateField()
+    slots = serializers.ListField(child=serializers.DictField())
+
+
+class CalendarioAndarSerializer(serializers.Serializer):
+    andar = serializers.ChoiceField(choices=Andar.choices)
+    datas = CalendarioDiaSerializer(many=True)
+
+
+class CalendarioResponseSerializer(serializers.Serializer):
+    inicio = serializers.DateField()
+    fim = serializers.DateField()
+    andares = CalendarioAndarSerializer(many=True)
+
+
 class ListarMinhasReservasResponseSerializer(serializers.Serializer):
     reservas = ReservaSerializer(many=True)
+    proximo = serializers.CharField(allow_null=True)
+
+
+class OperacaoLoteSerializer(serializers.Serializer):
+    CAMPOS_OBRIGATORIOS = {
+        ReservaBatchService.CRIAR: ["data", "hora", "numero_apartamento", "andar"],
+        ReservaBatchService.CANCELAR: ["id"],
+        ReservaBatchService.MOVER: ["id", "data", "hora", "andar"],
+    }
+
+    op = serializers.ChoiceField(choices=ReservaBatchService.OPERACOES)
+    id = serializers.IntegerField(required=False)
+    data = serializers.DateField(required=False)
+    hora = serializers.TimeField(required=False)
+    numero_apartamento = serializers.IntegerField(required=False)
+    andar = serializers.ChoiceField(choices=Andar.choices, required=False)
+
+    def validate(self, attrs):
+        faltando = [
+            campo
+            for campo in self.CAMPOS_OBRIGATORIOS[attrs["op"]]
+            if campo not in attrs
+        ]
+        if faltando:
+            raise serializers.ValidationError(
+                {campo: "Este campo é obrigatório." for campo in faltando}
+            )
+
+        return attrs
+
+
+class LoteReservasRequestSerializer(serializers.Serializer):
+    MAX_OPERACOES = 1000
+
+    operacoes = serializers.ListField(
+        child=serializers.DictField(), allow_empty=False, max_length=MAX_OPERACOES
+    )
+
+
+class ResultadoOperacaoSerializer(serializers.Serializer):
+    sucesso = serializers.BooleanField(read_only=True)
+    id = serializers.IntegerField(read_only=True, allow_null=True)
+    erro = serializers.DictField(read_only=True, allow_null=True)
+
+
+class LoteReservasResponseSerializer(serializers.Serializer):
+    resultados = ResultadoOperacaoSerializer(many=True)
+
+
+class AnaliseOcupacaoRequestSerializer(serializers.Serializer):
+    def get_fields(self):
+        # same range params as the other endpoints; "from" can't be declared
+        # as a class attribute
+        return {
+            "from": serializers.DateField(required=False),
+            "to": serializers.DateField(required=False),
+        }
+
+    def validate(self, attrs):
+        inicio_padrao, fim_padrao = OcupacaoAnalyticsService.get_periodo_padrao()
+        fim = attrs.get("to", fim_padrao)
+        inicio = attrs.get("from", fim - (fim_padrao - inicio_padrao))
+
+        if inicio > fim:
+            raise serializers.ValidationError(
+                {"from": "A data inicial deve ser anterior à data final."}
+            )
+        if (fim - inicio).days >= OcupacaoAnalyticsService.MAX_DIAS:
+            raise serializers.ValidationError(
+                {"to": f"O período máximo é de {OcupacaoAnalyticsService.MAX_DIAS} dias."}
+            )
+
+        return {"inicio": inicio, "fim": fim}
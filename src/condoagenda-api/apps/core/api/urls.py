@@ -1,22 +1,44 @@
 from django.urls import path
 
 from .views import (
+    availability_events,
+    batch_reservations,
+    cache_stats,
+    calendar,
+    create_hold,
     create_reservation,
+    export_reservations,
     list_slots_available,
     list_dates_available,
     my_reservations,
+    occupancy_analytics,
+    release_hold,
+    request_metrics,
 )
 
 
 urlpatterns = [
     path("reservas/", create_reservation, name="criar-reserva"),
+    path("reservas/batch/", batch_reservations, name="lote-reservas"),
+    path("reservas/holds/", create_hold, name="criar-reserva-temporaria"),
+    path(
+        "reservas/holds/<str:token>/",
+        release_hold,
+        name="liberar-reserva-temporaria",
+    ),
     path("reservas/listar/", list_slots_available, name="listar-slots-disponiveis"),
     path(
         "reservas/listar/datas/", list_dates_available, name="listar-datas-disponiveis"
     ),
+    path("reservas/calendario/", calendar, name="calendario"),
+    path("reservas/eventos/", availability_events, name="eventos-disponibilidade"),
     path(
         "reservas/listar/minhas-reservas/",
         my_reservations,
         name="listar-minhas-reservas",
     ),
+    path("reservas/exportar/", export_reservations, name="exportar-reservas"),
+    path("metricas/ocupacao/", occupancy_analytics, name="metricas-ocupacao"),
+    path("metricas/cache/", cache_stats, name="metricas-cache"),
+    path("metricas/requisicoes/", request_metrics, name="metricas-requisicoes"),
 ]
@@ -1,141 +1,307 @@
-from datetime import date, datetime, timedelta
-
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
 from rest_framework import status
 from rest_framework.decorators import api_view
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
-from apps.core.models import Configuracao, Reserva
-from apps.core.services import ReservaService
-
-from django.utils import timezone
-
+from apps.core.analytics import OcupacaoAnalyticsService
+from apps.core.availability import AvailabilityService
+from apps.core.batch import ReservaBatchService
+from apps.core.events import EventoFeed
+from apps.core.export import ReservaExportService
+from apps.core.holds import ReservaTemporariaService
+from apps.core.instrumentation import MetricasService
+from apps.core.models import Reserva
+from apps.core.response_cache import ResponseCache
+from apps.core.services import ApartamentoService
+
+from .conditional import (
+    aconditional,
+    calendar_stamp_keys,
+    conditional,
+    dates_stamp_keys,
+    my_reservations_stamp_keys,
+    slots_stamp_keys,
+)
+from .filters import ExportarReservasFilter, MinhasReservasFilter
+from .pagination import ReservaKeysetPagination
 from .serializers import (
+    AnaliseOcupacaoRequestSerializer,
+    CalendarioRequestSerializer,
+    CalendarioResponseSerializer,
     CriarReservaRequestSerializer,
+    CriarReservaTemporariaRequestSerializer,
+    EventosDisponibilidadeRequestSerializer,
+    LoteReservasRequestSerializer,
+    LoteReservasResponseSerializer,
+    OperacaoLoteSerializer,
     ListarDatasDisponiveisRequestSerializer,
     ListarDatasDisponiveisResponseSerializer,
     ListarSlotsDisponiveisRequestSerializer,
     ListarSlotsDisponiveisResponseSerializer,
     ListarMinhasReservasResponseSerializer,
+    ReservaTemporariaSerializer,
 )
 
 
-def get_slots(dia: date, andar: int):
-    configuracao, _ = Configuracao.objects.get_or_create(id=1)
-    inicio = datetime.combine(dia, configuracao.hora_inicio)
-    fim = datetime.combine(dia, configuracao.hora_fim)
-    delta = timedelta(minutes=configuracao.duracao_reserva_minutos)
-
-    # start_of_week, end_of_week = ReservaService.get_current_week_range()
-    # is_out_of_week = dia < start_of_week or dia > end_of_week
-    reservas = Reserva.objects.filter(data=dia, andar=andar)
-    horarios_reservados = set(reservas.values_list("hora", flat=True))
-
-    agora = datetime.now()
-    is_passed = dia < agora.date()
+def json_response(data, status: int) -> Response:
+    # the async read views are plain django views (DRF's APIView is sync),
+    # so the renderer content negotiation would pick is set by hand
+    response = Response(data, status=status)
+    response.accepted_renderer = JSONRenderer()
+    response.accepted_media_type = "application/json"
+    response.renderer_context = {}
+    return response
 
-    slots = []
-    atual = inicio
-    while atual + delta <= fim + delta:
-        inicio_slot = atual.time()
-        fim_slot = (atual + delta).time()
 
-        is_odd_hour = ReservaService.is_odd_hour(inicio_slot)
-        is_reserved = inicio_slot in horarios_reservados
-        # is_available = (
-        #     is_odd_hour and not is_reserved and not is_passed and not is_out_of_week
-        # )
-        is_available = is_odd_hour and not is_reserved and not is_passed
+@api_view(["POST"])
+def create_reservation(request):
+    serializer = CriarReservaRequestSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    serializer.save()
 
-        slots.append(
-            {
-                "start": inicio_slot.strftime("%H:%M"),
-                "end": fim_slot.strftime("%H:%M"),
-                "available": is_available,
-            }
-        )
-        atual += delta
+    return Response(status=status.HTTP_201_CREATED)
 
-    return slots
 
+@api_view(["POST"])
+def create_hold(request):
+    serializer = CriarReservaTemporariaRequestSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    reserva_temporaria = serializer.save()
 
-def get_dates(andar: int):
-    today = timezone.now().date()
-    current_weekday = today.weekday()
-    start_of_week = today - timedelta(days=current_weekday)
-    dates = [start_of_week + timedelta(days=i) for i in range(7)]
+    return Response(
+        ReservaTemporariaSerializer(reserva_temporaria).data,
+        status=status.HTTP_201_CREATED,
+    )
 
-    datas = []
-    for cdate in dates:
-        slots = get_slots(cdate, andar)
-        quantidade_slots_disponiveis = len(
-            [slot for slot in slots if slot["available"]]
-        )
 
-        datas.append(
-            {
-                "data": cdate,
-                "quantidade_slots_disponiveis": quantidade_slots_disponiveis,
-                "disponivel": quantidade_slots_disponiveis > 0,
-            }
+@api_view(["DELETE"])
+def release_hold(request, token: str):
+    if not ReservaTemporariaService.release(token):
+        return Response(
+            {"detail": "Reserva temporária não encontrada."},
+            status=status.HTTP_404_NOT_FOUND,
         )
 
-    return datas
+    return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 @api_view(["POST"])
-def create_reservation(request):
-    serializer = CriarReservaRequestSerializer(data=request.data)
+def batch_reservations(request):
+    serializer = LoteReservasRequestSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
-    serializer.save()
 
-    return Response(status=status.HTTP_201_CREATED)
+    itens = serializer.validated_data["operacoes"]
 
+    resultados = {}
+    operacoes = []
+    for indice, item in enumerate(itens):
+        operacao = OperacaoLoteSerializer(data=item)
+        if operacao.is_valid():
+            operacoes.append((indice, operacao.validated_data))
+        else:
+            resultados[indice] = {"sucesso": False, "id": None, "erro": operacao.errors}
 
-@api_view(["GET"])
-def list_slots_available(request):
-    serializer = ListarSlotsDisponiveisRequestSerializer(data=request.query_params)
-    serializer.is_valid(raise_exception=True)
+    resultados.update(ReservaBatchService.apply(operacoes))
+
+    return Response(
+        LoteReservasResponseSerializer(
+            {"resultados": [resultados[indice] for indice in range(len(itens))]}
+        ).data,
+        status=status.HTTP_200_OK,
+    )
+
+
+@aconditional(slots_stamp_keys)
+@require_GET
+async def list_slots_available(request):
+    serializer = ListarSlotsDisponiveisRequestSerializer(data=request.GET)
+    if not serializer.is_valid():
+        return json_response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     data = serializer.validated_data
     dia = data["data"]
     andar = data["andar"]
 
-    slots = get_slots(dia, andar)
-    return Response(
-        ListarSlotsDisponiveisResponseSerializer(
+    async def build():
+        slots = await AvailabilityService.aget_slots(dia, andar)
+        return ListarSlotsDisponiveisResponseSerializer(
             {"slots": slots, "data": dia, "andar": andar}
-        ).data,
-        status=status.HTTP_200_OK,
+        ).data
+
+    response_data = await ResponseCache.aget_or_set(
+        await ResponseCache.aget_slots_key(dia, andar), build
     )
+    return json_response(response_data, status=status.HTTP_200_OK)
+
+
+@aconditional(dates_stamp_keys)
+@require_GET
+async def list_dates_available(request):
+    serializer = ListarDatasDisponiveisRequestSerializer(data=request.GET)
+    if not serializer.is_valid():
+        return json_response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    andar = serializer.validated_data["andar"]
 
+    async def build():
+        return ListarDatasDisponiveisResponseSerializer(
+            {"datas": await AvailabilityService.aget_dates(andar)}
+        ).data
 
+    response_data = await ResponseCache.aget_or_set(
+        await ResponseCache.aget_dates_key(AvailabilityService.get_week_dates()[0], andar),
+        build,
+    )
+    return json_response(response_data, status=status.HTTP_200_OK)
+
+
+@conditional(calendar_stamp_keys)
 @api_view(["GET"])
-def list_dates_available(request):
-    serializer = ListarDatasDisponiveisRequestSerializer(data=request.query_params)
+def calendar(request):
+    serializer = CalendarioRequestSerializer(data=request.query_params)
     serializer.is_valid(raise_exception=True)
 
     data = serializer.validated_data
-    andar = data["andar"]
+    grid = AvailabilityService.get_slots_grid(data["inicio"], data["fim"], data["andares"])
 
-    datas = get_dates(andar)
     return Response(
-        ListarDatasDisponiveisResponseSerializer({"datas": datas}).data,
+        CalendarioResponseSerializer(
+            {
+                "inicio": data["inicio"],
+                "fim": data["fim"],
+                "andares": [
+                    {
+                        "andar": andar,
+                        "datas": [
+                            {"data": dia, "slots": slots}
+                            for dia, slots in grid[andar].items()
+                        ],
+                    }
+                    for andar in data["andares"]
+                ],
+            }
+        ).data,
         status=status.HTTP_200_OK,
     )
 
 
-@api_view(["GET"])
-def my_reservations(request):
-    numero_apartamento = request.query_params.get("numero_apartamento")
+@aconditional(my_reservations_stamp_keys)
+@require_GET
+async def my_reservations(request):
+    numero_apartamento = request.GET.get("numero_apartamento")
     if not numero_apartamento:
-        return Response(
+        return json_response(
             {"error": "Número do apartamento é obrigatório"},
             status=status.HTTP_400_BAD_REQUEST,
         )
 
-    reservations = Reserva.objects.filter(apartamento__numero=int(numero_apartamento))
+    filterset = MinhasReservasFilter(
+        request.GET,
+        queryset=Reserva.objects.select_related("apartamento"),
+        apartamentos=await ApartamentoService.aget_ids_by_numero(),
+    )
+    if not filterset.is_valid():
+        return json_response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        reservations, proximo = await ReservaKeysetPagination.apaginate(
+            filterset.qs, request.GET
+        )
+    except ValidationError as e:
+        return json_response(e.detail, status=status.HTTP_400_BAD_REQUEST)
+
+    return json_response(
+        ListarMinhasReservasResponseSerializer(
+            {"reservas": reservations, "proximo": proximo}
+        ).data,
+        status=status.HTTP_200_OK,
+    )
+
+
+@api_view(["GET"])
+def export_reservations(request):
+    formato = request.query_params.get("formato", ReservaExportService.NDJSON)
+    if formato not in ReservaExportService.FORMATOS:
+        return Response(
+            {"formato": f"Formato inválido. Use {' ou '.join(ReservaExportService.FORMATOS)}."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    filterset = ExportarReservasFilter(request.query_params, queryset=Reserva.objects.all())
+    if not filterset.is_valid():
+        return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    if isinstance(request._request, ASGIRequest):
+        lines = ReservaExportService.alines(filterset.qs, formato)
+    else:
+        lines = ReservaExportService.lines(filterset.qs, formato)
+
+    response = StreamingHttpResponse(
+        lines,
+        content_type=ReservaExportService.FORMATOS[formato],
+    )
+    response["Content-Disposition"] = f'attachment; filename="reservas.{formato}"'
+    return response
+
+
+async def availability_events(request):
+    # plain async view: DRF views are sync and would hold a worker thread for
+    # as long as the stream is open
+    if request.method != "GET":
+        return JsonResponse(
+            {"detail": f'Método "{request.method}" não permitido.'},
+            status=status.HTTP_405_METHOD_NOT_ALLOWED,
+        )
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {"detail": "O stream de eventos só está disponível via ASGI."},
+            status=status.HTTP_501_NOT_IMPLEMENTED,
+        )
+
+    params = request.GET.dict()
+    if "Last-Event-ID" in request.headers:
+        params["ultimo_id"] = request.headers["Last-Event-ID"]
+
+    serializer = EventosDisponibilidadeRequestSerializer(data=params)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    feed = EventoFeed.get()
+    response = StreamingHttpResponse(
+        feed.stream(
+            serializer.validated_data.get("ultimo_id"),
+            serializer.validated_data.get("andar"),
+        ),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
 
+
+@api_view(["GET"])
+def occupancy_analytics(request):
+    serializer = AnaliseOcupacaoRequestSerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+
+    periodo = serializer.validated_data
     return Response(
-        ListarMinhasReservasResponseSerializer({"reservas": reservations}).data,
+        OcupacaoAnalyticsService.summarize(
+            Reserva.objects.all(), periodo["inicio"], periodo["fim"]
+        ),
         status=status.HTTP_200_OK,
     )
+
+
+@api_view(["GET"])
+def cache_stats(request):
+    return Response(ResponseCache.stats(), status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+def request_metrics(request):
+    return Response(MetricasService.stats(), status=status.HTTP_200_OK)
@@ -0,0 +1,177 @@
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core.events import EventoService
+from apps.core.models import Disponibilidade
+from apps.core.rules import RegrasReserva, ReservaRow
+from apps.core.services import ConfiguracaoService
+
+
+class AvailabilityService:
+    @staticmethod
+    def get_week_dates() -> List[date]:
+        today = timezone.localdate()
+        start_of_week = today - timedelta(days=today.weekday())
+        return [start_of_week + timedelta(days=i) for i in range(7)]
+
+    @staticmethod
+    def refresh_day(data: date, andar: int):
+        # recomputed from the floor-day's intervals under its row lock, so
+        # concurrent writers of the same day see each other's reservations
+        disponibilidade = Disponibilidade.lock(data, andar)
+        regras = ConfiguracaoService.get_regras()
+        bits = regras.ocupados(andar, RegrasReserva.load_index(data, andar))
+        if disponibilidade.ocupados != bits:
+            Disponibilidade.objects.filter(pk=disponibilidade.pk).update(
+                ocupados=bits, updated_at=timezone.now()
+            )
+            EventoService.record(
+                EventoService.diff(
+                    data, andar, disponibilidade.ocupados, bits, regras.template(andar)
+                )
+            )
+
+    @staticmethod
+    def compute_ocupados(
+        reservas: Iterable[ReservaRow], regras: RegrasReserva
+    ) -> Dict[Tuple[date, int], int]:
+        return {
+            (data, andar): regras.ocupados(andar, index)
+            for (data, andar), index in RegrasReserva.build_indexes(reservas).items()
+        }
+
+    @staticmethod
+    def rebuild_ocupados(desde: Optional[date] = None):
+        filtros = {"data__gte": desde} if desde is not None else {}
+        disponibilidades = Disponibilidade.objects.filter(**filtros)
+
+        ocupados = AvailabilityService.compute_ocupados(
+            RegrasReserva.rows(chunk_size=2000, **filtros),
+            ConfiguracaoService.get_regras(),
+        )
+
+        with transaction.atomic():
+            disponibilidades.delete()
+            Disponibilidade.objects.bulk_create(
+                [
+                    Disponibilidade(data=data, andar=andar, ocupados=bits)
+                    for (data, andar), bits in ocupados.items()
+                ],
+                batch_size=1000,
+            )
+            # slot grids may have changed too, so listeners reload everything
+            EventoService.recarregar()
+
+    @staticmethod
+    def ocupados_queryset(inicio: date, fim: date, andares: List[int]):
+        return Disponibilidade.objects.filter(
+            data__range=(inicio, fim), andar__in=andares
+        ).values_list("data", "andar", "ocupados")
+
+    @staticmethod
+    def build_grid(
+        inicio: date,
+        fim: date,
+        andares: List[int],
+        regras: RegrasReserva,
+        ocupados_por_dia: Dict[Tuple[date, int], int],
+    ) -> Dict[int, Dict[date, List[dict]]]:
+        hoje = timezone.localdate()
+
+        grid = {andar: {} for andar in andares}
+        dia = inicio
+        while dia <= fim:
+            is_passed = dia < hoje
+            for andar in andares:
+                ocupados = ocupados_por_dia.get((dia, andar), 0)
+                fechado = is_passed or regras.bloqueio(dia, andar) is not None
+                grid[andar][dia] = [
+                    {
+                        "start": slot.inicio_str,
+                        "end": slot.fim_str,
+                        "available": slot.reservavel
+                        and not ocupados & slot.bit
+                        and not fechado,
+                    }
+                    for slot in regras.template(andar).slots
+                ]
+            dia += timedelta(days=1)
+
+        return grid
+
+    @staticmethod
+    def get_slots_grid(
+        inicio: date, fim: date, andares: Iterable[int]
+    ) -> Dict[int, Dict[date, List[dict]]]:
+        andares = list(andares)
+        ocupados_por_dia = {
+            (data, andar): ocupados
+            for data, andar, ocupados in AvailabilityService.ocupados_queryset(
+                inicio, fim, andares
+            )
+        }
+        return AvailabilityService.build_grid(
+            inicio, fim, andares, ConfiguracaoService.get_regras(), ocupados_por_dia
+        )
+
+    @staticmethod
+    async def aget_slots_grid(
+        inicio: date, fim: date, andares: Iterable[int]
+    ) -> Dict[int, Dict[date, List[dict]]]:
+        andares = list(andares)
+        regras = await ConfiguracaoService.aget_regras()
+        ocupados_por_dia = {
+            (data, andar): ocupados
+            async for data, andar, ocupados in AvailabilityService.ocupados_queryset(
+                inicio, fim, andares
+            )
+        }
+        return AvailabilityService.build_grid(inicio, fim, andares, regras, ocupados_por_dia)
+
+    @staticmethod
+    def get_slots_range(
+        inicio: date, fim: date, andar: int
+    ) -> Dict[date, List[dict]]:
+        return AvailabilityService.get_slots_grid(inicio, fim, [andar])[andar]
+
+    @staticmethod
+    def get_slots(dia: date, andar: int) -> List[dict]:
+        return AvailabilityService.get_slots_range(dia, dia, andar)[dia]
+
+    @staticmethod
+    async def aget_slots(dia: date, andar: int) -> List[dict]:
+        return (await AvailabilityService.aget_slots_grid(dia, dia, [andar]))[andar][dia]
+
+    @staticmethod
+    def summarize_dates(slots_por_dia: Dict[date, List[dict]]) -> List[dict]:
+        datas = []
+        for cdate, slots in slots_por_dia.items():
+            quantidade_slots_disponiveis = len(
+                [slot for slot in slots if slot["available"]]
+            )
+
+            datas.append(
+                {
+                    "data": cdate,
+                    "quantidade_slots_disponiveis": quantidade_slots_disponiveis,
+                    "disponivel": quantidade_slots_disponiveis > 0,
+                }
+            )
+
+        return datas
+
+    @staticmethod
+    def get_dates(andar: int) -> List[dict]:
+        dates = AvailabilityService.get_week_dates()
+        return AvailabilityService.summarize_dates(
+            AvailabilityService.get_slots_range(dates[0], dates[-1], andar)
+        )
+
+    @staticmethod
+    async def aget_dates(andar: int) -> List[dict]:
+        dates = AvailabilityService.get_week_dates()
+        grid = await AvailabilityService.aget_slots_grid(dates[0], dates[-1], [andar])
+        return AvailabilityService.summarize_dates(grid[andar])
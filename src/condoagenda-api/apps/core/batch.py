@@ -0,0 +1,338 @@
+from collections import defaultdict
+from datetime import date, time
+from typing import Dict, List, Optional, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core.events import EventoService
+from apps.core.intervals import IntervalIndex, Intervalo, minutos
+from apps.core.models import (
+    Andar,
+    CotaApartamento,
+    Disponibilidade,
+    OcupacaoSlot,
+    Reserva,
+)
+from apps.core.rules import RegrasReserva
+from apps.core.services import (
+    ApartamentoService,
+    ConfiguracaoService,
+    ReservaService,
+    ReservaValidationError,
+)
+from apps.core.signals import muted_reserva_signals, notify_changes
+
+SlotKey = Tuple[date, time, int]
+CotaKey = Tuple[int, date]
+
+
+class ReservaBatchService:
+    CRIAR = "criar"
+    CANCELAR = "cancelar"
+    MOVER = "mover"
+
+    OPERACOES = [CRIAR, CANCELAR, MOVER]
+
+    @staticmethod
+    def resultado(reserva: Optional[Reserva] = None, erro: ReservaValidationError = None) -> dict:
+        return {
+            "sucesso": erro is None,
+            "id": reserva.id if reserva is not None else None,
+            "erro": {erro.field or "non_field_errors": erro.message} if erro else None,
+        }
+
+    @staticmethod
+    def reserva_nao_encontrada() -> ReservaValidationError:
+        return ReservaValidationError("Reserva não encontrada.", field="id")
+
+    @staticmethod
+    def apply(operacoes: List[Tuple[int, dict]]) -> Dict[int, dict]:
+        # operations are checked in order against in-memory counters and
+        # interval indexes, so each one sees the effect of the previous ones;
+        # a failing operation is reported and skipped without aborting the
+        # others
+        _, config, regras = ConfiguracaoService.load()
+        max_por_apartamento = config.quantidade_agendamento_por_apartamento
+        capacidade = config.capacidade_por_slot
+
+        resultados = {}
+        pendentes = []
+        for indice, operacao in operacoes:
+            if operacao["op"] != ReservaBatchService.CANCELAR:
+                try:
+                    ReservaService.validate_horario(
+                        operacao["data"], operacao["hora"], operacao["andar"]
+                    )
+                except ReservaValidationError as e:
+                    resultados[indice] = ReservaBatchService.resultado(erro=e)
+                    continue
+            pendentes.append((indice, operacao))
+
+        apartamentos = ApartamentoService.get_ids_by_numero()
+
+        with transaction.atomic():
+            ids = {
+                operacao["id"]
+                for _, operacao in pendentes
+                if operacao["op"] != ReservaBatchService.CRIAR
+            }
+            datas = {operacao["data"] for _, operacao in pendentes if "data" in operacao}
+            datas |= set(Reserva.objects.filter(id__in=ids).values_list("data", flat=True))
+
+            # floor-days before the reservation and counter rows, the order
+            # every writer uses. a reservation moved to another day before
+            # its row was locked brings that day in too
+            disponibilidades = ReservaBatchService.lock_days(datas)
+            reservas = Reserva.objects.select_for_update().in_bulk(ids)
+            if movidas := {reserva.data for reserva in reservas.values()} - datas:
+                datas |= movidas
+                disponibilidades = ReservaBatchService.lock_days(datas)
+
+            apartamento_ids = {
+                apartamentos[operacao["numero_apartamento"]]
+                for _, operacao in pendentes
+                if operacao["op"] == ReservaBatchService.CRIAR
+                and operacao["numero_apartamento"] in apartamentos
+            } | {reserva.apartamento_id for reserva in reservas.values()}
+
+            ocupacoes = {
+                (ocupacao.data, ocupacao.hora, ocupacao.andar): ocupacao
+                for ocupacao in OcupacaoSlot.objects.select_for_update().filter(
+                    data__in=datas
+                )
+            }
+            cotas = {
+                (cota.apartamento_id, cota.data): cota
+                for cota in CotaApartamento.objects.select_for_update().filter(
+                    apartamento_id__in=apartamento_ids, data__in=datas
+                )
+            }
+            indexes = defaultdict(
+                IntervalIndex,
+                RegrasReserva.build_indexes(RegrasReserva.rows(data__in=datas)),
+            )
+
+            ocupacao_qtd = defaultdict(int, {key: o.quantidade for key, o in ocupacoes.items()})
+            cota_qtd = defaultdict(int, {key: c.quantidade for key, c in cotas.items()})
+
+            def take(reserva: Reserva) -> int:
+                slot = (reserva.data, reserva.hora, reserva.andar)
+                cota = (reserva.apartamento_id, reserva.data)
+                if cota_qtd[cota] >= max_por_apartamento:
+                    raise ReservaService.limite_apartamento_error(max_por_apartamento)
+                if ocupacao_qtd[slot] >= capacidade:
+                    raise ReservaService.slot_ocupado_error()
+
+                index = indexes[(reserva.data, reserva.andar)]
+                intervalo = Intervalo.from_horas(reserva.hora, reserva.hora_saida)
+                vaga = index.vaga_livre(intervalo.inicio, intervalo.fim, capacidade)
+                if vaga is None:
+                    raise ReservaService.slot_ocupado_error()
+
+                cota_qtd[cota] += 1
+                ocupacao_qtd[slot] += 1
+                index.add(intervalo._replace(vaga=vaga, chave=reserva.id))
+                return vaga
+
+            def release(reserva: Reserva):
+                slot = (reserva.data, reserva.hora, reserva.andar)
+                cota = (reserva.apartamento_id, reserva.data)
+                cota_qtd[cota] = max(cota_qtd[cota] - 1, 0)
+                ocupacao_qtd[slot] = max(ocupacao_qtd[slot] - 1, 0)
+                indexes[(reserva.data, reserva.andar)].remove(
+                    reserva.id, minutos(reserva.hora)
+                )
+
+            def restore(reserva: Reserva):
+                cota_qtd[(reserva.apartamento_id, reserva.data)] += 1
+                ocupacao_qtd[(reserva.data, reserva.hora, reserva.andar)] += 1
+                indexes[(reserva.data, reserva.andar)].add(
+                    Intervalo.from_horas(
+                        reserva.hora, reserva.hora_saida, reserva.vaga, reserva.id
+                    )
+                )
+
+            novas = {}
+            movidas = {}
+            removidas = set()
+            afetados = set()
+            apartamentos_afetados = set()
+
+            for indice, operacao in pendentes:
+                try:
+                    if operacao["op"] == ReservaBatchService.CRIAR:
+                        apartamento_id = apartamentos.get(operacao["numero_apartamento"])
+                        if apartamento_id is None:
+                            raise ReservaService.apartamento_nao_encontrado_error()
+
+                        reserva = Reserva(
+                            data=operacao["data"],
+                            hora=operacao["hora"],
+                            hora_saida=ReservaService.get_hora_saida(
+                                operacao["data"], operacao["hora"], operacao["andar"]
+                            ),
+                            andar=operacao["andar"],
+                            apartamento_id=apartamento_id,
+                        )
+                        reserva.vaga = take(reserva)
+                        novas[indice] = reserva
+                    else:
+                        reserva = reservas.get(operacao["id"])
+                        if reserva is None or reserva.id in removidas:
+                            raise ReservaBatchService.reserva_nao_encontrada()
+
+                        afetados.add((reserva.data, reserva.andar))
+                        release(reserva)
+
+                        if operacao["op"] == ReservaBatchService.CANCELAR:
+                            removidas.add(reserva.id)
+                            movidas.pop(reserva.id, None)
+                        else:
+                            anterior = (
+                                reserva.data,
+                                reserva.hora,
+                                reserva.andar,
+                                reserva.hora_saida,
+                                reserva.vaga,
+                            )
+                            reserva.data = operacao["data"]
+                            reserva.hora = operacao["hora"]
+                            reserva.andar = operacao["andar"]
+                            reserva.hora_saida = ReservaService.get_hora_saida(
+                                reserva.data, reserva.hora, reserva.andar
+                            )
+                            try:
+                                reserva.vaga = take(reserva)
+                            except ReservaValidationError:
+                                (
+                                    reserva.data,
+                                    reserva.hora,
+                                    reserva.andar,
+                                    reserva.hora_saida,
+                                    reserva.vaga,
+                                ) = anterior
+                                restore(reserva)
+                                raise
+
+                            reserva.updated_at = timezone.now()
+                            movidas[reserva.id] = reserva
+                except ReservaValidationError as e:
+                    resultados[indice] = ReservaBatchService.resultado(erro=e)
+                    continue
+
+                afetados.add((reserva.data, reserva.andar))
+                apartamentos_afetados.add(reserva.apartamento_id)
+                resultados[indice] = ReservaBatchService.resultado(reserva)
+
+            with muted_reserva_signals():
+                Reserva.objects.bulk_create(novas.values(), batch_size=500)
+                if removidas:
+                    Reserva.objects.filter(id__in=removidas).delete()
+                if movidas:
+                    Reserva.objects.bulk_update(
+                        movidas.values(),
+                        ["data", "hora", "andar", "hora_saida", "vaga", "updated_at"],
+                        batch_size=500,
+                    )
+
+            ReservaBatchService.save_counters(ocupacoes, ocupacao_qtd, cotas, cota_qtd)
+            ReservaBatchService.save_disponibilidade(
+                disponibilidades, afetados, indexes, regras
+            )
+
+        for indice, reserva in novas.items():
+            resultados[indice]["id"] = reserva.id
+
+        notify_changes(afetados, apartamentos_afetados)
+        return resultados
+
+    @staticmethod
+    def lock_days(datas: set) -> Dict[Tuple[date, int], Disponibilidade]:
+        # the floor-day rows are the lock create_reserva takes too, in the
+        # same order and before any counter row; rows that don't exist yet
+        # are created first so every involved day is locked
+        Disponibilidade.objects.bulk_create(
+            [
+                Disponibilidade(data=data, andar=andar)
+                for data in datas
+                for andar in Andar.values
+            ],
+            ignore_conflicts=True,
+        )
+        return {
+            (disponibilidade.data, disponibilidade.andar): disponibilidade
+            for disponibilidade in (
+                Disponibilidade.objects.select_for_update()
+                .filter(data__in=datas)
+                .order_by("data", "andar")
+            )
+        }
+
+    @staticmethod
+    def save_counters(
+        ocupacoes: Dict[SlotKey, OcupacaoSlot],
+        ocupacao_qtd: Dict[SlotKey, int],
+        cotas: Dict[CotaKey, CotaApartamento],
+        cota_qtd: Dict[CotaKey, int],
+    ):
+        ocupacoes_alteradas = []
+        ocupacoes_novas = []
+        for (data, hora, andar), quantidade in ocupacao_qtd.items():
+            ocupacao = ocupacoes.get((data, hora, andar))
+            if ocupacao is None:
+                if quantidade:
+                    ocupacoes_novas.append(
+                        OcupacaoSlot(data=data, hora=hora, andar=andar, quantidade=quantidade)
+                    )
+            elif ocupacao.quantidade != quantidade:
+                ocupacao.quantidade = quantidade
+                ocupacoes_alteradas.append(ocupacao)
+
+        cotas_alteradas = []
+        cotas_novas = []
+        for (apartamento_id, data), quantidade in cota_qtd.items():
+            cota = cotas.get((apartamento_id, data))
+            if cota is None:
+                if quantidade:
+                    cotas_novas.append(
+                        CotaApartamento(
+                            apartamento_id=apartamento_id, data=data, quantidade=quantidade
+                        )
+                    )
+            elif cota.quantidade != quantidade:
+                cota.quantidade = quantidade
+                cotas_alteradas.append(cota)
+
+        OcupacaoSlot.objects.bulk_update(ocupacoes_alteradas, ["quantidade"], batch_size=500)
+        OcupacaoSlot.objects.bulk_create(ocupacoes_novas, batch_size=500)
+        CotaApartamento.objects.bulk_update(cotas_alteradas, ["quantidade"], batch_size=500)
+        CotaApartamento.objects.bulk_create(cotas_novas, batch_size=500)
+
+    @staticmethod
+    def save_disponibilidade(
+        disponibilidades: Dict[Tuple[date, int], Disponibilidade],
+        afetados: set,
+        indexes: Dict[Tuple[date, int], IntervalIndex],
+        regras: RegrasReserva,
+    ):
+        # the indexes hold the final intervals of every involved floor-day,
+        # so the bitmasks are recomputed without reading the reservations back
+        agora = timezone.now()
+        alteradas = []
+        eventos = []
+        for data, andar in afetados:
+            bits = regras.ocupados(andar, indexes[(data, andar)])
+            disponibilidade = disponibilidades[(data, andar)]
+            if disponibilidade.ocupados != bits:
+                eventos.extend(
+                    EventoService.diff(
+                        data, andar, disponibilidade.ocupados, bits, regras.template(andar)
+                    )
+                )
+                disponibilidade.ocupados = bits
+                disponibilidade.updated_at = agora
+                alteradas.append(disponibilidade)
+
+        Disponibilidade.objects.bulk_update(alteradas, ["ocupados", "updated_at"])
+        EventoService.record(eventos)
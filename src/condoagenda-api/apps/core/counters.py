@@ -0,0 +1,41 @@
+from typing import Optional, Type
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+
+
+class CounterService:
+    @staticmethod
+    def increment(model: Type[models.Model], limite: Optional[int], **lookup) -> bool:
+        # a single conditional UPDATE both checks and takes the unit, so the
+        # database row lock is the only serialization point
+        queryset = model.objects.filter(**lookup)
+        if limite is not None:
+            if limite <= 0:
+                return False
+            queryset = queryset.filter(quantidade__lt=limite)
+
+        if queryset.update(quantidade=F("quantidade") + 1):
+            return True
+
+        try:
+            with transaction.atomic():
+                model.objects.create(quantidade=1, **lookup)
+            return True
+        except IntegrityError:
+            # the row exists: either it is full or a concurrent writer just
+            # created it
+            return bool(queryset.update(quantidade=F("quantidade") + 1))
+
+    @staticmethod
+    def decrement(model: Type[models.Model], **lookup):
+        model.objects.filter(quantidade__gt=0, **lookup).update(
+            quantidade=F("quantidade") - 1
+        )
+
+    @staticmethod
+    def get(model: Type[models.Model], **lookup) -> int:
+        return (
+            model.objects.filter(**lookup).values_list("quantidade", flat=True).first()
+            or 0
+        )
@@ -0,0 +1,189 @@
+import asyncio
+import json
+from datetime import date, datetime, timedelta
+from typing import AsyncIterator, Iterable, List, Optional, Set
+
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from apps.core.models import EventoDisponibilidade
+from apps.core.slots import SlotTemplate
+
+Tipo = EventoDisponibilidade.Tipo
+
+
+class EventoService:
+    RETENCAO = timedelta(days=1)
+    # events are read only once they are this old, so a transaction that got
+    # a lower id but committed later is not skipped by the cursors
+    ATRASO = timedelta(seconds=1)
+
+    @staticmethod
+    def diff(
+        data: date, andar: int, antes: int, depois: int, template: SlotTemplate
+    ) -> List[EventoDisponibilidade]:
+        alterados = antes ^ depois
+        if not alterados:
+            return []
+
+        return [
+            EventoDisponibilidade(
+                tipo=Tipo.OCUPADO if depois & slot.bit else Tipo.LIVRE,
+                data=data,
+                andar=andar,
+                hora=slot.inicio,
+            )
+            for slot in template.reservaveis
+            if alterados & slot.bit
+        ]
+
+    @staticmethod
+    def record(eventos: Iterable[EventoDisponibilidade]):
+        eventos = list(eventos)
+        if eventos:
+            EventoDisponibilidade.objects.bulk_create(eventos, batch_size=500)
+
+    @staticmethod
+    def recarregar():
+        EventoDisponibilidade.objects.create(tipo=Tipo.RECARREGAR)
+
+    @staticmethod
+    def purge(agora: Optional[datetime] = None) -> int:
+        limite = (agora or timezone.now()) - EventoService.RETENCAO
+        removidos, _ = EventoDisponibilidade.objects.filter(created_at__lt=limite).delete()
+        return removidos
+
+    @staticmethod
+    def visiveis():
+        return EventoDisponibilidade.objects.filter(
+            created_at__lte=timezone.now() - EventoService.ATRASO
+        )
+
+    @staticmethod
+    def format(evento: EventoDisponibilidade) -> str:
+        dados = {}
+        if evento.tipo != Tipo.RECARREGAR:
+            dados = {
+                "data": evento.data.isoformat(),
+                "andar": evento.andar,
+                "hora": evento.hora.strftime("%H:%M"),
+                "disponivel": evento.tipo == Tipo.LIVRE,
+            }
+        return (
+            f"id: {evento.id}\n"
+            f"event: {evento.tipo}\n"
+            f"data: {json.dumps(dados, separators=(',', ':'))}\n\n"
+        )
+
+
+class EventoFeed:
+    # one poller per event loop fans new events out to every open stream, so
+    # the table is read once per interval however many clients are connected
+    INTERVALO_SEGUNDOS = 1.0
+    HEARTBEAT_SEGUNDOS = 15.0
+    RETRY_MS = 3000
+    # events buffered per client before it is told to reload instead
+    MAX_PENDENTES = 1000
+
+    _atual: Optional["EventoFeed"] = None
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.assinantes: Set[asyncio.Queue] = set()
+        self.cursor = 0
+        self.task: Optional[asyncio.Task] = None
+        self.lock = asyncio.Lock()
+
+    @classmethod
+    def get(cls) -> "EventoFeed":
+        loop = asyncio.get_running_loop()
+        if cls._atual is None or cls._atual.loop is not loop:
+            cls._atual = cls(loop)
+        return cls._atual
+
+    async def subscribe(self) -> tuple:
+        async with self.lock:
+            if self.task is None:
+                ultimo = await EventoService.visiveis().aaggregate(ultimo=Max("id"))
+                self.cursor = ultimo["ultimo"] or 0
+                self.task = asyncio.create_task(self.poll())
+
+            fila = asyncio.Queue(maxsize=self.MAX_PENDENTES)
+            self.assinantes.add(fila)
+            return fila, self.cursor
+
+    def unsubscribe(self, fila: asyncio.Queue):
+        self.assinantes.discard(fila)
+
+    async def poll(self):
+        try:
+            while self.assinantes:
+                eventos = [
+                    evento
+                    async for evento in EventoService.visiveis()
+                    .filter(id__gt=self.cursor)
+                    .order_by("id")
+                ]
+                for evento in eventos:
+                    for fila in self.assinantes:
+                        self.push(fila, evento)
+                if eventos:
+                    self.cursor = eventos[-1].id
+
+                await asyncio.sleep(self.INTERVALO_SEGUNDOS)
+        finally:
+            self.task = None
+
+    @staticmethod
+    def push(fila: asyncio.Queue, evento: EventoDisponibilidade):
+        try:
+            fila.put_nowait(evento)
+        except asyncio.QueueFull:
+            # a client this far behind gains nothing from the backlog
+            while not fila.empty():
+                fila.get_nowait()
+            fila.put_nowait(EventoDisponibilidade(id=evento.id, tipo=Tipo.RECARREGAR))
+
+    async def replay(self, ultimo_id: int, ate: int) -> AsyncIterator[EventoDisponibilidade]:
+        # events older than the retention window are gone; the client can't
+        # catch up from them and has to reload everything
+        primeiro = await EventoDisponibilidade.objects.aaggregate(primeiro=Min("id"))
+        if primeiro["primeiro"] is not None and primeiro["primeiro"] > ultimo_id + 1:
+            yield EventoDisponibilidade(id=ultimo_id, tipo=Tipo.RECARREGAR)
+
+        async for evento in EventoDisponibilidade.objects.filter(
+            id__gt=ultimo_id, id__lte=ate
+        ).order_by("id"):
+            yield evento
+
+    async def stream(
+        self, ultimo_id: Optional[int] = None, andar: Optional[int] = None
+    ) -> AsyncIterator[str]:
+        def relevante(evento: EventoDisponibilidade) -> bool:
+            return andar is None or evento.andar in (None, andar)
+
+        fila, cursor = await self.subscribe()
+        try:
+            yield f"retry: {self.RETRY_MS}\n\n"
+
+            if ultimo_id is not None:
+                async for evento in self.replay(ultimo_id, cursor):
+                    if relevante(evento):
+                        yield EventoService.format(evento)
+
+            while True:
+                try:
+                    evento = await asyncio.wait_for(
+                        fila.get(), timeout=self.HEARTBEAT_SEGUNDOS
+                    )
+                except asyncio.TimeoutError:
+                    # keeps proxies from closing an idle connection
+                    yield ": ping\n\n"
+                    continue
+
+                if ultimo_id is not None and evento.id <= ultimo_id:
+                    continue
+                if relevante(evento):
+                    yield EventoService.format(evento)
+        finally:
+            self.unsubscribe(fila)
@@ -0,0 +1,98 @@
+import csv
+import json
+from typing import AsyncIterator, Callable, Iterator, Optional, Tuple
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import QuerySet
+
+
+class Echo:
+    # csv.writer only needs write(); returning the line lets it be yielded
+    def write(self, value: str) -> str:
+        return value
+
+
+class ReservaExportService:
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+    FORMATOS = {
+        NDJSON: "application/x-ndjson",
+        CSV: "text/csv",
+    }
+
+    CHUNK_SIZE = 2000
+
+    CAMPOS = [
+        ("id", "id"),
+        ("data", "data"),
+        ("hora", "hora"),
+        ("hora_saida", "hora_saida"),
+        ("andar", "andar"),
+        ("numero_apartamento", "apartamento__numero"),
+        ("responsavel", "apartamento__responsavel"),
+        ("created_at", "created_at"),
+    ]
+
+    @staticmethod
+    def rows(queryset: QuerySet) -> Iterator[Tuple]:
+        # plain tuples from a chunked cursor: no model instances and no result
+        # cache, so memory stays flat whatever the number of rows
+        return (
+            queryset.order_by("data", "hora", "id")
+            .values_list(*(coluna for _, coluna in ReservaExportService.CAMPOS))
+            .iterator(chunk_size=ReservaExportService.CHUNK_SIZE)
+        )
+
+    @staticmethod
+    async def arows(queryset: QuerySet) -> AsyncIterator[Tuple]:
+        # values() rather than values_list(): the tuple iterable runs its
+        # query as soon as aiterator() builds it, which the async context
+        # refuses
+        colunas = [coluna for _, coluna in ReservaExportService.CAMPOS]
+        rows = (
+            queryset.order_by("data", "hora", "id")
+            .values(*colunas)
+            .aiterator(chunk_size=ReservaExportService.CHUNK_SIZE)
+        )
+        async for row in rows:
+            yield tuple(row[coluna] for coluna in colunas)
+
+    @staticmethod
+    def formatter(formato: str) -> Tuple[Optional[str], Callable[[Tuple], str]]:
+        # (header line, row -> line) for the format
+        if formato == ReservaExportService.CSV:
+            writer = csv.writer(Echo())
+            return (
+                writer.writerow([nome for nome, _ in ReservaExportService.CAMPOS]),
+                lambda row: writer.writerow(
+                    [valor.isoformat() if hasattr(valor, "isoformat") else valor for valor in row]
+                ),
+            )
+
+        nomes = [nome for nome, _ in ReservaExportService.CAMPOS]
+        return (
+            None,
+            lambda row: json.dumps(
+                dict(zip(nomes, row)), cls=DjangoJSONEncoder, ensure_ascii=False
+            )
+            + "\n",
+        )
+
+    @staticmethod
+    def lines(queryset: QuerySet, formato: str) -> Iterator[str]:
+        cabecalho, linha = ReservaExportService.formatter(formato)
+        if cabecalho:
+            yield cabecalho
+        for row in ReservaExportService.rows(queryset):
+            yield linha(row)
+
+    @staticmethod
+    async def alines(queryset: QuerySet, formato: str) -> AsyncIterator[str]:
+        # under ASGI django drains a sync iterator with sync_to_async(list)
+        # before sending anything, so the stream has to be async there
+        cabecalho, linha = ReservaExportService.formatter(formato)
+        if cabecalho:
+            yield cabecalho
+        async for row in ReservaExportService.arows(queryset):
+            yield linha(row)
@@ -0,0 +1,147 @@
+import secrets
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from apps.core.availability import AvailabilityService
+from apps.core.intervals import Intervalo
+from apps.core.models import CotaApartamento, Disponibilidade, ReservaTemporaria
+from apps.core.rules import RegrasReserva
+from apps.core.services import (
+    ApartamentoService,
+    ConfiguracaoService,
+    ReservaService,
+)
+from apps.core.signals import notify_changes
+
+
+class ReservaTemporariaService:
+    # earliest expiry among the live holds ("" when there are none), so the
+    # read path knows when a sweep is due without a query. it is rechecked
+    # against the database at least this often, which bounds how long a
+    # racing write can leave it stale
+    PROXIMA_EXPIRACAO_CACHE_KEY = "core:holds:proxima_expiracao"
+    PROXIMA_EXPIRACAO_TIMEOUT = 60
+
+    @staticmethod
+    def create(
+        data: date, hora: datetime.time, numero_apartamento: int, andar: int
+    ) -> ReservaTemporaria:
+        # validate_horario is left to the caller, like create_reserva
+        config = ConfiguracaoService.get_configuracao()
+        hora_saida = ReservaService.get_hora_saida(data, hora, andar)
+
+        apartamento_id = ApartamentoService.get_id(numero_apartamento)
+        if apartamento_id is None:
+            raise ReservaService.apartamento_nao_encontrado_error()
+
+        ReservaTemporariaService.sweep()
+
+        afetados = {(data, andar)}
+        with transaction.atomic():
+            # an apartment holds one slot at a time: asking for another hour
+            # gives the previous one back
+            anteriores = ReservaTemporaria.objects.filter(apartamento_id=apartamento_id)
+            afetados |= set(anteriores.values_list("data", "andar"))
+            anteriores.delete()
+
+            max_por_apartamento = config.quantidade_agendamento_por_apartamento
+            if CotaApartamento.objects.filter(
+                apartamento_id=apartamento_id,
+                data=data,
+                quantidade__gte=max_por_apartamento,
+            ).exists():
+                raise ReservaService.limite_apartamento_error(max_por_apartamento)
+
+            Disponibilidade.lock(data, andar)
+            intervalo = Intervalo.from_horas(hora, hora_saida)
+            vaga = RegrasReserva.load_index(data, andar).vaga_livre(
+                intervalo.inicio, intervalo.fim, config.capacidade_por_slot
+            )
+            if vaga is None:
+                raise ReservaService.slot_ocupado_error()
+
+            reserva_temporaria = ReservaTemporaria.objects.create(
+                token=secrets.token_urlsafe(24),
+                data=data,
+                hora=hora,
+                hora_saida=hora_saida,
+                andar=andar,
+                vaga=vaga,
+                apartamento_id=apartamento_id,
+                expira_em=timezone.now()
+                + timedelta(minutes=config.tempo_reserva_temporaria_minutos),
+            )
+            for dia, andar_afetado in afetados:
+                AvailabilityService.refresh_day(dia, andar_afetado)
+
+        notify_changes(afetados, ())
+        ReservaTemporariaService.schedule_sweep(reserva_temporaria.expira_em)
+        return reserva_temporaria
+
+    @staticmethod
+    def release(token: str) -> bool:
+        with transaction.atomic():
+            reserva_temporaria = (
+                ReservaTemporaria.objects.filter(token=token)
+                .values_list("data", "andar")
+                .first()
+            )
+            if reserva_temporaria is None:
+                return False
+
+            ReservaTemporaria.objects.filter(token=token).delete()
+            AvailabilityService.refresh_day(*reserva_temporaria)
+
+        notify_changes({reserva_temporaria}, ())
+        return True
+
+    @staticmethod
+    def sweep(agora: Optional[datetime] = None) -> int:
+        # one delete for every expired hold, then one refresh per floor-day
+        # they were holding seats on
+        expiradas = ReservaTemporaria.objects.filter(expira_em__lte=agora or timezone.now())
+        with transaction.atomic():
+            afetados = set(expiradas.values_list("data", "andar").distinct())
+            if not afetados:
+                return 0
+
+            removidas, _ = expiradas.delete()
+            for data, andar in afetados:
+                AvailabilityService.refresh_day(data, andar)
+
+        notify_changes(afetados, ())
+        return removidas
+
+    @staticmethod
+    def schedule_sweep(expira_em: Optional[datetime]):
+        proxima = cache.get(ReservaTemporariaService.PROXIMA_EXPIRACAO_CACHE_KEY)
+        if expira_em is not None and proxima and datetime.fromisoformat(proxima) <= expira_em:
+            return
+
+        cache.set(
+            ReservaTemporariaService.PROXIMA_EXPIRACAO_CACHE_KEY,
+            expira_em.isoformat() if expira_em is not None else "",
+            timeout=ReservaTemporariaService.PROXIMA_EXPIRACAO_TIMEOUT,
+        )
+
+    @staticmethod
+    def sweep_if_due() -> int:
+        # called on the availability read path: an abandoned hold gives its
+        # seat back on the first read after it expires, not on the next run
+        # of expirar_holds, and the ETags and cached responses follow
+        proxima = cache.get(ReservaTemporariaService.PROXIMA_EXPIRACAO_CACHE_KEY)
+        agora = timezone.now()
+        if proxima == "" or (proxima and datetime.fromisoformat(proxima) > agora):
+            return 0
+
+        removidas = ReservaTemporariaService.sweep(agora)
+        cache.delete(ReservaTemporariaService.PROXIMA_EXPIRACAO_CACHE_KEY)
+        ReservaTemporariaService.schedule_sweep(
+            ReservaTemporaria.objects.aggregate(proxima=Min("expira_em"))["proxima"]
+        )
+        return removidas
@@ -0,0 +1,169 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+class Medicao:
+    # costs of one request; the database wrapper and the render callback
+    # write here through the context variable, including from the worker
+    # threads async views use for the ORM
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.sql_consultas = 0
+        self.sql_segundos = 0.0
+        self.serializacao_segundos = 0.0
+        self.total_segundos = 0.0
+
+    def server_timing(self) -> str:
+        return ", ".join(
+            [
+                f'sql;dur={self.sql_segundos * 1000:.2f};desc="{self.sql_consultas} consultas"',
+                f"serializacao;dur={self.serializacao_segundos * 1000:.2f}",
+                f"total;dur={self.total_segundos * 1000:.2f}",
+            ]
+        )
+
+
+_medicao: ContextVar[Optional[Medicao]] = ContextVar("medicao_requisicao", default=None)
+
+
+def medir_sql(execute, sql, params, many, context):
+    medicao = _medicao.get()
+    if medicao is None:
+        return execute(sql, params, many, context)
+
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicao.sql_consultas += 1
+        medicao.sql_segundos += time.perf_counter() - inicio
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    # execute_wrappers outlives reconnects, so install the wrapper only once
+    if medir_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, medir_sql)
+
+
+class Histograma:
+    def __init__(self, limites: Tuple[float, ...]):
+        self.limites = limites
+        self.contagens = [0] * (len(limites) + 1)
+        self.soma = 0.0
+
+    def observe(self, valor: float):
+        self.contagens[bisect_left(self.limites, valor)] += 1
+        self.soma += valor
+
+    def to_dict(self) -> dict:
+        # cumulative buckets, like Prometheus' "le"
+        buckets = {}
+        acumulado = 0
+        for limite, contagem in zip((*self.limites, "+Inf"), self.contagens):
+            acumulado += contagem
+            buckets[str(limite)] = acumulado
+        return {"quantidade": acumulado, "soma": round(self.soma, 3), "buckets": buckets}
+
+
+class MetricasService:
+    # aggregates live in the process memory: each worker reports its own
+    LIMITES_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+    LIMITES_CONSULTAS = (0, 1, 2, 3, 5, 10, 20, 50)
+
+    _lock = threading.Lock()
+    _views: Dict[str, Dict[str, Histograma]] = {}
+
+    @staticmethod
+    def record(view: str, medicao: Medicao):
+        observacoes = (
+            ("sql_consultas", MetricasService.LIMITES_CONSULTAS, medicao.sql_consultas),
+            ("sql_ms", MetricasService.LIMITES_MS, medicao.sql_segundos * 1000),
+            (
+                "serializacao_ms",
+                MetricasService.LIMITES_MS,
+                medicao.serializacao_segundos * 1000,
+            ),
+            ("total_ms", MetricasService.LIMITES_MS, medicao.total_segundos * 1000),
+        )
+        with MetricasService._lock:
+            histogramas = MetricasService._views.setdefault(view, {})
+            for nome, limites, valor in observacoes:
+                histogramas.setdefault(nome, Histograma(limites)).observe(valor)
+
+    @staticmethod
+    def stats() -> dict:
+        with MetricasService._lock:
+            return {
+                view: {nome: histograma.to_dict() for nome, histograma in histogramas.items()}
+                for view, histogramas in sorted(MetricasService._views.items())
+            }
+
+    @staticmethod
+    def reset():
+        with MetricasService._lock:
+            MetricasService._views.clear()
+
+
+class MetricasMiddleware:
+    # must come first in MIDDLEWARE so the wall time covers the whole stack
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        medicao = Medicao()
+        token = _medicao.set(medicao)
+        try:
+            response = self.get_response(request)
+        finally:
+            _medicao.reset(token)
+        return self.finish(request, response, medicao)
+
+    async def __acall__(self, request):
+        medicao = Medicao()
+        token = _medicao.set(medicao)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _medicao.reset(token)
+        return self.finish(request, response, medicao)
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered right after this hook; the post-render
+        # callback closes the serialization timer
+        medicao = _medicao.get()
+        if medicao is not None:
+            inicio = time.perf_counter()
+
+            def parar(response):
+                medicao.serializacao_segundos += time.perf_counter() - inicio
+
+            response.add_post_render_callback(parar)
+        return response
+
+    def finish(self, request, response, medicao: Medicao):
+        # streamed bodies are produced after this point, so for them the
+        # numbers only cover the time until the first byte
+        medicao.total_segundos = time.perf_counter() - medicao.inicio
+        response["Server-Timing"] = medicao.server_timing()
+
+        # unresolved paths would give every scanner its own histogram
+        resolver_match = getattr(request, "resolver_match", None)
+        if resolver_match is not None and resolver_match.url_name:
+            MetricasService.record(resolver_match.url_name, medicao)
+        return response
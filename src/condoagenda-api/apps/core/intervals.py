@@ -0,0 +1,80 @@
+from bisect import bisect_left, bisect_right
+from datetime import time
+from typing import Iterable, List, NamedTuple, Optional
+
+MINUTOS_POR_DIA = 24 * 60
+
+
+def minutos(hora: time) -> int:
+    return hora.hour * 60 + hora.minute
+
+
+class Intervalo(NamedTuple):
+    inicio: int
+    fim: int
+    vaga: int
+    chave: Optional[int] = None
+
+    @staticmethod
+    def from_horas(hora: time, hora_saida: time, vaga: int = 0, chave: Optional[int] = None):
+        inicio, fim = minutos(hora), minutos(hora_saida)
+        if fim <= inicio:
+            # reservations that end past midnight
+            fim += MINUTOS_POR_DIA
+        return Intervalo(inicio, fim, vaga, chave)
+
+
+class IntervalIndex:
+    # reservations of one floor-day as half-open [inicio, fim) minute ranges,
+    # kept sorted by start. no interval is longer than the longest one seen,
+    # so anything overlapping [inicio, fim) starts within
+    # (inicio - maior, fim): two bisects plus the overlapping rows themselves
+
+    def __init__(self, intervalos: Iterable[Intervalo] = ()):
+        self.itens: List[Intervalo] = sorted(intervalos)
+        self.inicios: List[int] = [intervalo.inicio for intervalo in self.itens]
+        self.maior = max((i.fim - i.inicio for i in self.itens), default=0)
+
+    def __len__(self) -> int:
+        return len(self.itens)
+
+    def add(self, intervalo: Intervalo):
+        posicao = bisect_right(self.inicios, intervalo.inicio)
+        self.inicios.insert(posicao, intervalo.inicio)
+        self.itens.insert(posicao, intervalo)
+        self.maior = max(self.maior, intervalo.fim - intervalo.inicio)
+
+    def remove(self, chave: int, inicio: int) -> Optional[Intervalo]:
+        posicao = bisect_left(self.inicios, inicio)
+        while posicao < len(self.itens) and self.inicios[posicao] == inicio:
+            if self.itens[posicao].chave == chave:
+                self.inicios.pop(posicao)
+                return self.itens.pop(posicao)
+            posicao += 1
+        return None
+
+    def overlapping(self, inicio: int, fim: int) -> List[Intervalo]:
+        primeiro = bisect_right(self.inicios, inicio - self.maior)
+        ultimo = bisect_left(self.inicios, fim)
+        return [
+            intervalo
+            for intervalo in self.itens[primeiro:ultimo]
+            if intervalo.fim > inicio
+        ]
+
+    def vaga_livre(
+        self, inicio: int, fim: int, capacidade: Optional[int], ignorar: Optional[int] = None
+    ) -> Optional[int]:
+        # lowest seat no overlapping interval holds; None when all
+        # `capacidade` seats are taken (no limit when capacidade is None)
+        ocupadas = {
+            intervalo.vaga
+            for intervalo in self.overlapping(inicio, fim)
+            if ignorar is None or intervalo.chave != ignorar
+        }
+        vaga = 0
+        while vaga in ocupadas:
+            vaga += 1
+        if capacidade is not None and vaga >= capacidade:
+            return None
+        return vaga
@@ -0,0 +1,344 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from io import BytesIO
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from apps.core.availability import AvailabilityService
+from apps.core.holds import ReservaTemporariaService
+from apps.core.models import Apartamento, CotaApartamento, Reserva
+from apps.core.services import ConfiguracaoService
+
+# sends one request and returns its status code
+Requisitar = Callable[[str], Awaitable[int]]
+
+
+def percentil(valores: List[float], p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    posicao = min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[posicao]
+
+
+class Cenario(NamedTuple):
+    nome: str
+    metodo: str = "GET"
+    params: Optional[dict] = None
+    corpo: Optional[dict] = None
+    # runs inside the request's transaction; returns the url kwargs
+    preparar: Optional[Callable[[], dict]] = None
+
+
+class BenchmarkService:
+    # drives the project's WSGI and ASGI applications in process, with
+    # `concorrencia` clients each keeping one request in flight; there is no
+    # socket in between, so the numbers compare the two request paths rather
+    # than a deployment. it uses the test client, so only the benchmark
+    # commands import it
+
+    @staticmethod
+    def host() -> str:
+        for host in settings.ALLOWED_HOSTS:
+            if host != "*":
+                return host.lstrip(".")
+        return "localhost"
+
+    @staticmethod
+    def allow_host():
+        # requests never leave the process, so the host check must not turn
+        # them into 400s when ALLOWED_HOSTS is empty outside DEBUG
+        return override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, BenchmarkService.host()]
+        )
+
+    @staticmethod
+    def summarize(latencias: List[float], status: List[int], duracao: float) -> dict:
+        erros = sum(1 for codigo in status if codigo >= 400)
+        return {
+            "requisicoes": len(latencias),
+            "erros": erros,
+            "rps": round(len(latencias) / duracao, 1) if duracao else 0.0,
+            "p50_ms": round(percentil(latencias, 50) * 1000, 2),
+            "p90_ms": round(percentil(latencias, 90) * 1000, 2),
+            "p99_ms": round(percentil(latencias, 99) * 1000, 2),
+            "max_ms": round(max(latencias, default=0) * 1000, 2),
+        }
+
+    @staticmethod
+    async def run(
+        requisitar: Requisitar, paths: List[str], concorrencia: int, total: int
+    ) -> dict:
+        latencias: List[float] = []
+        status: List[int] = []
+        proxima = iter(range(total))
+
+        async def cliente():
+            for indice in proxima:
+                inicio = time.perf_counter()
+                status.append(await requisitar(paths[indice % len(paths)]))
+                latencias.append(time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(cliente() for _ in range(concorrencia)))
+        return BenchmarkService.summarize(latencias, status, time.perf_counter() - inicio)
+
+    @staticmethod
+    def asgi_requester(application) -> Requisitar:
+        host = BenchmarkService.host().encode()
+
+        async def requisitar(path: str) -> int:
+            url = urlsplit(path)
+            scope = {
+                "type": "http",
+                "asgi": {"version": "3.0"},
+                "http_version": "1.1",
+                "method": "GET",
+                "scheme": "http",
+                "path": url.path,
+                "raw_path": url.path.encode(),
+                "query_string": url.query.encode(),
+                "headers": [(b"host", host)],
+                "client": ("127.0.0.1", 0),
+                "server": (host.decode(), 80),
+            }
+            resposta = {}
+            corpo_enviado = asyncio.Event()
+
+            async def receive():
+                # the client never disconnects: after the empty body Django
+                # keeps waiting here until the response is done
+                if corpo_enviado.is_set():
+                    await asyncio.Future()
+                corpo_enviado.set()
+                return {"type": "http.request", "body": b"", "more_body": False}
+
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    resposta["status"] = message["status"]
+
+            await application(scope, receive, send)
+            return resposta.get("status", 500)
+
+        return requisitar
+
+    @staticmethod
+    def wsgi_requester(application, executor: ThreadPoolExecutor) -> Requisitar:
+        # requests queue for the worker threads like they would for a
+        # threaded WSGI server, so the backlog counts in the latency
+        host = BenchmarkService.host()
+
+        def chamar(path: str) -> int:
+            url = urlsplit(path)
+            environ = {
+                "REQUEST_METHOD": "GET",
+                "PATH_INFO": url.path,
+                "QUERY_STRING": url.query,
+                "SERVER_NAME": host,
+                "SERVER_PORT": "80",
+                "SERVER_PROTOCOL": "HTTP/1.1",
+                "HTTP_HOST": host,
+                "REMOTE_ADDR": "127.0.0.1",
+                "wsgi.version": (1, 0),
+                "wsgi.url_scheme": "http",
+                "wsgi.input": BytesIO(),
+                "wsgi.errors": BytesIO(),
+                "wsgi.multithread": True,
+                "wsgi.multiprocess": False,
+                "wsgi.run_once": False,
+            }
+            resposta = {}
+
+            def start_response(status, headers, exc_info=None):
+                resposta["status"] = int(status.split(" ", 1)[0])
+
+            corpo = application(environ, start_response)
+            try:
+                for _ in corpo:
+                    pass
+            finally:
+                if hasattr(corpo, "close"):
+                    corpo.close()
+            return resposta.get("status", 500)
+
+        async def requisitar(path: str) -> int:
+            return await asyncio.get_running_loop().run_in_executor(executor, chamar, path)
+
+        return requisitar
+
+    @staticmethod
+    def compare(
+        paths: List[str],
+        concorrencia: int,
+        total: int,
+        threads_wsgi: int,
+        aquecimento: Optional[int] = None,
+    ) -> Dict[str, dict]:
+        from django.core.asgi import get_asgi_application
+        from django.core.servers.basehttp import get_internal_wsgi_application
+
+        aquecimento = len(paths) if aquecimento is None else aquecimento
+        resultados = {}
+
+        with BenchmarkService.allow_host(), ThreadPoolExecutor(
+            max_workers=threads_wsgi
+        ) as executor:
+            wsgi = BenchmarkService.wsgi_requester(get_internal_wsgi_application(), executor)
+            asgi = BenchmarkService.asgi_requester(get_asgi_application())
+
+            for nome, requisitar in (("wsgi", wsgi), ("asgi", asgi)):
+                # fills the process and response caches before measuring
+                asyncio.run(BenchmarkService.run(requisitar, paths, 1, aquecimento))
+                resultados[nome] = asyncio.run(
+                    BenchmarkService.run(requisitar, paths, concorrencia, total)
+                )
+
+        return resultados
+
+    @staticmethod
+    def find_free_slot() -> Optional[dict]:
+        # a bookable slot of the current week plus an apartment with quota
+        # left that day, so the write endpoints take their success path
+        limite = ConfiguracaoService.get_configuracao().quantidade_agendamento_por_apartamento
+        for dia in AvailabilityService.get_week_dates():
+            if dia < date.today():
+                continue
+            for andar in ConfiguracaoService.get_regras().templates:
+                slot = next(
+                    (
+                        slot
+                        for slot in AvailabilityService.get_slots(dia, andar)
+                        if slot["available"]
+                    ),
+                    None,
+                )
+                numero = (
+                    Apartamento.objects.exclude(
+                        id__in=CotaApartamento.objects.filter(
+                            data=dia, quantidade__gte=limite
+                        ).values("apartamento_id")
+                    )
+                    .values_list("numero", flat=True)
+                    .first()
+                )
+                if slot is not None and numero is not None:
+                    return {
+                        "data": dia.isoformat(),
+                        "hora": slot["start"],
+                        "numero_apartamento": numero,
+                        "andar": andar,
+                    }
+        return None
+
+    @staticmethod
+    def scenarios() -> List[Cenario]:
+        hoje = date.today()
+        periodo = {"from": str(hoje - timedelta(days=27)), "to": str(hoje)}
+        numero = Apartamento.objects.order_by("numero").values_list("numero", flat=True).first()
+        reserva_id = (
+            Reserva.objects.filter(data__gte=hoje).order_by("data").values_list("id", flat=True).first()
+        )
+        livre = BenchmarkService.find_free_slot() or {}
+
+        def hold() -> dict:
+            if not livre:
+                # the week is full: measures the not-found path instead
+                return {"token": "-"}
+            reserva_temporaria = ReservaTemporariaService.create(
+                date.fromisoformat(livre["data"]),
+                datetime.strptime(livre["hora"], "%H:%M").time(),
+                livre["numero_apartamento"],
+                livre["andar"],
+            )
+            return {"token": reserva_temporaria.token}
+
+        return [
+            Cenario("criar-reserva", "POST", corpo=livre),
+            Cenario(
+                "lote-reservas",
+                "POST",
+                corpo={
+                    "operacoes": [
+                        {"op": "criar", **livre},
+                        *([{"op": "cancelar", "id": reserva_id}] if reserva_id else []),
+                    ]
+                },
+            ),
+            Cenario("criar-reserva-temporaria", "POST", corpo=livre),
+            Cenario("liberar-reserva-temporaria", "DELETE", preparar=hold),
+            Cenario("listar-slots-disponiveis", params={"data": str(hoje), "andar": 0}),
+            Cenario("listar-datas-disponiveis", params={"andar": 0}),
+            Cenario("calendario", params=periodo),
+            Cenario("listar-minhas-reservas", params={"numero_apartamento": numero}),
+            Cenario("exportar-reservas", params=periodo),
+            Cenario("metricas-ocupacao", params=periodo),
+            Cenario("metricas-cache"),
+            Cenario("metricas-requisicoes"),
+        ]
+
+    @staticmethod
+    def request(client: Client, cenario: Cenario) -> tuple:
+        # every request runs in a transaction that is rolled back, so write
+        # endpoints can be repeated against the same data
+        with transaction.atomic():
+            kwargs = cenario.preparar() if cenario.preparar else {}
+            path = reverse(cenario.nome, kwargs=kwargs or None)
+
+            inicio = time.perf_counter()
+            with CaptureQueriesContext(connection) as consultas:
+                if cenario.metodo == "GET":
+                    response = client.get(path, cenario.params)
+                else:
+                    response = client.generic(
+                        cenario.metodo,
+                        path,
+                        json.dumps(cenario.corpo) if cenario.corpo is not None else "",
+                        content_type="application/json",
+                    )
+                if response.streaming:
+                    for _ in response.streaming_content:
+                        pass
+            duracao = time.perf_counter() - inicio
+
+            transaction.set_rollback(True)
+
+        return duracao, len(consultas), response.status_code
+
+    @staticmethod
+    def measure(cenario: Cenario, repeticoes: int) -> dict:
+        client = Client(HTTP_HOST=BenchmarkService.host(), raise_request_exception=False)
+
+        # the first request pays for the configuration and the response
+        # cache; the others show the steady state
+        ConfiguracaoService.invalidate()
+        with BenchmarkService.allow_host():
+            primeira, consultas_primeira, status_primeira = BenchmarkService.request(
+                client, cenario
+            )
+
+            latencias, status, consultas = [], [], []
+            inicio = time.perf_counter()
+            for _ in range(repeticoes):
+                duracao, quantidade, codigo = BenchmarkService.request(client, cenario)
+                latencias.append(duracao)
+                consultas.append(quantidade)
+                status.append(codigo)
+            duracao_total = time.perf_counter() - inicio
+
+        return {
+            "metodo": cenario.metodo,
+            "status": status_primeira,
+            "primeira_ms": round(primeira * 1000, 2),
+            "consultas_primeira": consultas_primeira,
+            "consultas": max(consultas, default=0),
+            **BenchmarkService.summarize(latencias, status, duracao_total),
+        }
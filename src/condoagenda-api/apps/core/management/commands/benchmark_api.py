@@ -0,0 +1,101 @@
+import json
+import subprocess
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.core.api.urls import urlpatterns
+from apps.core.management.benchmark import BenchmarkService
+from apps.core.models import Apartamento, Reserva
+
+# endpoints that can't be measured request by request
+IGNORADOS = {
+    "eventos-disponibilidade": "stream contínuo, só roda sob ASGI",
+}
+
+COLUNAS = ("status", "primeira_ms", "p50_ms", "p99_ms", "consultas_primeira", "consultas")
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede todos os endpoints da API contra o banco configurado em "
+        "DATABASE_URL (rode seed_reservas antes) e salva percentis de latência "
+        "e contagem de consultas em JSON para comparar entre commits"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeticoes", type=int, default=50)
+        parser.add_argument("--output", help="Arquivo JSON com os resultados")
+        parser.add_argument(
+            "--baseline", help="JSON de uma execução anterior para comparar"
+        )
+
+    def get_commit(self):
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"],
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def write_table(self, endpoints: dict, baseline: dict):
+        self.stdout.write(
+            f"{'endpoint':<28}" + "".join(f"{coluna:>20}" for coluna in COLUNAS)
+        )
+        for nome, resultado in endpoints.items():
+            anterior = baseline.get(nome)
+            celulas = []
+            for coluna in COLUNAS:
+                texto = str(resultado[coluna])
+                if anterior is not None and coluna != "status" and coluna in anterior:
+                    texto += f" ({resultado[coluna] - anterior[coluna]:+g})"
+                celulas.append(f"{texto:>20}")
+            self.stdout.write(f"{nome:<28}" + "".join(celulas))
+
+    def handle(self, *args, **options):
+        if options["repeticoes"] < 1:
+            raise CommandError("--repeticoes deve ser positivo")
+
+        cenarios = BenchmarkService.scenarios()
+
+        # a new endpoint must get a scenario (or a reason to be skipped)
+        faltando = {pattern.name for pattern in urlpatterns} - {
+            cenario.nome for cenario in cenarios
+        } - IGNORADOS.keys()
+        if faltando:
+            raise CommandError(f"Endpoint(s) sem cenário: {', '.join(sorted(faltando))}")
+
+        baseline = {}
+        if options["baseline"]:
+            with open(options["baseline"]) as arquivo:
+                baseline = json.load(arquivo)["endpoints"]
+
+        endpoints = {}
+        for cenario in cenarios:
+            endpoints[cenario.nome] = BenchmarkService.measure(cenario, options["repeticoes"])
+
+        self.write_table(endpoints, baseline)
+
+        if options["output"]:
+            with open(options["output"], "w") as arquivo:
+                json.dump(
+                    {
+                        "commit": self.get_commit(),
+                        "banco": connection.vendor,
+                        "executado_em": datetime.now().isoformat(timespec="seconds"),
+                        "repeticoes": options["repeticoes"],
+                        "dados": {
+                            "apartamentos": Apartamento.objects.count(),
+                            "reservas": Reserva.objects.count(),
+                        },
+                        "endpoints": endpoints,
+                        "ignorados": IGNORADOS,
+                    },
+                    arquivo,
+                    indent=2,
+                )
+            self.stdout.write(self.style.SUCCESS(f"Resultados salvos em {options['output']}"))
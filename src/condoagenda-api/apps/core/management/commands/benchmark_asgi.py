@@ -0,0 +1,79 @@
+import json
+from datetime import date
+from urllib.parse import urlencode
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from apps.core.management.benchmark import BenchmarkService
+from apps.core.models import Apartamento
+
+COLUNAS = ("requisicoes", "erros", "rps", "p50_ms", "p90_ms", "p99_ms", "max_ms")
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara WSGI e ASGI nos endpoints de leitura com muitas conexões "
+        "simultâneas. No ASGI cada requisição abre sua própria conexão com o "
+        "banco: no Postgres a concorrência precisa caber em max_connections"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concorrencia", type=int, default=500)
+        parser.add_argument("--requisicoes", type=int, default=5000)
+        parser.add_argument("--andar", type=int, default=0)
+        parser.add_argument(
+            "--wsgi-threads",
+            type=int,
+            default=32,
+            help="Threads do servidor WSGI simulado",
+        )
+        parser.add_argument("--output", help="Arquivo JSON com os resultados")
+
+    def get_paths(self, andar: int) -> list:
+        paths = [
+            f"{reverse('listar-slots-disponiveis')}?"
+            + urlencode({"data": date.today().isoformat(), "andar": andar}),
+            f"{reverse('listar-datas-disponiveis')}?" + urlencode({"andar": andar}),
+        ]
+
+        numero = Apartamento.objects.order_by("numero").values_list("numero", flat=True).first()
+        if numero is not None:
+            paths.append(
+                f"{reverse('listar-minhas-reservas')}?"
+                + urlencode({"numero_apartamento": numero})
+            )
+        return paths
+
+    def handle(self, *args, **options):
+        if options["concorrencia"] < 1 or options["requisicoes"] < 1:
+            raise CommandError("--concorrencia e --requisicoes devem ser positivos")
+
+        paths = self.get_paths(options["andar"])
+        resultados = BenchmarkService.compare(
+            paths,
+            options["concorrencia"],
+            options["requisicoes"],
+            options["wsgi_threads"],
+        )
+
+        self.stdout.write(" ".join(f"{coluna:>12}" for coluna in ("", *COLUNAS)))
+        for nome, resumo in resultados.items():
+            self.stdout.write(
+                " ".join(
+                    f"{valor:>12}" for valor in (nome, *(resumo[c] for c in COLUNAS))
+                )
+            )
+
+        if options["output"]:
+            with open(options["output"], "w") as arquivo:
+                json.dump(
+                    {
+                        "paths": paths,
+                        "concorrencia": options["concorrencia"],
+                        "resultados": resultados,
+                    },
+                    arquivo,
+                    indent=2,
+                )
+            self.stdout.write(self.style.SUCCESS(f"Resultados salvos em {options['output']}"))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from apps.core.holds import ReservaTemporariaService
+
+
+class Command(BaseCommand):
+    help = "Remove as reservas temporárias expiradas e libera seus horários"
+
+    def handle(self, *args, **options):
+        removidas = ReservaTemporariaService.sweep()
+        self.stdout.write(
+            self.style.SUCCESS(f"{removidas} reserva(s) temporária(s) expirada(s) removida(s)")
+        )
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.api.filters import ExportarReservasFilter
+from apps.core.export import ReservaExportService
+from apps.core.models import Reserva
+
+
+class Command(BaseCommand):
+    help = "Exporta as reservas em NDJSON ou CSV, linha a linha"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--formato",
+            choices=list(ReservaExportService.FORMATOS),
+            default=ReservaExportService.NDJSON,
+        )
+        parser.add_argument("--from", dest="inicio", help="Data inicial (AAAA-MM-DD)")
+        parser.add_argument("--to", dest="fim", help="Data final (AAAA-MM-DD)")
+        parser.add_argument("--andar", help="Andar (0 = térreo, 1 = 1º andar)")
+        parser.add_argument(
+            "--output", "-o", help="Arquivo de saída (padrão: saída padrão)"
+        )
+
+    def handle(self, *args, **options):
+        params = {
+            "from": options["inicio"],
+            "to": options["fim"],
+            "andar": options["andar"],
+        }
+        filterset = ExportarReservasFilter(
+            {key: value for key, value in params.items() if value is not None},
+            queryset=Reserva.objects.all(),
+        )
+        if not filterset.is_valid():
+            raise CommandError(filterset.errors.as_text())
+
+        formato = options["formato"]
+        lines = ReservaExportService.lines(filterset.qs, formato)
+
+        if not options["output"]:
+            for line in lines:
+                self.stdout.write(line, ending="")
+            return
+
+        total = 0
+        with open(options["output"], "w", encoding="utf-8", newline="") as arquivo:
+            for line in lines:
+                arquivo.write(line)
+                total += 1
+
+        # the csv header is not a reservation
+        if formato == ReservaExportService.CSV:
+            total -= 1
+        self.stderr.write(self.style.SUCCESS(f"{total} reserva(s) exportada(s)"))
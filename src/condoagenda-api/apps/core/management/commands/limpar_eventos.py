@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.core.events import EventoService
+
+
+class Command(BaseCommand):
+    help = "Remove eventos de disponibilidade mais antigos que o período de retenção"
+
+    def handle(self, *args, **options):
+        removidos = EventoService.purge()
+        self.stdout.write(self.style.SUCCESS(f"{removidos} evento(s) removido(s)"))
@@ -0,0 +1,128 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+
+from apps.core.availability import AvailabilityService
+from apps.core.models import CotaApartamento, Disponibilidade, OcupacaoSlot, Reserva
+from apps.core.rules import RegrasReserva
+from apps.core.services import ConfiguracaoService
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstrói a tabela de disponibilidade e os contadores de ocupação "
+        "a partir das reservas"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Apenas compara as tabelas com as reservas, sem alterá-las",
+        )
+
+    def compute_expected(self) -> dict:
+        ocupacoes = {
+            (item["data"], item["andar"], item["hora"]): item["quantidade"]
+            for item in Reserva.objects.order_by()
+            .values("data", "andar", "hora")
+            .annotate(quantidade=Count("id"))
+        }
+        cotas = {
+            (item["apartamento_id"], item["data"]): item["quantidade"]
+            for item in Reserva.objects.order_by()
+            .values("apartamento_id", "data")
+            .annotate(quantidade=Count("id"))
+        }
+        ocupados = AvailabilityService.compute_ocupados(
+            RegrasReserva.rows(chunk_size=2000),
+            ConfiguracaoService.get_regras(),
+        )
+
+        return {
+            "ocupacao": ocupacoes,
+            "cota": cotas,
+            "disponibilidade": {key: bits for key, bits in ocupados.items() if bits},
+        }
+
+    def load_current(self) -> dict:
+        return {
+            "ocupacao": {
+                (data, andar, hora): quantidade
+                for data, andar, hora, quantidade in OcupacaoSlot.objects.filter(
+                    quantidade__gt=0
+                ).values_list("data", "andar", "hora", "quantidade")
+            },
+            "cota": {
+                (apartamento_id, data): quantidade
+                for apartamento_id, data, quantidade in CotaApartamento.objects.filter(
+                    quantidade__gt=0
+                ).values_list("apartamento_id", "data", "quantidade")
+            },
+            "disponibilidade": {
+                (data, andar): ocupados
+                for data, andar, ocupados in Disponibilidade.objects.filter(
+                    ocupados__gt=0
+                ).values_list("data", "andar", "ocupados")
+            },
+        }
+
+    def compare(self, expected: dict) -> int:
+        current = self.load_current()
+
+        divergencias = 0
+        for tabela, esperados in expected.items():
+            atuais = current[tabela]
+            for key in esperados.keys() | atuais.keys():
+                esperado = esperados.get(key, 0)
+                atual = atuais.get(key, 0)
+                if esperado != atual:
+                    divergencias += 1
+                    self.stdout.write(
+                        self.style.WARNING(
+                            f"{tabela} {key}: esperado {esperado}, encontrado {atual}"
+                        )
+                    )
+
+        return divergencias
+
+    def handle(self, *args, **options):
+        expected = self.compute_expected()
+
+        if options["check"]:
+            divergencias = self.compare(expected)
+            if divergencias:
+                raise CommandError(
+                    f"{divergencias} registro(s) de disponibilidade divergente(s)"
+                )
+            self.stdout.write(self.style.SUCCESS("Disponibilidade consistente"))
+            return
+
+        with transaction.atomic():
+            OcupacaoSlot.objects.all().delete()
+            OcupacaoSlot.objects.bulk_create(
+                [
+                    OcupacaoSlot(data=data, andar=andar, hora=hora, quantidade=quantidade)
+                    for (data, andar, hora), quantidade in expected["ocupacao"].items()
+                ],
+                batch_size=1000,
+            )
+
+            CotaApartamento.objects.all().delete()
+            CotaApartamento.objects.bulk_create(
+                [
+                    CotaApartamento(
+                        apartamento_id=apartamento_id, data=data, quantidade=quantidade
+                    )
+                    for (apartamento_id, data), quantidade in expected["cota"].items()
+                ],
+                batch_size=1000,
+            )
+
+            AvailabilityService.rebuild_ocupados()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Disponibilidade reconstruída: {len(expected['disponibilidade'])} registro(s)"
+            )
+        )
@@ -0,0 +1,166 @@
+import random
+from collections import Counter
+from datetime import date, timedelta
+from itertools import islice
+from typing import Dict, Iterator, List
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.core.intervals import Intervalo, IntervalIndex
+from apps.core.models import Andar, Apartamento, CotaApartamento, Reserva
+from apps.core.rules import RegrasReserva
+from apps.core.services import ApartamentoService, ConfiguracaoService, VersionService
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera apartamentos e reservas em massa (bulk_create) para testes de "
+        "carga, respeitando capacidade, cotas e datas bloqueadas"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--apartamentos", type=int, default=200)
+        parser.add_argument(
+            "--andares",
+            type=int,
+            nargs="+",
+            choices=Andar.values,
+            default=Andar.values,
+        )
+        parser.add_argument(
+            "--anos", type=float, default=1, help="Anos de histórico até hoje"
+        )
+        parser.add_argument(
+            "--dias-futuros", type=int, default=7, help="Dias reservados a partir de hoje"
+        )
+        parser.add_argument(
+            "--ocupacao",
+            type=float,
+            default=0.6,
+            help="Chance de cada vaga de cada slot estar reservada (0 a 1)",
+        )
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def create_apartamentos(self, quantidade: int) -> List[int]:
+        # 101..110, 201..210, ...: ten apartments per building floor
+        numeros = [(n // 10 + 1) * 100 + n % 10 + 1 for n in range(quantidade)]
+        Apartamento.objects.bulk_create(
+            [
+                Apartamento(numero=numero, responsavel=f"Morador {numero}")
+                for numero in numeros
+            ],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+        ApartamentoService.invalidate()
+        return list(
+            Apartamento.objects.filter(numero__in=numeros)
+            .order_by("numero")
+            .values_list("id", flat=True)
+        )
+
+    def generate(
+        self,
+        apartamento_ids: List[int],
+        andares: List[int],
+        inicio: date,
+        fim: date,
+        ocupacao: float,
+        rng: random.Random,
+    ) -> Iterator[Reserva]:
+        regras = ConfiguracaoService.get_regras()
+        limite = regras.configuracao.quantidade_agendamento_por_apartamento
+        hoje = date.today()
+
+        # existing reservations keep their seats and quota
+        indexes = RegrasReserva.build_indexes(
+            RegrasReserva.rows(chunk_size=2000, data__range=(inicio, fim))
+        )
+        cotas: Dict[date, Counter] = {}
+        for apartamento_id, data, quantidade in CotaApartamento.objects.filter(
+            data__range=(inicio, fim)
+        ).values_list("apartamento_id", "data", "quantidade"):
+            cotas.setdefault(data, Counter())[apartamento_id] = quantidade
+
+        dia = inicio
+        while dia <= fim:
+            cota = cotas.pop(dia, Counter())
+            for andar in andares:
+                if regras.bloqueio(dia, andar) is not None:
+                    continue
+
+                index = indexes.pop((dia, andar), None) or IntervalIndex()
+                for slot in regras.template(andar).reservaveis:
+                    for _ in range(regras.capacidade):
+                        if rng.random() >= ocupacao:
+                            continue
+                        vaga = index.vaga_livre(slot.inicio_min, slot.fim_min, regras.capacidade)
+                        apartamento_id = rng.choice(apartamento_ids)
+                        if vaga is None or cota[apartamento_id] >= limite:
+                            continue
+
+                        index.add(Intervalo(slot.inicio_min, slot.fim_min, vaga))
+                        cota[apartamento_id] += 1
+                        passado = dia < hoje
+                        yield Reserva(
+                            data=dia,
+                            hora=slot.inicio,
+                            hora_saida=slot.fim,
+                            apartamento_id=apartamento_id,
+                            andar=andar,
+                            vaga=vaga,
+                            phone_number=f"55119{rng.randrange(10**8):08d}",
+                            # fake numbers: never queued for a reminder
+                            enviar_lembrete=False,
+                            lembrete_entrada_enviado=passado,
+                            lembrete_saida_enviado=passado,
+                        )
+            dia += timedelta(days=1)
+
+    def handle(self, *args, **options):
+        if options["apartamentos"] < 1:
+            raise CommandError("--apartamentos deve ser positivo")
+        if not 0 <= options["ocupacao"] <= 1:
+            raise CommandError("--ocupacao deve estar entre 0 e 1")
+
+        hoje = date.today()
+        inicio = hoje - timedelta(days=round(365 * options["anos"]))
+        fim = hoje + timedelta(days=max(options["dias_futuros"] - 1, 0))
+        rng = random.Random(options["seed"])
+
+        with transaction.atomic():
+            apartamento_ids = self.create_apartamentos(options["apartamentos"])
+            reservas = self.generate(
+                apartamento_ids,
+                sorted(set(options["andares"])),
+                inicio,
+                fim,
+                options["ocupacao"],
+                rng,
+            )
+
+            total = 0
+            while lote := list(islice(reservas, options["batch_size"])):
+                # bulk_create skips the model signals: counters and
+                # availability are rebuilt once below. reservas_criadas still
+                # fires, and the outbox leaves out rows with enviar_lembrete off
+                Reserva.objects.bulk_create(lote)
+                total += len(lote)
+                self.stdout.write(f"{total} reserva(s) inserida(s)...")
+
+            call_command("rebuild_disponibilidade", stdout=self.stdout)
+
+        # every cached response and validator depends on either the
+        # configuracao version or an apartment stamp
+        ConfiguracaoService.invalidate()
+        VersionService.bump(VersionService.apartamento_key(pk) for pk in apartamento_ids)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(apartamento_ids)} apartamento(s) e {total} reserva(s) "
+                f"de {inicio:%d/%m/%Y} a {fim:%d/%m/%Y}"
+            )
+        )
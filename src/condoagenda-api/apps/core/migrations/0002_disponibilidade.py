@@ -0,0 +1,51 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:21
+
+from django.db import migrations, models
+
+
+def popular_disponibilidade(apps, schema_editor):
+    Reserva = apps.get_model("core", "Reserva")
+    Disponibilidade = apps.get_model("core", "Disponibilidade")
+
+    ocupados = {}
+    for data, andar, hora in Reserva.objects.values_list("data", "andar", "hora"):
+        bit = 1 << (hora.hour * 2 + hora.minute // 30)
+        ocupados[(data, andar)] = ocupados.get((data, andar), 0) | bit
+
+    Disponibilidade.objects.bulk_create(
+        [
+            Disponibilidade(data=data, andar=andar, ocupados=bits)
+            for (data, andar), bits in ocupados.items()
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reserva',
+            name='phone_number',
+            field=models.CharField(blank=True, max_length=13),
+        ),
+        migrations.CreateModel(
+            name='Disponibilidade',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField()),
+                ('andar', models.IntegerField(choices=[(0, 'Térreo'), (1, '1º Andar')], default=0)),
+                ('ocupados', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Disponibilidade',
+                'verbose_name_plural': 'Disponibilidades',
+                'constraints': [models.UniqueConstraint(fields=('data', 'andar'), name='unique_disponibilidade')],
+            },
+        ),
+        migrations.RunPython(popular_disponibilidade, migrations.RunPython.noop),
+    ]
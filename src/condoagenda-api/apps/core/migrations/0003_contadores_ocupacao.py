@@ -0,0 +1,91 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def popular_contadores(apps, schema_editor):
+    Reserva = apps.get_model("core", "Reserva")
+    OcupacaoSlot = apps.get_model("core", "OcupacaoSlot")
+    CotaApartamento = apps.get_model("core", "CotaApartamento")
+
+    OcupacaoSlot.objects.bulk_create(
+        [
+            OcupacaoSlot(**item)
+            for item in Reserva.objects.order_by()
+            .values("data", "hora", "andar")
+            .annotate(quantidade=Count("id"))
+        ]
+    )
+    CotaApartamento.objects.bulk_create(
+        [
+            CotaApartamento(**item)
+            for item in Reserva.objects.order_by()
+            .values("apartamento_id", "data")
+            .annotate(quantidade=Count("id"))
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_disponibilidade'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CotaApartamento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField()),
+                ('quantidade', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Cota do apartamento',
+                'verbose_name_plural': 'Cotas dos apartamentos',
+            },
+        ),
+        migrations.CreateModel(
+            name='OcupacaoSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField()),
+                ('hora', models.TimeField()),
+                ('andar', models.IntegerField(choices=[(0, 'Térreo'), (1, '1º Andar')], default=0)),
+                ('quantidade', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Ocupação do slot',
+                'verbose_name_plural': 'Ocupações dos slots',
+            },
+        ),
+        migrations.RemoveConstraint(
+            model_name='reserva',
+            name='unique_reserva',
+        ),
+        migrations.AddField(
+            model_name='configuracao',
+            name='capacidade_por_slot',
+            field=models.IntegerField(default=1),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['data', 'andar', 'hora'], name='reserva_slot_idx'),
+        ),
+        migrations.AddField(
+            model_name='cotaapartamento',
+            name='apartamento',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.apartamento'),
+        ),
+        migrations.AddConstraint(
+            model_name='ocupacaoslot',
+            constraint=models.UniqueConstraint(fields=('data', 'hora', 'andar'), name='unique_ocupacao_slot'),
+        ),
+        migrations.AddConstraint(
+            model_name='cotaapartamento',
+            constraint=models.UniqueConstraint(fields=('apartamento', 'data'), name='unique_cota_apartamento'),
+        ),
+        migrations.RunPython(popular_contadores, migrations.RunPython.noop),
+    ]
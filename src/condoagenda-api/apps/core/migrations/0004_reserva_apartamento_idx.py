@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_contadores_ocupacao'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['apartamento', 'data', 'hora'], name='reserva_apartamento_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_reserva_apartamento_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='apartamento',
+            name='numero',
+            field=models.IntegerField(unique=True),
+        ),
+    ]
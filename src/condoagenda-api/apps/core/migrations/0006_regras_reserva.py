@@ -0,0 +1,116 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:41
+
+from django.db import migrations, models
+
+
+def atribuir_vagas(apps, schema_editor):
+    # lowest seat free over each reservation's interval, per floor-day, so
+    # the exclusion constraint below holds for existing data
+    Reserva = apps.get_model("core", "Reserva")
+
+    def minutos(hora):
+        return hora.hour * 60 + hora.minute
+
+    ocupadas = {}
+    alteradas = []
+    for reserva in Reserva.objects.order_by("data", "andar", "hora", "id").iterator():
+        inicio = minutos(reserva.hora)
+        fim = minutos(reserva.hora_saida)
+        if fim <= inicio:
+            fim += 24 * 60
+
+        intervalos = ocupadas.setdefault((reserva.data, reserva.andar), [])
+        usadas = {
+            vaga
+            for outro_inicio, outro_fim, vaga in intervalos
+            if outro_inicio < fim and outro_fim > inicio
+        }
+        vaga = 0
+        while vaga in usadas:
+            vaga += 1
+
+        intervalos.append((inicio, fim, vaga))
+        if reserva.vaga != vaga:
+            reserva.vaga = vaga
+            alteradas.append(reserva)
+
+    Reserva.objects.bulk_update(alteradas, ["vaga"], batch_size=1000)
+
+
+PERIODO_SQL = """
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+ALTER TABLE core_reserva ADD COLUMN periodo tsrange GENERATED ALWAYS AS (
+    tsrange(
+        data + hora,
+        data + hora_saida
+            + CASE WHEN hora_saida <= hora THEN interval '1 day' ELSE interval '0' END
+    )
+) STORED;
+ALTER TABLE core_reserva ADD CONSTRAINT reserva_sem_sobreposicao
+    EXCLUDE USING gist (andar WITH =, vaga WITH =, periodo WITH &&);
+"""
+
+REMOVER_PERIODO_SQL = """
+ALTER TABLE core_reserva DROP CONSTRAINT IF EXISTS reserva_sem_sobreposicao;
+ALTER TABLE core_reserva DROP COLUMN IF EXISTS periodo;
+"""
+
+
+def criar_restricao_sobreposicao(apps, schema_editor):
+    # range types and exclusion constraints only exist on postgres; other
+    # backends rely on the in-memory interval index alone
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(PERIODO_SQL)
+
+
+def remover_restricao_sobreposicao(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(REMOVER_PERIODO_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_apartamento_numero_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegraAndar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('andar', models.IntegerField(choices=[(0, 'Térreo'), (1, '1º Andar')], unique=True)),
+                ('duracao_reserva_minutos', models.IntegerField(blank=True, null=True)),
+                ('horarios_permitidos', models.JSONField(blank=True, default=list, help_text='Horários de início permitidos, ex.: ["07:00", "09:30"]')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Regra do andar',
+                'verbose_name_plural': 'Regras dos andares',
+            },
+        ),
+        migrations.AddField(
+            model_name='reserva',
+            name='vaga',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='DataBloqueada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField()),
+                ('andar', models.IntegerField(blank=True, choices=[(0, 'Térreo'), (1, '1º Andar')], null=True)),
+                ('motivo', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Data bloqueada',
+                'verbose_name_plural': 'Datas bloqueadas',
+                'indexes': [models.Index(fields=['data'], name='data_bloqueada_data_idx')],
+            },
+        ),
+        migrations.RunPython(atribuir_vagas, migrations.RunPython.noop),
+        migrations.RunPython(criar_restricao_sobreposicao, remover_restricao_sobreposicao),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_regras_reserva'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoDisponibilidade',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('ocupado', 'Ocupado'), ('livre', 'Livre'), ('recarregar', 'Recarregar')], max_length=10)),
+                ('data', models.DateField(blank=True, null=True)),
+                ('andar', models.IntegerField(blank=True, choices=[(0, 'Térreo'), (1, '1º Andar')], null=True)),
+                ('hora', models.TimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Evento de disponibilidade',
+                'verbose_name_plural': 'Eventos de disponibilidade',
+            },
+        ),
+    ]
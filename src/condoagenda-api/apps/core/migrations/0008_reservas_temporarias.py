@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_eventos_disponibilidade'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='configuracao',
+            name='tempo_reserva_temporaria_minutos',
+            field=models.IntegerField(default=5),
+        ),
+        migrations.CreateModel(
+            name='ReservaTemporaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=32, unique=True)),
+                ('data', models.DateField()),
+                ('hora', models.TimeField()),
+                ('hora_saida', models.TimeField()),
+                ('andar', models.IntegerField(choices=[(0, 'Térreo'), (1, '1º Andar')], default=0)),
+                ('vaga', models.PositiveSmallIntegerField(default=0)),
+                ('expira_em', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('apartamento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.apartamento')),
+            ],
+            options={
+                'verbose_name': 'Reserva temporária',
+                'verbose_name_plural': 'Reservas temporárias',
+                'indexes': [models.Index(fields=['data', 'andar'], name='reserva_temporaria_dia_idx'), models.Index(fields=['expira_em'], name='reserva_temporaria_expira_idx')],
+            },
+        ),
+    ]
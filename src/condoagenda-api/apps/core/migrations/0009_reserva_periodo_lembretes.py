@@ -0,0 +1,75 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:12
+
+from datetime import datetime, timedelta
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def preencher_periodo(apps, schema_editor):
+    Reserva = apps.get_model("core", "Reserva")
+
+    alteradas = []
+    for reserva in Reserva.objects.order_by("id").iterator(chunk_size=2000):
+        reserva.inicio_at = timezone.make_aware(datetime.combine(reserva.data, reserva.hora))
+        reserva.fim_at = timezone.make_aware(
+            datetime.combine(
+                reserva.data + timedelta(days=reserva.hora_saida <= reserva.hora),
+                reserva.hora_saida,
+            )
+        )
+        alteradas.append(reserva)
+        if len(alteradas) == 2000:
+            Reserva.objects.bulk_update(alteradas, ["inicio_at", "fim_at"])
+            alteradas = []
+
+    Reserva.objects.bulk_update(alteradas, ["inicio_at", "fim_at"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_reservas_temporarias'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reserva',
+            name='inicio_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='reserva',
+            name='fim_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(preencher_periodo, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='reserva',
+            name='inicio_at',
+            field=models.DateTimeField(),
+        ),
+        migrations.AlterField(
+            model_name='reserva',
+            name='fim_at',
+            field=models.DateTimeField(),
+        ),
+        migrations.AddField(
+            model_name='reserva',
+            name='lembrete_entrada_expirado',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='reserva',
+            name='lembrete_saida_expirado',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(condition=models.Q(('enviar_lembrete', True), ('lembrete_entrada_enviado', False), ('lembrete_entrada_expirado', False)), fields=['inicio_at'], name='reserva_lembrete_entrada_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(condition=models.Q(('enviar_lembrete', True), ('lembrete_saida_enviado', False), ('lembrete_saida_expirado', False)), fields=['fim_at'], name='reserva_lembrete_saida_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 00:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_reserva_periodo_lembretes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['updated_at'], name='reserva_updated_at_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-18 00:38
+
+import apps.core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_reserva_updated_at_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='configuracao',
+            name='duracao_reserva_minutos',
+            field=models.IntegerField(default=120, validators=[apps.core.models.validate_meia_hora]),
+        ),
+        migrations.AlterField(
+            model_name='regraandar',
+            name='duracao_reserva_minutos',
+            field=models.IntegerField(blank=True, null=True, validators=[apps.core.models.validate_meia_hora]),
+        ),
+    ]
@@ -1,15 +1,31 @@
-from django.db import models
-from datetime import time
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, models, transaction
+from django.dispatch import Signal
+from django.utils import timezone
+from datetime import date, datetime, time, timedelta
+from typing import Tuple
+
+
+def validate_meia_hora(minutos: int):
+    # Disponibilidade keeps one bit per half hour, so starts and ends have to
+    # land on that grid
+    if minutos <= 0 or minutos % 30:
+        raise ValidationError(
+            "A duração deve ser um múltiplo de 30 minutos (ex.: 60, 90, 120).",
+            code="meia_hora",
+        )
 
 
 class Configuracao(models.Model):
     hora_inicio = models.TimeField(default=time(7, 0))
     hora_fim = models.TimeField(default=time(19, 0))
-    duracao_reserva_minutos = models.IntegerField(default=120)
+    duracao_reserva_minutos = models.IntegerField(default=120, validators=[validate_meia_hora])
 
     quantidade_agendamento_por_apartamento = models.IntegerField(default=2)
+    capacidade_por_slot = models.IntegerField(default=1)
     tempo_lembrete_entrada_minutos = models.IntegerField(default=5)
     tempo_lembrete_saida_minutos = models.IntegerField(default=5)
+    tempo_reserva_temporaria_minutos = models.IntegerField(default=5)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -23,7 +39,7 @@ class Configuracao(models.Model):
 
 
 class Apartamento(models.Model):
-    numero = models.IntegerField()
+    numero = models.IntegerField(unique=True)
     responsavel = models.CharField(max_length=255, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
@@ -38,6 +54,34 @@ class Andar(models.IntegerChoices):
     PRIMEIRO = (1, "1º Andar")
 
 
+# bulk_create sends no post_save; receivers get the created reservations
+reservas_criadas = Signal()
+
+
+class ReservaQuerySet(models.QuerySet):
+    # bulk writes skip save(), so they derive inicio_at/fim_at here;
+    # queryset.update() on data or horas has to set them itself
+    CAMPOS_PERIODO = {"data", "hora", "hora_saida"}
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for reserva in objs:
+            reserva.set_periodo()
+        criadas = super().bulk_create(objs, *args, **kwargs)
+        reservas_criadas.send(
+            sender=self.model, reservas=[reserva for reserva in criadas if reserva.pk]
+        )
+        return criadas
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        if self.CAMPOS_PERIODO & set(fields):
+            objs = list(objs)
+            for reserva in objs:
+                reserva.set_periodo()
+            fields = [*fields, *({"inicio_at", "fim_at"} - set(fields))]
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+
 class Reserva(models.Model):
     PHONE_NUMBER_MAX_LENGTH = 13
 
@@ -49,14 +93,57 @@ class Reserva(models.Model):
     andar = models.IntegerField(default=Andar.TERRAS, choices=Andar.choices)
     phone_number = models.CharField(max_length=PHONE_NUMBER_MAX_LENGTH, blank=True)
 
+    # seat within the slot capacity; on postgres an exclusion constraint keeps
+    # reservations on the same floor and seat from overlapping in time
+    vaga = models.PositiveSmallIntegerField(default=0)
+
+    # data + hora and data + hora_saida as timestamps, derived on every
+    # write (see ReservaQuerySet), so reminders select their window through
+    # an index
+    inicio_at = models.DateTimeField()
+    fim_at = models.DateTimeField()
+
     lembrete_entrada_enviado = models.BooleanField(default=False)
     lembrete_saida_enviado = models.BooleanField(default=False)
+    # the reminder time passed before it could be sent
+    lembrete_entrada_expirado = models.BooleanField(default=False)
+    lembrete_saida_expirado = models.BooleanField(default=False)
 
     enviar_lembrete = models.BooleanField(default=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ReservaQuerySet.as_manager()
+
+    @staticmethod
+    def periodo(data: date, hora: time, hora_saida: time) -> Tuple[datetime, datetime]:
+        inicio = timezone.make_aware(datetime.combine(data, hora))
+        fim = timezone.make_aware(
+            datetime.combine(data + timedelta(days=hora_saida <= hora), hora_saida)
+        )
+        return inicio, fim
+
+    def set_periodo(self):
+        self.inicio_at, self.fim_at = Reserva.periodo(self.data, self.hora, self.hora_saida)
+
+    def save(self, *args, **kwargs):
+        self.set_periodo()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and ReservaQuerySet.CAMPOS_PERIODO & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "inicio_at", "fim_at"}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        loaded = dict(zip(field_names, values))
+        if {"data", "hora", "andar"} <= loaded.keys():
+            instance._slot_original = (loaded["data"], loaded["hora"], loaded["andar"])
+        instance._hora_saida_original = loaded.get("hora_saida")
+        instance._apartamento_id_original = loaded.get("apartamento_id")
+        return instance
+
     def __str__(self):
         return f"#{self.id} {self.data:%d/%m/%Y} {self.hora:%H:%M} - {self.apartamento} - {self.get_andar_display()}"
 
@@ -65,8 +152,236 @@ class Reserva(models.Model):
         verbose_name_plural = "Reservas"
         ordering = ["data", "hora"]
 
+        # slot capacity is enforced through OcupacaoSlot, so several
+        # reservations may share a (data, hora, andar)
+        indexes = [
+            models.Index(fields=["data", "andar", "hora"], name="reserva_slot_idx"),
+            models.Index(
+                fields=["apartamento", "data", "hora"], name="reserva_apartamento_idx"
+            ),
+            # the reminders daemon follows changes through updated_at
+            models.Index(fields=["updated_at"], name="reserva_updated_at_idx"),
+            # only rows still waiting for a reminder are indexed
+            models.Index(
+                fields=["inicio_at"],
+                name="reserva_lembrete_entrada_idx",
+                condition=models.Q(
+                    enviar_lembrete=True,
+                    lembrete_entrada_enviado=False,
+                    lembrete_entrada_expirado=False,
+                ),
+            ),
+            models.Index(
+                fields=["fim_at"],
+                name="reserva_lembrete_saida_idx",
+                condition=models.Q(
+                    enviar_lembrete=True,
+                    lembrete_saida_enviado=False,
+                    lembrete_saida_expirado=False,
+                ),
+            ),
+        ]
+
+
+class ReservaTemporaria(models.Model):
+    # a seat held between showing the hours and confirming; create_reserva
+    # consumes it through the token, expired ones are swept in bulk
+    token = models.CharField(max_length=32, unique=True)
+
+    data = models.DateField()
+    hora = models.TimeField()
+    hora_saida = models.TimeField()
+    andar = models.IntegerField(default=Andar.TERRAS, choices=Andar.choices)
+    vaga = models.PositiveSmallIntegerField(default=0)
+
+    apartamento = models.ForeignKey(Apartamento, on_delete=models.CASCADE)
+    expira_em = models.DateTimeField()
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.data:%d/%m/%Y} {self.hora:%H:%M} - {self.apartamento} - {self.get_andar_display()}"
+
+    class Meta:
+        verbose_name = "Reserva temporária"
+        verbose_name_plural = "Reservas temporárias"
+        indexes = [
+            models.Index(fields=["data", "andar"], name="reserva_temporaria_dia_idx"),
+            models.Index(fields=["expira_em"], name="reserva_temporaria_expira_idx"),
+        ]
+
+
+class RegraAndar(models.Model):
+    andar = models.IntegerField(choices=Andar.choices, unique=True)
+    # empty fields fall back to Configuracao and to the odd-hour rule
+    duracao_reserva_minutos = models.IntegerField(
+        null=True, blank=True, validators=[validate_meia_hora]
+    )
+    horarios_permitidos = models.JSONField(
+        default=list,
+        blank=True,
+        help_text='Horários de início permitidos, ex.: ["07:00", "09:30"]',
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def clean(self):
+        try:
+            horarios = [time.fromisoformat(horario) for horario in self.horarios_permitidos]
+        except (TypeError, ValueError):
+            raise ValidationError(
+                {"horarios_permitidos": 'Use uma lista de horários no formato "HH:MM".'}
+            )
+
+        fora_da_grade = [
+            horario
+            for horario, hora in zip(self.horarios_permitidos, horarios)
+            if hora.minute % 30 or hora.second or hora.microsecond
+        ]
+        if fora_da_grade:
+            raise ValidationError(
+                {
+                    "horarios_permitidos": (
+                        "Os horários devem ser em horas cheias ou meias horas "
+                        f"(ex.: 10:00, 10:30): {', '.join(fora_da_grade)}."
+                    )
+                }
+            )
+
+    def __str__(self):
+        return f"Regra - {self.get_andar_display()}"
+
+    class Meta:
+        verbose_name = "Regra do andar"
+        verbose_name_plural = "Regras dos andares"
+
+
+class DataBloqueada(models.Model):
+    data = models.DateField()
+    # empty blocks every floor
+    andar = models.IntegerField(choices=Andar.choices, null=True, blank=True)
+    motivo = models.CharField(max_length=255, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        andar = self.get_andar_display() if self.andar is not None else "Todos os andares"
+        return f"{self.data:%d/%m/%Y} - {andar}"
+
+    class Meta:
+        verbose_name = "Data bloqueada"
+        verbose_name_plural = "Datas bloqueadas"
+        indexes = [models.Index(fields=["data"], name="data_bloqueada_data_idx")]
+
+
+class Disponibilidade(models.Model):
+    # one bit per half hour of the day, set when the slot starting there has
+    # no capacity left
+    data = models.DateField()
+    andar = models.IntegerField(default=Andar.TERRAS, choices=Andar.choices)
+    ocupados = models.BigIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @staticmethod
+    def bit(hora: time) -> int:
+        return 1 << (hora.hour * 2 + hora.minute // 30)
+
+    @classmethod
+    def lock(cls, data, andar: int) -> "Disponibilidade":
+        # the row doubles as the lock that serializes writers of a floor-day.
+        # every writer takes it before the OcupacaoSlot and then the
+        # CotaApartamento rows, so two of them never wait on each other
+        try:
+            with transaction.atomic():
+                return cls.objects.select_for_update().get(data=data, andar=andar)
+        except cls.DoesNotExist:
+            pass
+
+        try:
+            with transaction.atomic():
+                return cls.objects.create(data=data, andar=andar)
+        except IntegrityError:
+            with transaction.atomic():
+                return cls.objects.select_for_update().get(data=data, andar=andar)
+
+    def __str__(self):
+        return f"{self.data:%d/%m/%Y} - {self.get_andar_display()}"
+
+    class Meta:
+        verbose_name = "Disponibilidade"
+        verbose_name_plural = "Disponibilidades"
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=["data", "andar"], name="unique_disponibilidade"
+            )
+        ]
+
+
+class EventoDisponibilidade(models.Model):
+    # change feed of slot availability; the id is the event id clients of
+    # the SSE stream resume from
+    class Tipo(models.TextChoices):
+        OCUPADO = ("ocupado", "Ocupado")
+        LIVRE = ("livre", "Livre")
+        # rules or configuration changed, the whole availability must be
+        # fetched again
+        RECARREGAR = ("recarregar", "Recarregar")
+
+    tipo = models.CharField(max_length=10, choices=Tipo.choices)
+    data = models.DateField(null=True, blank=True)
+    andar = models.IntegerField(choices=Andar.choices, null=True, blank=True)
+    hora = models.TimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        if self.tipo == self.Tipo.RECARREGAR:
+            return f"#{self.id} {self.get_tipo_display()}"
+        return f"#{self.id} {self.data:%d/%m/%Y} {self.hora:%H:%M} - {self.get_andar_display()}: {self.get_tipo_display()}"
+
+    class Meta:
+        verbose_name = "Evento de disponibilidade"
+        verbose_name_plural = "Eventos de disponibilidade"
+
+
+class CotaApartamento(models.Model):
+    apartamento = models.ForeignKey(Apartamento, on_delete=models.CASCADE)
+    data = models.DateField()
+    quantidade = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.apartamento} - {self.data:%d/%m/%Y}: {self.quantidade}"
+
+    class Meta:
+        verbose_name = "Cota do apartamento"
+        verbose_name_plural = "Cotas dos apartamentos"
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=["apartamento", "data"], name="unique_cota_apartamento"
+            )
+        ]
+
+
+class OcupacaoSlot(models.Model):
+    data = models.DateField()
+    hora = models.TimeField()
+    andar = models.IntegerField(default=Andar.TERRAS, choices=Andar.choices)
+    quantidade = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.data:%d/%m/%Y} {self.hora:%H:%M} - {self.get_andar_display()}: {self.quantidade}"
+
+    class Meta:
+        verbose_name = "Ocupação do slot"
+        verbose_name_plural = "Ocupações dos slots"
+
         constraints = [
             models.UniqueConstraint(
-                fields=["data", "hora", "andar"], name="unique_reserva"
+                fields=["data", "hora", "andar"], name="unique_ocupacao_slot"
             )
         ]
@@ -0,0 +1,122 @@
+from datetime import date, timedelta
+from typing import Awaitable, Callable
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from apps.core.services import ConfiguracaoService
+
+
+class ResponseCache:
+    TIMEOUT_SECONDS = 60 * 60 * 24
+    HITS_KEY = "core:respostas:hits"
+    MISSES_KEY = "core:respostas:misses"
+
+    @staticmethod
+    def slots_key(dia: date, andar: int, passado: bool, versao: str) -> str:
+        return f"core:respostas:slots:{dia:%Y-%m-%d}:{andar}:{int(passado)}:{versao}"
+
+    @staticmethod
+    def dates_key(inicio_semana: date, andar: int, hoje: date, versao: str) -> str:
+        return f"core:respostas:datas:{inicio_semana:%Y-%m-%d}:{andar}:{hoje:%Y-%m-%d}:{versao}"
+
+    @staticmethod
+    def get_slots_key(dia: date, andar: int) -> str:
+        return ResponseCache.slots_key(
+            dia,
+            andar,
+            dia < timezone.localdate(),
+            ConfiguracaoService.get_version(),
+        )
+
+    @staticmethod
+    def get_dates_key(inicio_semana: date, andar: int) -> str:
+        return ResponseCache.dates_key(
+            inicio_semana,
+            andar,
+            timezone.localdate(),
+            ConfiguracaoService.get_version(),
+        )
+
+    @staticmethod
+    async def aget_slots_key(dia: date, andar: int) -> str:
+        return ResponseCache.slots_key(
+            dia,
+            andar,
+            dia < timezone.localdate(),
+            await ConfiguracaoService.aget_version(),
+        )
+
+    @staticmethod
+    async def aget_dates_key(inicio_semana: date, andar: int) -> str:
+        return ResponseCache.dates_key(
+            inicio_semana,
+            andar,
+            timezone.localdate(),
+            await ConfiguracaoService.aget_version(),
+        )
+
+    @staticmethod
+    def count(key: str):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+    @staticmethod
+    def get_or_set(key: str, build: Callable[[], dict]) -> dict:
+        data = cache.get(key)
+        if data is not None:
+            ResponseCache.count(ResponseCache.HITS_KEY)
+            return data
+
+        ResponseCache.count(ResponseCache.MISSES_KEY)
+        data = build()
+        cache.set(key, data, timeout=ResponseCache.TIMEOUT_SECONDS)
+        return data
+
+    @staticmethod
+    async def acount(key: str):
+        try:
+            await cache.aincr(key)
+        except ValueError:
+            await cache.aset(key, 1, timeout=None)
+
+    @staticmethod
+    async def aget_or_set(key: str, build: Callable[[], Awaitable[dict]]) -> dict:
+        data = await cache.aget(key)
+        if data is not None:
+            await ResponseCache.acount(ResponseCache.HITS_KEY)
+            return data
+
+        await ResponseCache.acount(ResponseCache.MISSES_KEY)
+        data = await build()
+        await cache.aset(key, data, timeout=ResponseCache.TIMEOUT_SECONDS)
+        return data
+
+    @staticmethod
+    def invalidate(data: date, andar: int):
+        versao = ConfiguracaoService.get_version()
+        hoje = timezone.localdate()
+        inicio_semana = data - timedelta(days=data.weekday())
+
+        cache.delete_many(
+            [
+                ResponseCache.slots_key(data, andar, False, versao),
+                ResponseCache.slots_key(data, andar, True, versao),
+                ResponseCache.dates_key(inicio_semana, andar, hoje, versao),
+            ]
+        )
+
+    @staticmethod
+    def stats() -> dict:
+        counters = cache.get_many([ResponseCache.HITS_KEY, ResponseCache.MISSES_KEY])
+        hits = counters.get(ResponseCache.HITS_KEY, 0)
+        misses = counters.get(ResponseCache.MISSES_KEY, 0)
+        total = hits + misses
+
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / total if total else 0.0,
+        }
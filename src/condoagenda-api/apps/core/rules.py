@@ -0,0 +1,126 @@
+from datetime import date, time
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from django.utils import timezone
+
+from apps.core.intervals import Intervalo, IntervalIndex
+from apps.core.models import (
+    Andar,
+    Configuracao,
+    DataBloqueada,
+    RegraAndar,
+    Reserva,
+    ReservaTemporaria,
+)
+from apps.core.slots import SlotTemplate
+
+# (data, andar, hora, hora_saida, vaga, id) of a reservation
+ReservaRow = Tuple[date, int, time, time, int, int]
+RESERVA_ROW_FIELDS = ("data", "andar", "hora", "hora_saida", "vaga", "id")
+
+
+class RegrasReserva:
+    # everything that decides whether a slot can be booked, compiled once per
+    # configuracao version: per-floor slot templates (duration and allowed
+    # starts) and blocked dates
+
+    def __init__(
+        self,
+        configuracao: Configuracao,
+        regras_andar: Iterable[RegraAndar] = (),
+        bloqueios: Iterable[DataBloqueada] = (),
+    ):
+        self.configuracao = configuracao
+        self.capacidade = configuracao.capacidade_por_slot
+
+        regras = {regra.andar: regra for regra in regras_andar}
+        self.templates: Dict[int, SlotTemplate] = {}
+        for andar in Andar.values:
+            regra = regras.get(andar)
+            self.templates[andar] = SlotTemplate.compile(
+                configuracao,
+                duracao_minutos=regra.duracao_reserva_minutos if regra else None,
+                horarios_permitidos=(
+                    [time.fromisoformat(horario) for horario in regra.horarios_permitidos]
+                    if regra
+                    else None
+                ),
+            )
+
+        self.bloqueios: Dict[Tuple[date, Optional[int]], str] = {
+            (bloqueio.data, bloqueio.andar): bloqueio.motivo for bloqueio in bloqueios
+        }
+
+    @staticmethod
+    def load(configuracao: Configuracao) -> "RegrasReserva":
+        return RegrasReserva(
+            configuracao,
+            RegraAndar.objects.all(),
+            # past dates can't be booked anyway
+            DataBloqueada.objects.filter(data__gte=timezone.localdate()),
+        )
+
+    @staticmethod
+    async def aload(configuracao: Configuracao) -> "RegrasReserva":
+        return RegrasReserva(
+            configuracao,
+            [regra async for regra in RegraAndar.objects.all()],
+            [
+                bloqueio
+                async for bloqueio in DataBloqueada.objects.filter(data__gte=timezone.localdate())
+            ],
+        )
+
+    def template(self, andar: int) -> SlotTemplate:
+        return self.templates[andar]
+
+    def bloqueio(self, data: date, andar: int) -> Optional[str]:
+        motivo = self.bloqueios.get((data, andar))
+        if motivo is None:
+            motivo = self.bloqueios.get((data, None))
+        return motivo
+
+    def ocupados(self, andar: int, index: IntervalIndex) -> int:
+        # bitmask of the slot starts where no seat is free for the whole slot
+        bits = 0
+        for slot in self.template(andar).slots:
+            if index.vaga_livre(slot.inicio_min, slot.fim_min, self.capacidade) is None:
+                bits |= slot.bit
+        return bits
+
+    @staticmethod
+    def rows(chunk_size: Optional[int] = None, **filtros) -> Iterator[ReservaRow]:
+        # reservations plus the seats of unexpired holds; holds carry no id,
+        # so nothing working on reservations removes them from an index
+        def iterate(queryset):
+            return queryset.iterator(chunk_size=chunk_size) if chunk_size else queryset
+
+        yield from iterate(
+            Reserva.objects.filter(**filtros).values_list(*RESERVA_ROW_FIELDS)
+        )
+        for row in iterate(
+            ReservaTemporaria.objects.filter(
+                expira_em__gt=timezone.now(), **filtros
+            ).values_list(*RESERVA_ROW_FIELDS[:-1])
+        ):
+            yield (*row, None)
+
+    @staticmethod
+    def load_index(data: date, andar: int) -> IntervalIndex:
+        return IntervalIndex(
+            Intervalo.from_horas(hora, hora_saida, vaga, pk)
+            for _, _, hora, hora_saida, vaga, pk in RegrasReserva.rows(
+                data=data, andar=andar
+            )
+        )
+
+    @staticmethod
+    def build_indexes(
+        reservas: Iterable[ReservaRow],
+    ) -> Dict[Tuple[date, int], IntervalIndex]:
+        intervalos: Dict[Tuple[date, int], list] = {}
+        for data, andar, hora, hora_saida, vaga, pk in reservas:
+            intervalos.setdefault((data, andar), []).append(
+                Intervalo.from_horas(hora, hora_saida, vaga, pk)
+            )
+        return {key: IntervalIndex(itens) for key, itens in intervalos.items()}
@@ -1,32 +1,218 @@
-from datetime import date, datetime, timedelta
-from typing import Tuple
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
 
-from apps.core.models import Apartamento, Configuracao, Reserva
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils.timezone import localdate
+
+from apps.core.counters import CounterService
+from apps.core.intervals import Intervalo
+from apps.core.models import (
+    Apartamento,
+    Configuracao,
+    CotaApartamento,
+    Disponibilidade,
+    OcupacaoSlot,
+    Reserva,
+    ReservaTemporaria,
+)
+from apps.core.rules import RegrasReserva
+from apps.core.slots import SlotTemplate
 
 
 class ReservaValidationError(Exception):
-    def __init__(self, message: str, field: str = None):
+    def __init__(self, message: str, field: str = None, code: str = None):
         self.message = message
         self.field = field
+        # lets callers tell apart the errors they answer differently
+        self.code = code
         super().__init__(self.message)
 
 
+def new_stamp() -> str:
+    return str(time.time_ns())
+
+
+def stamp_to_datetime(stamp: str) -> datetime:
+    return datetime.fromtimestamp(int(stamp) / 1_000_000_000, tz=timezone.utc)
+
+
+class ConfiguracaoService:
+    VERSION_CACHE_KEY = "core:configuracao:version"
+
+    # (version, configuracao, compiled booking rules) held by this process;
+    # the version stamp lives in the shared cache so a change made by any
+    # worker invalidates all of them
+    _cached: Optional[Tuple[str, Configuracao, RegrasReserva]] = None
+
+    @staticmethod
+    def get_version() -> str:
+        version = cache.get(ConfiguracaoService.VERSION_CACHE_KEY)
+        if version is None:
+            cache.add(ConfiguracaoService.VERSION_CACHE_KEY, new_stamp(), timeout=None)
+            version = cache.get(ConfiguracaoService.VERSION_CACHE_KEY)
+        return version
+
+    @staticmethod
+    async def aget_version() -> str:
+        version = await cache.aget(ConfiguracaoService.VERSION_CACHE_KEY)
+        if version is None:
+            await cache.aadd(ConfiguracaoService.VERSION_CACHE_KEY, new_stamp(), timeout=None)
+            version = await cache.aget(ConfiguracaoService.VERSION_CACHE_KEY)
+        return version
+
+    @staticmethod
+    def load() -> Tuple[str, Configuracao, RegrasReserva]:
+        version = ConfiguracaoService.get_version()
+        cached = ConfiguracaoService._cached
+        if cached is not None and cached[0] == version:
+            return cached
+
+        config, _ = Configuracao.objects.get_or_create(id=1)
+        ConfiguracaoService._cached = (version, config, RegrasReserva.load(config))
+        return ConfiguracaoService._cached
+
+    @staticmethod
+    async def aload() -> Tuple[str, Configuracao, RegrasReserva]:
+        version = await ConfiguracaoService.aget_version()
+        cached = ConfiguracaoService._cached
+        if cached is not None and cached[0] == version:
+            return cached
+
+        config, _ = await Configuracao.objects.aget_or_create(id=1)
+        ConfiguracaoService._cached = (version, config, await RegrasReserva.aload(config))
+        return ConfiguracaoService._cached
+
+    @staticmethod
+    def get_configuracao() -> Configuracao:
+        return ConfiguracaoService.load()[1]
+
+    @staticmethod
+    def get_regras() -> RegrasReserva:
+        return ConfiguracaoService.load()[2]
+
+    @staticmethod
+    async def aget_regras() -> RegrasReserva:
+        return (await ConfiguracaoService.aload())[2]
+
+    @staticmethod
+    def invalidate():
+        ConfiguracaoService._cached = None
+        cache.set(ConfiguracaoService.VERSION_CACHE_KEY, new_stamp(), timeout=None)
+
+
+class ApartamentoService:
+    VERSION_CACHE_KEY = "core:apartamentos:version"
+
+    # numero -> id of every apartment, loaded on first use and reloaded when
+    # the shared version stamp changes, like ConfiguracaoService
+    _cached: Optional[Tuple[str, Dict[int, int]]] = None
+
+    @staticmethod
+    def get_version() -> str:
+        version = cache.get(ApartamentoService.VERSION_CACHE_KEY)
+        if version is None:
+            cache.add(ApartamentoService.VERSION_CACHE_KEY, new_stamp(), timeout=None)
+            version = cache.get(ApartamentoService.VERSION_CACHE_KEY)
+        return version
+
+    @staticmethod
+    async def aget_version() -> str:
+        version = await cache.aget(ApartamentoService.VERSION_CACHE_KEY)
+        if version is None:
+            await cache.aadd(ApartamentoService.VERSION_CACHE_KEY, new_stamp(), timeout=None)
+            version = await cache.aget(ApartamentoService.VERSION_CACHE_KEY)
+        return version
+
+    @staticmethod
+    def get_ids_by_numero() -> Dict[int, int]:
+        version = ApartamentoService.get_version()
+        cached = ApartamentoService._cached
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        ids = dict(Apartamento.objects.values_list("numero", "id"))
+        ApartamentoService._cached = (version, ids)
+        return ids
+
+    @staticmethod
+    async def aget_ids_by_numero() -> Dict[int, int]:
+        version = await ApartamentoService.aget_version()
+        cached = ApartamentoService._cached
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        ids = {
+            numero: pk
+            async for numero, pk in Apartamento.objects.values_list("numero", "id")
+        }
+        ApartamentoService._cached = (version, ids)
+        return ids
+
+    @staticmethod
+    def get_id(numero: int) -> Optional[int]:
+        return ApartamentoService.get_ids_by_numero().get(numero)
+
+    @staticmethod
+    def invalidate():
+        ApartamentoService._cached = None
+        cache.set(ApartamentoService.VERSION_CACHE_KEY, new_stamp(), timeout=None)
+
+
+class VersionService:
+    @staticmethod
+    def disponibilidade_key(data: date, andar: int) -> str:
+        return f"core:versao:disponibilidade:{data:%Y-%m-%d}:{andar}"
+
+    @staticmethod
+    def apartamento_key(apartamento_id: int) -> str:
+        return f"core:versao:apartamento:{apartamento_id}"
+
+    @staticmethod
+    def bump(keys: Iterable[str]):
+        stamp = new_stamp()
+        cache.set_many({key: stamp for key in keys}, timeout=None)
+
+    @staticmethod
+    def get_many(keys: List[str]) -> Dict[str, str]:
+        stamps = cache.get_many(keys)
+        missing = [key for key in keys if key not in stamps]
+        if missing:
+            # an evicted stamp restarts at "now", which never matches a
+            # validator handed out before
+            stamp = new_stamp()
+            for key in missing:
+                cache.add(key, stamp, timeout=None)
+            stamps.update(cache.get_many(missing))
+        return stamps
+
+
 class ReservaService:
     @staticmethod
     def get_current_week_range() -> Tuple[date, date]:
-        today = date.today()
+        today = localdate()
         start_of_week = today - timedelta(days=today.weekday())
         end_of_week = start_of_week + timedelta(days=6)
         return start_of_week, end_of_week
 
     @staticmethod
     def is_odd_hour(hora: datetime.time) -> bool:
-        return hora.hour % 2 != 0
+        return SlotTemplate.is_odd_hour(hora)
 
     @staticmethod
-    def validate_reserva(data: date, hora: datetime.time, numero_apartamento: int, andar: int):
-        config, _ = Configuracao.objects.get_or_create(id=1)
+    def get_hora_saida(data: date, hora: datetime.time, andar: int) -> datetime.time:
+        template = ConfiguracaoService.get_regras().template(andar)
+        slot = template.get(hora)
+        if slot is not None:
+            return slot.fim
+
+        hora_datetime = datetime.combine(data, hora)
+        hora_saida_datetime = hora_datetime + timedelta(minutes=template.duracao_minutos)
+        return hora_saida_datetime.time()
 
+    @staticmethod
+    def validate_horario(data: date, hora: datetime.time, andar: int):
         start_of_week, end_of_week = ReservaService.get_current_week_range()
         if data < start_of_week or data > end_of_week:
             raise ReservaValidationError(
@@ -34,31 +220,28 @@ class ReservaService:
                 field="data",
             )
 
-        if data < date.today():
+        if data < localdate():
             raise ReservaValidationError(
                 "Não é possível reservar slots em datas passadas.", field="data"
             )
 
-        if not ReservaService.is_odd_hour(hora):
-            raise ReservaValidationError(
-                "Só é possível agendar em horários ímpares (07:00, 09:00, 11:00, 13:00, 15:00, 17:00, 19:00).",
-                field="hora",
-            )
+        _, config, regras = ConfiguracaoService.load()
 
-        if Reserva.objects.filter(data=data, hora=hora, andar=andar).exists():
+        motivo = regras.bloqueio(data, andar)
+        if motivo is not None:
             raise ReservaValidationError(
-                "Já existe uma reserva para este horário e andar.", field="hora"
+                f"Não é possível reservar nesta data{f': {motivo}' if motivo else ''}.",
+                field="data",
             )
 
-        reservas_apartamento_no_dia = Reserva.objects.filter(
-            data=data, apartamento__numero=numero_apartamento
-        ).count()
+        template = regras.template(andar)
+        if template.is_reservavel(hora):
+            return
 
-        max_por_apartamento = config.quantidade_agendamento_por_apartamento
-        if reservas_apartamento_no_dia >= max_por_apartamento:
+        horarios = ", ".join(slot.inicio_str for slot in template.reservaveis)
+        if not template.regra_impar:
             raise ReservaValidationError(
-                f"O apartamento já atingiu o limite de {max_por_apartamento} reservas para este dia.",
-                field="apartamento",
+                f"Só é possível agendar nos horários {horarios}.", field="hora"
             )
 
         if hora < config.hora_inicio or hora > config.hora_fim:
@@ -67,28 +250,117 @@ class ReservaService:
                 field="hora",
             )
 
+        raise ReservaValidationError(
+            f"Só é possível agendar em horários ímpares ({horarios}).", field="hora"
+        )
+
+    @staticmethod
+    def slot_ocupado_error() -> ReservaValidationError:
+        return ReservaValidationError(
+            "Já existe uma reserva para este horário e andar.",
+            field="hora",
+            code="slot_ocupado",
+        )
+
+    @staticmethod
+    def apartamento_nao_encontrado_error() -> ReservaValidationError:
+        return ReservaValidationError(
+            "Apartamento não encontrado.",
+            field="numero_apartamento",
+            code="apartamento_nao_encontrado",
+        )
+
+    @staticmethod
+    def reserva_temporaria_invalida_error() -> ReservaValidationError:
+        return ReservaValidationError(
+            "Reserva temporária expirada ou inválida.", field="hold"
+        )
+
+    @staticmethod
+    def limite_apartamento_error(max_por_apartamento: int) -> ReservaValidationError:
+        return ReservaValidationError(
+            f"O apartamento já atingiu o limite de {max_por_apartamento} reservas para este dia.",
+            field="apartamento",
+        )
+
     @staticmethod
     def create_reserva(
         data: date,
         hora: datetime.time,
         numero_apartamento,
         andar: int,
+        hold: Optional[str] = None,
     ) -> Reserva:
-        config, _ = Configuracao.objects.get_or_create(id=1)
-        apartamento = Apartamento.objects.get(numero=numero_apartamento)
+        config = ConfiguracaoService.get_configuracao()
+        hora_saida = ReservaService.get_hora_saida(data, hora, andar)
 
-        hora_datetime = datetime.combine(data, hora)
-        hora_saida_datetime = hora_datetime + timedelta(
-            minutes=config.duracao_reserva_minutos
-        )
-        hora_saida = hora_saida_datetime.time()
-
-        reserva = Reserva.objects.create(
-            data=data,
-            hora=hora,
-            apartamento=apartamento,
-            andar=andar,
-            hora_saida=hora_saida,
-        )
+        # the floor-day lock comes first, then capacity and quota, taken with
+        # conditional counter updates that roll back with the reservation if
+        # either is exhausted. a seat free for the whole interval is then
+        # picked under the lock. the post_save signal keeps the availability
+        # bitmask in the same transaction
+        apartamento_id = ApartamentoService.get_id(numero_apartamento)
+        if apartamento_id is None:
+            raise ReservaService.apartamento_nao_encontrado_error()
+
+        with transaction.atomic():
+            Disponibilidade.lock(data, andar)
+
+            if not CounterService.increment(
+                OcupacaoSlot,
+                config.capacidade_por_slot,
+                data=data,
+                hora=hora,
+                andar=andar,
+            ):
+                raise ReservaService.slot_ocupado_error()
+
+            max_por_apartamento = config.quantidade_agendamento_por_apartamento
+            if not CounterService.increment(
+                CotaApartamento,
+                max_por_apartamento,
+                apartamento_id=apartamento_id,
+                data=data,
+            ):
+                raise ReservaService.limite_apartamento_error(max_por_apartamento)
+
+            if hold is not None:
+                # releasing the hold under the lock hands its seat over to
+                # this reservation before anyone else can take it
+                removidas, _ = ReservaTemporaria.objects.filter(
+                    token=hold,
+                    data=data,
+                    hora=hora,
+                    andar=andar,
+                    apartamento_id=apartamento_id,
+                    expira_em__gt=datetime.now(timezone.utc),
+                ).delete()
+                if not removidas:
+                    raise ReservaService.reserva_temporaria_invalida_error()
+
+            intervalo = Intervalo.from_horas(hora, hora_saida)
+            vaga = RegrasReserva.load_index(data, andar).vaga_livre(
+                intervalo.inicio, intervalo.fim, config.capacidade_por_slot
+            )
+            if vaga is None:
+                raise ReservaService.slot_ocupado_error()
+
+            reserva = Reserva(
+                data=data,
+                hora=hora,
+                apartamento_id=apartamento_id,
+                andar=andar,
+                hora_saida=hora_saida,
+                vaga=vaga,
+            )
+            reserva._contadores_aplicados = True
+            reserva._vaga_atribuida = True
+            try:
+                with transaction.atomic():
+                    reserva.save()
+            except IntegrityError:
+                # the postgres exclusion constraint caught an overlap that
+                # slipped past the index
+                raise ReservaService.slot_ocupado_error()
 
         return reserva
@@ -0,0 +1,198 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, time
+from typing import Iterable, Tuple
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.core.availability import AvailabilityService
+from apps.core.counters import CounterService
+from apps.core.intervals import Intervalo
+from apps.core.models import (
+    Apartamento,
+    Configuracao,
+    CotaApartamento,
+    DataBloqueada,
+    Disponibilidade,
+    OcupacaoSlot,
+    RegraAndar,
+    Reserva,
+)
+from apps.core.response_cache import ResponseCache
+from apps.core.rules import RegrasReserva
+from apps.core.services import ApartamentoService, ConfiguracaoService, VersionService
+
+
+# set by bulk writers that maintain counters and availability themselves
+_muted = ContextVar("reserva_signals_muted", default=False)
+
+
+@contextmanager
+def muted_reserva_signals():
+    token = _muted.set(True)
+    try:
+        yield
+    finally:
+        _muted.reset(token)
+
+
+def on_commit_too(func, *args):
+    # run right away for this process and once more after commit, so other
+    # workers never reload data before the change is visible to them
+    func(*args)
+    transaction.on_commit(lambda: func(*args))
+
+
+def notify_changes(slots: Iterable[Tuple[date, int]], apartamento_ids: Iterable[int]):
+    slots = set(slots)
+    for data, andar in slots:
+        on_commit_too(ResponseCache.invalidate, data, andar)
+
+    on_commit_too(
+        VersionService.bump,
+        {
+            *(VersionService.disponibilidade_key(data, andar) for data, andar in slots),
+            *(VersionService.apartamento_key(pk) for pk in apartamento_ids if pk),
+        },
+    )
+
+
+@receiver(post_save, sender=Configuracao)
+@receiver(post_delete, sender=Configuracao)
+@receiver(post_save, sender=RegraAndar)
+@receiver(post_delete, sender=RegraAndar)
+@receiver(post_save, sender=DataBloqueada)
+@receiver(post_delete, sender=DataBloqueada)
+def configuracao_changed(sender, **kwargs):
+    ConfiguracaoService.invalidate()
+    transaction.on_commit(reload_configuracao)
+
+
+def reload_configuracao():
+    # capacity, durations and allowed starts decide when a slot is full. the
+    # rebuild waits for the commit and the invalidation, so it loads the new
+    # rules rather than caching the old ones again
+    ConfiguracaoService.invalidate()
+    AvailabilityService.rebuild_ocupados(desde=timezone.localdate())
+
+
+@receiver(post_save, sender=Apartamento)
+@receiver(post_delete, sender=Apartamento)
+def apartamento_changed(sender, **kwargs):
+    on_commit_too(ApartamentoService.invalidate)
+
+
+def take_counters(data: date, hora: time, andar: int, apartamento_id: int):
+    CounterService.increment(OcupacaoSlot, None, data=data, hora=hora, andar=andar)
+    CounterService.increment(
+        CotaApartamento, None, apartamento_id=apartamento_id, data=data
+    )
+
+
+def release_counters(data: date, hora: time, andar: int, apartamento_id: int):
+    CounterService.decrement(OcupacaoSlot, data=data, hora=hora, andar=andar)
+    CounterService.decrement(CotaApartamento, apartamento_id=apartamento_id, data=data)
+
+
+def lock_days(dias: Iterable[Tuple[date, int]]):
+    for data, andar in sorted(dias):
+        Disponibilidade.lock(data, andar)
+
+
+def intervalo_changed(instance: Reserva) -> bool:
+    slot_original = getattr(instance, "_slot_original", None)
+    return instance._state.adding or (
+        (instance.data, instance.hora, instance.andar) != slot_original
+        or instance.hora_saida != getattr(instance, "_hora_saida_original", None)
+    )
+
+
+@receiver(pre_save, sender=Reserva)
+def reserva_assign_vaga(sender, instance: Reserva, **kwargs):
+    # ReservaService picks the seat itself, within the capacity; any other
+    # write gets the lowest seat free over its interval so the exclusion
+    # constraint holds
+    if _muted.get() or getattr(instance, "_vaga_atribuida", False):
+        return
+
+    # floor-days first, as every writer takes them, before the counters and
+    # the bitmask the post_save touches
+    dias = {(instance.data, instance.andar)}
+    slot_original = getattr(instance, "_slot_original", None)
+    if slot_original is not None and not instance._state.adding:
+        dias.add((slot_original[0], slot_original[2]))
+    apartamento_changed = instance.apartamento_id != getattr(
+        instance, "_apartamento_id_original", instance.apartamento_id
+    )
+    if not intervalo_changed(instance):
+        if apartamento_changed:
+            lock_days(dias)
+        return
+
+    lock_days(dias)
+    intervalo = Intervalo.from_horas(instance.hora, instance.hora_saida)
+    instance.vaga = RegrasReserva.load_index(instance.data, instance.andar).vaga_livre(
+        intervalo.inicio, intervalo.fim, None, ignorar=instance.pk
+    )
+
+
+@receiver(post_save, sender=Reserva)
+def reserva_saved(sender, instance: Reserva, created: bool, **kwargs):
+    if _muted.get():
+        return
+
+    atual = (instance.data, instance.hora, instance.andar, instance.apartamento_id)
+    slot_original = getattr(instance, "_slot_original", None)
+    original = (
+        (*slot_original, instance._apartamento_id_original)
+        if slot_original is not None and not created
+        else None
+    )
+
+    slots = {(instance.data, instance.andar)}
+    apartamento_ids = {instance.apartamento_id}
+
+    if created:
+        # ReservaService takes the counters itself, with the limits applied
+        if not getattr(instance, "_contadores_aplicados", False):
+            take_counters(*atual)
+        AvailabilityService.refresh_day(instance.data, instance.andar)
+    elif original is not None and original != atual:
+        data, hora, andar, apartamento_id = original
+        release_counters(*original)
+        take_counters(*atual)
+        AvailabilityService.refresh_day(data, andar)
+        AvailabilityService.refresh_day(instance.data, instance.andar)
+
+        slots.add((data, andar))
+        apartamento_ids.add(apartamento_id)
+    elif instance.hora_saida != getattr(instance, "_hora_saida_original", None):
+        AvailabilityService.refresh_day(instance.data, instance.andar)
+
+    notify_changes(slots, apartamento_ids)
+
+    instance._slot_original = atual[:3]
+    instance._hora_saida_original = instance.hora_saida
+    instance._apartamento_id_original = instance.apartamento_id
+
+
+@receiver(pre_delete, sender=Reserva)
+def reserva_deleting(sender, instance: Reserva, **kwargs):
+    if _muted.get():
+        return
+
+    lock_days({(instance.data, instance.andar)})
+
+
+@receiver(post_delete, sender=Reserva)
+def reserva_deleted(sender, instance: Reserva, **kwargs):
+    if _muted.get():
+        return
+
+    release_counters(instance.data, instance.hora, instance.andar, instance.apartamento_id)
+    AvailabilityService.refresh_day(instance.data, instance.andar)
+
+    notify_changes({(instance.data, instance.andar)}, {instance.apartamento_id})
@@ -0,0 +1,89 @@
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from apps.core.intervals import minutos
+from apps.core.models import Configuracao, Disponibilidade
+
+
+class Slot(NamedTuple):
+    inicio: time
+    fim: time
+    inicio_str: str
+    fim_str: str
+    reservavel: bool
+    bit: int
+    inicio_min: int
+    fim_min: int
+
+
+class SlotTemplate:
+    # the slot sequence of a floor only depends on the configuration and the
+    # floor rules, so it is compiled once per configuracao version (see
+    # RegrasReserva) and shared by availability, validation and reminders
+
+    def __init__(self, slots: List[Slot], duracao_minutos: int, regra_impar: bool):
+        self.slots: Tuple[Slot, ...] = tuple(slots)
+        self.duracao_minutos = duracao_minutos
+        self.regra_impar = regra_impar
+        self.por_inicio: Dict[time, Slot] = {slot.inicio: slot for slot in slots}
+        self.reservaveis: Tuple[Slot, ...] = tuple(slot for slot in slots if slot.reservavel)
+        self.textos: Dict[time, str] = {
+            **{slot.fim: slot.fim_str for slot in slots},
+            **{slot.inicio: slot.inicio_str for slot in slots},
+        }
+
+    @staticmethod
+    def is_odd_hour(hora: time) -> bool:
+        return hora.hour % 2 != 0
+
+    @staticmethod
+    def compile(
+        configuracao: Configuracao,
+        duracao_minutos: Optional[int] = None,
+        horarios_permitidos: Optional[List[time]] = None,
+    ) -> "SlotTemplate":
+        duracao_minutos = duracao_minutos or configuracao.duracao_reserva_minutos
+        if horarios_permitidos:
+            # an explicit list replaces the grid and the odd-hour rule
+            inicios = sorted(set(horarios_permitidos))
+            regra_impar = False
+        else:
+            referencia = date.min
+            atual = datetime.combine(referencia, configuracao.hora_inicio)
+            fim = datetime.combine(referencia, configuracao.hora_fim)
+            inicios = []
+            while atual <= fim:
+                inicios.append(atual.time())
+                atual += timedelta(minutes=duracao_minutos)
+            regra_impar = True
+
+        slots = []
+        for inicio_slot in inicios:
+            fim_slot = (
+                datetime.combine(date.min, inicio_slot) + timedelta(minutes=duracao_minutos)
+            ).time()
+            slots.append(
+                Slot(
+                    inicio=inicio_slot,
+                    fim=fim_slot,
+                    inicio_str=inicio_slot.strftime("%H:%M"),
+                    fim_str=fim_slot.strftime("%H:%M"),
+                    reservavel=not regra_impar or SlotTemplate.is_odd_hour(inicio_slot),
+                    bit=Disponibilidade.bit(inicio_slot),
+                    inicio_min=minutos(inicio_slot),
+                    fim_min=minutos(inicio_slot) + duracao_minutos,
+                )
+            )
+
+        return SlotTemplate(slots, duracao_minutos, regra_impar)
+
+    def get(self, hora: time) -> Optional[Slot]:
+        return self.por_inicio.get(hora)
+
+    def is_reservavel(self, hora: time) -> bool:
+        slot = self.por_inicio.get(hora)
+        return slot is not None and slot.reservavel
+
+    def format_hora(self, hora: time) -> str:
+        texto = self.textos.get(hora)
+        return texto if texto is not None else hora.strftime("%H:%M")
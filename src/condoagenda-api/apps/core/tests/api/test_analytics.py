@@ -0,0 +1,99 @@
+import time as clock
+from datetime import date, time, timedelta
+
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.core.models import Apartamento, Configuracao, Reserva
+from apps.core.services import ApartamentoService, ConfiguracaoService
+
+
+class OccupancyAnalyticsTestCase(TestCase):
+    URL = "/api/metricas/ocupacao/"
+
+    def setUp(self):
+        self.client = APIClient()
+        Configuracao.objects.create()
+        self.apartamento = Apartamento.objects.create(numero=101, responsavel="João")
+        self.outro = Apartamento.objects.create(numero=102, responsavel="Maria")
+        # a monday, so weekday indexes are easy to follow
+        self.inicio = date(2026, 1, 5)
+
+    def reserva(self, dia: int, hora: int, andar: int = 0, apartamento=None, **kwargs):
+        return Reserva(
+            data=self.inicio + timedelta(days=dia),
+            hora=time(hora, 0),
+            hora_saida=time(hora + 2, 0),
+            apartamento=apartamento or self.apartamento,
+            andar=andar,
+            **kwargs,
+        )
+
+    def get(self, dias: int = 7):
+        return self.client.get(
+            self.URL,
+            {"from": str(self.inicio), "to": str(self.inicio + timedelta(days=dias - 1))},
+        )
+
+    def test_builds_matrix_and_metrics(self):
+        Reserva.objects.bulk_create(
+            [
+                self.reserva(0, 9),
+                self.reserva(0, 9, andar=1, apartamento=self.outro),
+                self.reserva(2, 9, enviar_lembrete=False),
+                self.reserva(2, 19, andar=1),
+            ]
+        )
+
+        response = self.get()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data
+        self.assertEqual(
+            data["horarios"],
+            ["07:00", "09:00", "11:00", "13:00", "15:00", "17:00", "19:00"],
+        )
+        self.assertEqual(len(data["matriz"]), 7)
+        self.assertEqual(data["matriz"][0][1], [1, 1])
+        self.assertEqual(data["matriz"][2][6], [0, 1])
+        self.assertEqual(data["total_reservas"], 4)
+        self.assertEqual(data["taxa_sem_lembrete"], 0.25)
+
+        terreo = data["andares"][0]
+        self.assertEqual(terreo["horarios_pico"], ["09:00"])
+        self.assertEqual(terreo["utilizacao_por_horario"][1], round(2 / 7, 4))
+        self.assertEqual(terreo["utilizacao_por_dia_semana"][0], round(1 / 7, 4))
+        self.assertEqual(terreo["utilizacao"], round(2 / 49, 4))
+
+        self.assertEqual(
+            data["participacao_apartamentos"][0],
+            {"numero_apartamento": 101, "quantidade": 3, "participacao": 0.75},
+        )
+
+    def test_rejects_inverted_range(self):
+        response = self.client.get(
+            self.URL, {"from": str(self.inicio), "to": str(self.inicio - timedelta(days=1))}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_year_summary_uses_two_aggregates(self):
+        Reserva.objects.bulk_create(
+            [
+                self.reserva(dia, hora, andar)
+                for dia in range(365)
+                for hora in (7, 11, 15, 19)
+                for andar in (0, 1)
+            ]
+        )
+        ConfiguracaoService.get_configuracao()
+        ApartamentoService.get_ids_by_numero()
+
+        inicio = clock.perf_counter()
+        with self.assertNumQueries(2):
+            response = self.get(dias=365)
+        duracao = clock.perf_counter() - inicio
+
+        self.assertEqual(response.data["total_reservas"], 365 * 8)
+        self.assertLess(duracao, 1)
@@ -0,0 +1,83 @@
+from datetime import date, time
+
+from asgiref.sync import iscoroutinefunction
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework import status
+
+from apps.core.api import views
+from apps.core.models import Apartamento, Configuracao, Reserva
+from apps.core.services import ApartamentoService, ConfiguracaoService
+
+
+class AsyncReadViewsTestCase(TestCase):
+    def setUp(self):
+        Configuracao.objects.create(duracao_reserva_minutos=120)
+        apartamento = Apartamento.objects.create(numero=101, responsavel="João")
+        self.today = date.today()
+        Reserva.objects.create(
+            data=self.today,
+            hora=time(9, 0),
+            hora_saida=time(11, 0),
+            apartamento=apartamento,
+            andar=0,
+        )
+
+        # cold process and shared caches: every lookup has to go through
+        # the async ORM
+        cache.clear()
+        ConfiguracaoService._cached = None
+        ApartamentoService._cached = None
+
+    def test_read_views_are_coroutines(self):
+        for view in (
+            views.list_slots_available,
+            views.list_dates_available,
+            views.my_reservations,
+        ):
+            self.assertTrue(iscoroutinefunction(view), view.__name__)
+
+    async def test_list_slots_under_asgi(self):
+        response = await self.async_client.get(
+            "/api/reservas/listar/", {"data": str(self.today), "andar": 0}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        slots = {slot["start"]: slot["available"] for slot in response.json()["slots"]}
+        self.assertFalse(slots["09:00"])
+        self.assertTrue(slots["11:00"])
+
+        revalidated = await self.async_client.get(
+            "/api/reservas/listar/",
+            {"data": str(self.today), "andar": 0},
+            headers={"If-None-Match": response["ETag"]},
+        )
+        self.assertEqual(revalidated.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    async def test_list_dates_under_asgi(self):
+        response = await self.async_client.get("/api/reservas/listar/datas/", {"andar": 0})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        datas = {item["data"]: item for item in response.json()["datas"]}
+        self.assertEqual(datas[str(self.today)]["quantidade_slots_disponiveis"], 6)
+
+    async def test_my_reservations_under_asgi(self):
+        response = await self.async_client.get(
+            "/api/reservas/listar/minhas-reservas/", {"numero_apartamento": 101}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [reserva["hora"] for reserva in response.json()["reservas"]], ["09:00:00"]
+        )
+
+        invalid = await self.async_client.get(
+            "/api/reservas/listar/minhas-reservas/",
+            {"numero_apartamento": 101, "cursor": "???"},
+        )
+        self.assertEqual(invalid.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("cursor", invalid.json())
+
+    async def test_rejects_other_methods(self):
+        response = await self.async_client.post("/api/reservas/listar/datas/")
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
@@ -0,0 +1,142 @@
+from datetime import date, time, timedelta
+
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.core.availability import AvailabilityService
+from apps.core.models import (
+    Apartamento,
+    Configuracao,
+    CotaApartamento,
+    OcupacaoSlot,
+    Reserva,
+)
+from apps.core.services import ConfiguracaoService, ReservaService
+
+
+class BatchReservationsTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.config = Configuracao.objects.create(quantidade_agendamento_por_apartamento=2)
+        self.apartamento = Apartamento.objects.create(numero=101, responsavel="João")
+        Apartamento.objects.create(numero=102, responsavel="Maria")
+        self.today = date.today()
+
+    def post(self, operacoes: list):
+        return self.client.post(
+            "/api/reservas/batch/", {"operacoes": operacoes}, format="json"
+        )
+
+    def criar(self, hora: str, numero: int = 101, andar: int = 0) -> dict:
+        return {
+            "op": "criar",
+            "data": str(self.today),
+            "hora": hora,
+            "numero_apartamento": numero,
+            "andar": andar,
+        }
+
+    def test_reports_result_per_operation(self):
+        response = self.post(
+            [
+                self.criar("09:00"),
+                self.criar("09:00", numero=102),
+                self.criar("08:00", numero=102),
+                {"op": "cancelar"},
+                self.criar("11:00"),
+            ]
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        resultados = response.data["resultados"]
+        self.assertEqual(
+            [resultado["sucesso"] for resultado in resultados],
+            [True, False, False, False, True],
+        )
+        self.assertIn("hora", resultados[1]["erro"])
+        self.assertIn("id", resultados[3]["erro"])
+        self.assertEqual(Reserva.objects.count(), 2)
+        self.assertEqual(
+            Reserva.objects.get(pk=resultados[0]["id"]).hora_saida, time(11, 0)
+        )
+
+    def test_cancel_and_move_keep_counters_and_availability(self):
+        reserva = ReservaService.create_reserva(self.today, time(9, 0), 101, 0)
+        outra = ReservaService.create_reserva(self.today, time(11, 0), 101, 0)
+
+        response = self.post(
+            [
+                {"op": "cancelar", "id": outra.id},
+                {
+                    "op": "mover",
+                    "id": reserva.id,
+                    "data": str(self.today),
+                    "hora": "13:00",
+                    "andar": 1,
+                },
+                self.criar("09:00", numero=102),
+            ]
+        )
+
+        self.assertTrue(all(r["sucesso"] for r in response.data["resultados"]))
+        self.assertFalse(Reserva.objects.filter(pk=outra.pk).exists())
+
+        reserva.refresh_from_db()
+        self.assertEqual((reserva.hora, reserva.andar), (time(13, 0), 1))
+        self.assertEqual(reserva.hora_saida, time(15, 0))
+
+        slots_terreo = {
+            slot["start"]: slot["available"]
+            for slot in AvailabilityService.get_slots(self.today, 0)
+        }
+        slots_primeiro = {
+            slot["start"]: slot["available"]
+            for slot in AvailabilityService.get_slots(self.today, 1)
+        }
+        self.assertFalse(slots_terreo["09:00"])
+        self.assertTrue(slots_terreo["11:00"])
+        self.assertFalse(slots_primeiro["13:00"])
+
+        self.assertEqual(
+            CotaApartamento.objects.get(apartamento=self.apartamento, data=self.today).quantidade,
+            1,
+        )
+        self.assertEqual(
+            OcupacaoSlot.objects.get(data=self.today, hora=time(9, 0), andar=0).quantidade,
+            1,
+        )
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        start_of_week, _ = ReservaService.get_current_week_range()
+        dias = [
+            start_of_week + timedelta(days=i)
+            for i in range(7)
+            if start_of_week + timedelta(days=i) >= self.today
+        ]
+        apartamentos = Apartamento.objects.bulk_create(
+            [Apartamento(numero=1000 + i, responsavel="") for i in range(50)]
+        )
+
+        operacoes = [
+            {
+                "op": "criar",
+                "data": str(dia),
+                "hora": f"{hora:02d}:00",
+                "numero_apartamento": apartamentos[(i * 7 + j) % 50].numero,
+                "andar": andar,
+            }
+            for i, dia in enumerate(dias)
+            for j, hora in enumerate((7, 9, 11, 13, 15, 17, 19))
+            for andar in (0, 1)
+        ]
+
+        ConfiguracaoService.load()
+        # lookups, day and counter locks, the days' reservations and holds and
+        # one bulk write per table (events and reminder outbox included),
+        # whatever the size
+        with self.assertNumQueries(15):
+            response = self.post(operacoes)
+
+        self.assertTrue(all(r["sucesso"] for r in response.data["resultados"]))
+        self.assertEqual(Reserva.objects.count(), len(operacoes))
@@ -0,0 +1,76 @@
+from datetime import date, time, timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.core.holds import ReservaTemporariaService
+from apps.core.models import Apartamento, Configuracao, Reserva
+from apps.core.services import ConfiguracaoService
+
+
+class CalendarTestCase(TestCase):
+    URL = "/api/reservas/calendario/"
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        Configuracao.objects.create()
+        self.apartamento = Apartamento.objects.create(numero=101, responsavel="João")
+        self.today = date.today()
+
+    def get(self, dias: int, **params):
+        return self.client.get(
+            self.URL,
+            {
+                "from": str(self.today),
+                "to": str(self.today + timedelta(days=dias - 1)),
+                **params,
+            },
+        )
+
+    def test_returns_grid_for_every_day_and_floor(self):
+        Reserva.objects.create(
+            data=self.today + timedelta(days=8),
+            hora=time(9, 0),
+            hora_saida=time(11, 0),
+            apartamento=self.apartamento,
+            andar=1,
+        )
+
+        response = self.get(14)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        andares = {item["andar"]: item["datas"] for item in response.data["andares"]}
+        self.assertEqual(sorted(andares), [0, 1])
+        self.assertEqual(len(andares[0]), 14)
+        self.assertEqual(len(andares[1][8]["slots"]), 7)
+
+        slots = {slot["start"]: slot["available"] for slot in andares[1][8]["slots"]}
+        self.assertFalse(slots["09:00"])
+        self.assertTrue(slots["11:00"])
+        self.assertTrue(
+            {slot["start"]: slot["available"] for slot in andares[0][8]["slots"]}["09:00"]
+        )
+
+    def test_filters_floors(self):
+        response = self.client.get(
+            f"{self.URL}?from={self.today}&to={self.today + timedelta(days=6)}&andar=1"
+        )
+
+        self.assertEqual([item["andar"] for item in response.data["andares"]], [1])
+
+    def test_rejects_long_ranges(self):
+        response = self.get(200)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_uses_one_query_for_the_range(self):
+        ConfiguracaoService.get_configuracao()
+        ReservaTemporariaService.sweep_if_due()
+
+        with self.assertNumQueries(1):
+            response = self.get(60)
+
+        self.assertEqual(len(response.data["andares"][1]["datas"]), 60)
@@ -0,0 +1,95 @@
+from datetime import date, time
+
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.core.models import Apartamento, Configuracao, Reserva
+
+
+class ConditionalRequestTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.apartamento = Apartamento.objects.create(numero=101, responsavel="João")
+        self.config = Configuracao.objects.create(
+            hora_inicio=time(7, 0),
+            hora_fim=time(19, 0),
+            duracao_reserva_minutos=120,
+            quantidade_agendamento_por_apartamento=2,
+        )
+        self.today = date.today()
+
+    def create_reserva(self, hora: time, andar: int = 0) -> Reserva:
+        return Reserva.objects.create(
+            data=self.today,
+            hora=hora,
+            hora_saida=time(hora.hour + 2, 0),
+            apartamento=self.apartamento,
+            andar=andar,
+        )
+
+    def get_slots(self, etag: str = None):
+        return self.client.get(
+            "/api/reservas/listar/",
+            {"data": str(self.today), "andar": 0},
+            headers={"If-None-Match": etag} if etag else {},
+        )
+
+    def test_matching_etag_returns_not_modified(self):
+        response = self.get_slots()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("ETag", response)
+        self.assertIn("Last-Modified", response)
+
+        response = self.get_slots(response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_reservation_write_changes_etag(self):
+        etag = self.get_slots()["ETag"]
+
+        self.create_reserva(time(9, 0))
+
+        response = self.get_slots(etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_other_floor_write_keeps_etag(self):
+        etag = self.get_slots()["ETag"]
+
+        self.create_reserva(time(9, 0), andar=1)
+
+        response = self.get_slots(etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_not_modified_dates_skip_database(self):
+        etag = self.client.get("/api/reservas/listar/datas/", {"andar": 0})["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                "/api/reservas/listar/datas/",
+                {"andar": 0},
+                headers={"If-None-Match": etag},
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_my_reservations_etag_follows_apartment_writes(self):
+        params = {"numero_apartamento": self.apartamento.numero}
+        etag = self.client.get("/api/reservas/listar/minhas-reservas/", params)["ETag"]
+
+        response = self.client.get(
+            "/api/reservas/listar/minhas-reservas/",
+            params,
+            headers={"If-None-Match": etag},
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.create_reserva(time(9, 0))
+
+        response = self.client.get(
+            "/api/reservas/listar/minhas-reservas/",
+            params,
+            headers={"If-None-Match": etag},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["reservas"]), 1)
@@ -0,0 +1,118 @@
+import asyncio
+import json
+from datetime import date, time, timedelta
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.test import TestCase
+from rest_framework import status
+
+from apps.core.events import EventoFeed, EventoService
+from apps.core.models import Apartamento, Configuracao, EventoDisponibilidade, Reserva
+from apps.core.services import ReservaService
+
+Tipo = EventoDisponibilidade.Tipo
+
+
+def parse(chunk: bytes) -> dict:
+    campos = dict(
+        linha.split(": ", 1) for linha in chunk.decode().strip().splitlines()
+    )
+    return {
+        "id": int(campos["id"]),
+        "event": campos["event"],
+        "data": json.loads(campos["data"]),
+    }
+
+
+@mock.patch.object(EventoService, "ATRASO", timedelta(0))
+@mock.patch.object(EventoFeed, "INTERVALO_SEGUNDOS", 0.01)
+class EventosDisponibilidadeTestCase(TestCase):
+    def setUp(self):
+        self.config = Configuracao.objects.create(duracao_reserva_minutos=120)
+        self.apartamento = Apartamento.objects.create(numero=101, responsavel="João")
+        self.today = date.today()
+
+    async def open(self, **headers):
+        response = await self.async_client.get("/api/reservas/eventos/", headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b"retry: 3000\n\n")
+        return stream
+
+    async def close(self, stream):
+        await stream.aclose()
+        feed = EventoFeed.get()
+        if feed.task is not None:
+            feed.task.cancel()
+
+    def test_bookings_record_slot_changes(self):
+        # the configuracao created in setUp already asked for a reload
+        EventoDisponibilidade.objects.all().delete()
+
+        reserva = ReservaService.create_reserva(self.today, time(9, 0), 101, 0)
+        reserva.delete()
+
+        self.assertEqual(
+            list(EventoDisponibilidade.objects.values_list("tipo", "data", "andar", "hora")),
+            [
+                (Tipo.OCUPADO, self.today, 0, time(9, 0)),
+                (Tipo.LIVRE, self.today, 0, time(9, 0)),
+            ],
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.config.capacidade_por_slot = 2
+            self.config.save()
+        self.assertEqual(EventoDisponibilidade.objects.last().tipo, Tipo.RECARREGAR)
+
+    async def test_resumes_from_last_event_id(self):
+        await sync_to_async(ReservaService.create_reserva)(self.today, time(9, 0), 101, 0)
+        await sync_to_async(ReservaService.create_reserva)(self.today, time(11, 0), 101, 1)
+        primeiro = await EventoDisponibilidade.objects.filter(tipo=Tipo.OCUPADO).afirst()
+
+        stream = await self.open(**{"Last-Event-ID": str(primeiro.id)})
+        evento = parse(await anext(stream))
+        await self.close(stream)
+
+        self.assertEqual(evento["event"], "ocupado")
+        self.assertEqual(
+            evento["data"],
+            {"data": str(self.today), "andar": 1, "hora": "11:00", "disponivel": False},
+        )
+
+    async def test_pushes_new_events_to_open_streams(self):
+        stream = await self.open()
+
+        reserva = await Reserva.objects.acreate(
+            data=self.today,
+            hora=time(9, 0),
+            hora_saida=time(11, 0),
+            apartamento=self.apartamento,
+            andar=0,
+        )
+        ocupado = parse(await asyncio.wait_for(anext(stream), timeout=5))
+
+        await sync_to_async(reserva.delete)()
+        livre = parse(await asyncio.wait_for(anext(stream), timeout=5))
+        await self.close(stream)
+
+        self.assertEqual((ocupado["event"], livre["event"]), ("ocupado", "livre"))
+        self.assertTrue(livre["data"]["disponivel"])
+        self.assertGreater(livre["id"], ocupado["id"])
+
+    async def test_requires_reload_when_events_were_purged(self):
+        await sync_to_async(ReservaService.create_reserva)(self.today, time(9, 0), 101, 0)
+        await EventoDisponibilidade.objects.all().adelete()
+        await sync_to_async(ReservaService.create_reserva)(self.today, time(11, 0), 101, 0)
+
+        stream = await self.open(**{"Last-Event-ID": "0"})
+        self.assertEqual(parse(await anext(stream))["event"], "recarregar")
+        self.assertEqual(parse(await anext(stream))["data"]["hora"], "11:00")
+        await self.close(stream)
+
+    def test_stream_needs_asgi(self):
+        response = self.client.get("/api/reservas/eventos/")
+        self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
@@ -0,0 +1,104 @@
+import csv
+import io
+import json
+import tempfile
+from datetime import date, time, timedelta
+
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.core.models import Apartamento, Configuracao, Reserva
+
+
+class ExportReservationsTestCase(TestCase):
+    URL = "/api/reservas/exportar/"
+
+    def setUp(self):
+        self.client = APIClient()
+        Configuracao.objects.create()
+        self.apartamento = Apartamento.objects.create(numero=101, responsavel="João")
+        self.today = date.today()
+
+        Reserva.objects.bulk_create(
+            [
+                Reserva(
+                    data=self.today + timedelta(days=dia),
+                    hora=time(9, 0),
+                    hora_saida=time(11, 0),
+                    apartamento=self.apartamento,
+                    andar=dia % 2,
+                )
+                for dia in range(-5, 5)
+            ]
+        )
+
+    def read(self, response) -> str:
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_streams_ndjson_by_default(self):
+        response = self.client.get(self.URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+
+        linhas = [json.loads(linha) for linha in self.read(response).splitlines()]
+        self.assertEqual(len(linhas), 10)
+        self.assertEqual(linhas[0]["data"], str(self.today - timedelta(days=5)))
+        self.assertEqual(linhas[0]["numero_apartamento"], 101)
+        self.assertEqual(linhas[0]["responsavel"], "João")
+
+    def test_streams_csv_with_filters(self):
+        response = self.client.get(
+            self.URL,
+            {
+                "formato": "csv",
+                "from": str(self.today),
+                "to": str(self.today + timedelta(days=3)),
+                "andar": 1,
+            },
+        )
+
+        linhas = list(csv.DictReader(io.StringIO(self.read(response))))
+        self.assertEqual(
+            [linha["data"] for linha in linhas],
+            [str(self.today + timedelta(days=dia)) for dia in (1, 3)],
+        )
+
+    async def test_streams_asynchronously_under_asgi(self):
+        response = await self.async_client.get(self.URL, {"formato": "csv"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.is_async)
+        partes = [parte async for parte in response.streaming_content]
+        # header plus one chunk per row, sent as they are read
+        self.assertEqual(len(partes), 11)
+        linhas = list(csv.DictReader(io.StringIO(b"".join(partes).decode())))
+        self.assertEqual(linhas[0]["data"], str(self.today - timedelta(days=5)))
+
+    def test_rejects_unknown_format(self):
+        response = self.client.get(self.URL, {"formato": "xml"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_command_writes_file(self):
+        with tempfile.NamedTemporaryFile(suffix=".csv") as arquivo:
+            call_command(
+                "exportar_reservas",
+                "--formato=csv",
+                f"--from={self.today}",
+                f"--output={arquivo.name}",
+                stderr=io.StringIO(),
+            )
+            with open(arquivo.name, encoding="utf-8") as lido:
+                linhas = list(csv.DictReader(lido))
+
+        self.assertEqual(len(linhas), 5)
+
+    def test_command_writes_stdout(self):
+        saida = io.StringIO()
+        call_command("exportar_reservas", "--andar=0", stdout=saida)
+
+        self.assertEqual(len(saida.getvalue().splitlines()), 5)
@@ -0,0 +1,148 @@
+from datetime import date, time, timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.core.availability import AvailabilityService
+from apps.core.holds import ReservaTemporariaService
+from apps.core.models import (
+    Apartamento,
+    Configuracao,
+    EventoDisponibilidade,
+    Reserva,
+    ReservaTemporaria,
+)
+
+
+class ReservaTemporariaTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.config = Configuracao.objects.create(duracao_reserva_minutos=120)
+        Apartamento.objects.create(numero=101, responsavel="João")
+        Apartamento.objects.create(numero=102, responsavel="Maria")
+        self.today = date.today()
+
+    def payload(self, hora: str = "09:00", numero: int = 101, **extra) -> dict:
+        return {
+            "data": str(self.today),
+            "hora": hora,
+            "numero_apartamento": numero,
+            "andar": 0,
+            **extra,
+        }
+
+    def hold(self, hora: str = "09:00", numero: int = 101) -> str:
+        response = self.client.post(
+            "/api/reservas/holds/", self.payload(hora, numero), format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data["token"]
+
+    def available(self, hora: str) -> bool:
+        slots = AvailabilityService.get_slots(self.today, 0)
+        return next(slot["available"] for slot in slots if slot["start"] == hora)
+
+    def test_held_slot_is_reserved_for_the_token(self):
+        token = self.hold()
+        self.assertFalse(self.available("09:00"))
+
+        response = self.client.post(
+            "/api/reservas/", self.payload(numero=102), format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("hora", response.data)
+
+        response = self.client.post(
+            "/api/reservas/", self.payload(hold=token), format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(ReservaTemporaria.objects.exists())
+        self.assertEqual(Reserva.objects.get().apartamento.numero, 101)
+        self.assertFalse(self.available("09:00"))
+
+    def test_hold_errors_use_distinct_statuses(self):
+        self.hold()
+
+        response = self.client.post(
+            "/api/reservas/holds/", self.payload(numero=102), format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertIn("detail", response.data)
+
+        response = self.client.post(
+            "/api/reservas/holds/", self.payload(numero=999), format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.data["detail"], "Apartamento não encontrado.")
+
+    def test_token_must_match_the_slot(self):
+        token = self.hold()
+
+        response = self.client.post(
+            "/api/reservas/", self.payload("11:00", hold=token), format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("hold", response.data)
+        self.assertFalse(Reserva.objects.exists())
+
+    def test_sweep_releases_expired_holds(self):
+        token = self.hold()
+        ReservaTemporaria.objects.update(expira_em=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(
+            ReservaTemporariaService.sweep(timezone.now() - timedelta(days=1)), 0
+        )
+        self.assertEqual(ReservaTemporariaService.sweep(), 1)
+
+        self.assertTrue(self.available("09:00"))
+        self.assertEqual(
+            EventoDisponibilidade.objects.last().tipo, EventoDisponibilidade.Tipo.LIVRE
+        )
+
+        response = self.client.post(
+            "/api/reservas/", self.payload(hold=token), format="json"
+        )
+        self.assertIn("hold", response.data)
+
+    def test_reads_release_expired_holds(self):
+        self.hold()
+        params = {"data": str(self.today), "andar": 0}
+        response = self.client.get("/api/reservas/listar/", params)
+        slots = {slot["start"]: slot["available"] for slot in response.json()["slots"]}
+        self.assertFalse(slots["09:00"])
+
+        # no new hold and no expirar_holds run: the read itself sweeps
+        depois = timezone.now() + timedelta(
+            minutes=self.config.tempo_reserva_temporaria_minutos, seconds=1
+        )
+        with mock.patch("django.utils.timezone.now", return_value=depois):
+            response = self.client.get(
+                "/api/reservas/listar/", params, headers={"If-None-Match": response["ETag"]}
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        slots = {slot["start"]: slot["available"] for slot in response.json()["slots"]}
+        self.assertTrue(slots["09:00"])
+        self.assertFalse(ReservaTemporaria.objects.exists())
+
+    def test_new_hold_replaces_the_previous_one(self):
+        self.hold("09:00")
+        self.hold("11:00")
+
+        self.assertEqual(ReservaTemporaria.objects.get().hora, time(11, 0))
+        self.assertTrue(self.available("09:00"))
+        self.assertFalse(self.available("11:00"))
+
+    def test_release(self):
+        token = self.hold()
+
+        response = self.client.delete(f"/api/reservas/holds/{token}/")
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertTrue(self.available("09:00"))
+
+        response = self.client.delete(f"/api/reservas/holds/{token}/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
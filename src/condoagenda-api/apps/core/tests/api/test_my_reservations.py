@@ -0,0 +1,87 @@
+from datetime import date, time, timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.core.models import Apartamento, Configuracao, Reserva
+
+
+class MyReservationsTestCase(TestCase):
+    URL = "/api/reservas/listar/minhas-reservas/"
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.config = Configuracao.objects.create()
+        self.apartamento = Apartamento.objects.create(numero=101, responsavel="João")
+        self.today = date.today()
+
+    def create_history(self, dias: range):
+        Reserva.objects.bulk_create(
+            [
+                Reserva(
+                    data=self.today + timedelta(days=dia),
+                    hora=time(9, 0),
+                    hora_saida=time(11, 0),
+                    apartamento=self.apartamento,
+                    andar=0,
+                )
+                for dia in dias
+            ]
+        )
+
+    def get(self, **params):
+        return self.client.get(self.URL, {"numero_apartamento": 101, **params})
+
+    def test_defaults_to_upcoming_reservations(self):
+        self.create_history(range(-30, 3))
+
+        response = self.get()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [reserva["data"] for reserva in response.data["reservas"]],
+            [str(self.today + timedelta(days=dia)) for dia in range(3)],
+        )
+        self.assertIsNone(response.data["proximo"])
+
+    def test_filters_by_date_range(self):
+        self.create_history(range(-30, 3))
+
+        response = self.get(**{"from": str(self.today - timedelta(days=5)), "to": str(self.today)})
+
+        self.assertEqual(len(response.data["reservas"]), 6)
+
+    def test_pages_follow_cursor(self):
+        self.create_history(range(0, 7))
+
+        primeira = self.get(limite=3).data
+        segunda = self.get(limite=3, cursor=primeira["proximo"]).data
+        terceira = self.get(limite=3, cursor=segunda["proximo"]).data
+
+        datas = [
+            reserva["data"]
+            for pagina in (primeira, segunda, terceira)
+            for reserva in pagina["reservas"]
+        ]
+        self.assertEqual(datas, [str(self.today + timedelta(days=dia)) for dia in range(7)])
+        self.assertIsNone(terceira["proximo"])
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.get(cursor="nao-e-um-cursor")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("cursor", response.data)
+
+    def test_query_count_does_not_grow_with_history(self):
+        self.create_history(range(-200, 100))
+        self.get()
+
+        # the apartment number resolves from memory, leaving a single select
+        with self.assertNumQueries(1):
+            response = self.get()
+
+        self.assertEqual(len(response.data["reservas"]), 50)
+        self.assertEqual(response.data["reservas"][0]["numero_apartamento"], 101)
@@ -0,0 +1,92 @@
+from datetime import date, time, timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.core.holds import ReservaTemporariaService
+from apps.core.instrumentation import MetricasService
+from apps.core.models import Apartamento, Configuracao, Reserva
+from apps.core.services import ApartamentoService, ConfiguracaoService
+from apps.core.tests.budgets import QueryBudgetMixin
+
+
+class QueryBudgetTestCase(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        Configuracao.objects.create(duracao_reserva_minutos=120)
+        apartamento = Apartamento.objects.create(numero=101, responsavel="João")
+        self.today = date.today()
+        Reserva.objects.bulk_create(
+            Reserva(
+                data=self.today + timedelta(days=dia),
+                hora=time(9, 0),
+                hora_saida=time(11, 0),
+                apartamento=apartamento,
+                andar=0,
+            )
+            for dia in range(7)
+        )
+
+        # budgets count what every request pays: the configuration and the
+        # apartment map are loaded once per version and process, the next
+        # hold expiry once a minute, the response cache starts cold
+        cache.clear()
+        ConfiguracaoService.get_regras()
+        ApartamentoService.get_ids_by_numero()
+        ReservaTemporariaService.sweep_if_due()
+        MetricasService.reset()
+
+    def get(self, budget: int, name: str, **params):
+        def request():
+            response = self.client.get(reverse(name), params)
+            if response.streaming:
+                b"".join(response.streaming_content)
+            return response
+
+        response = self.assertQueryBudget(budget, request)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_read_endpoints_stay_within_budget(self):
+        periodo = {"from": str(self.today), "to": str(self.today + timedelta(days=27))}
+        budgets = [
+            (3, "listar-datas-disponiveis", {"andar": 0}),
+            (2, "listar-slots-disponiveis", {"data": str(self.today), "andar": 0}),
+            (2, "listar-minhas-reservas", {"numero_apartamento": 101}),
+            (2, "calendario", periodo),
+            (3, "metricas-ocupacao", periodo),
+            (2, "exportar-reservas", {}),
+        ]
+        for budget, name, params in budgets:
+            with self.subTest(name):
+                self.get(budget, name, **params)
+
+    def test_cached_dates_skip_the_database(self):
+        self.get(3, "listar-datas-disponiveis", andar=0)
+        self.get(0, "listar-datas-disponiveis", andar=0)
+
+    def test_server_timing_and_histograms(self):
+        response = self.get(3, "listar-datas-disponiveis", andar=0)
+
+        metricas = {
+            item.split(";")[0].strip(): item for item in response["Server-Timing"].split(",")
+        }
+        self.assertEqual(sorted(metricas), ["serializacao", "sql", "total"])
+        self.assertIn('desc="1 consultas"', metricas["sql"])
+
+        stats = self.client.get(reverse("metricas-requisicoes")).data
+        datas = stats["listar-datas-disponiveis"]
+        self.assertEqual(datas["total_ms"]["quantidade"], 1)
+        self.assertEqual(datas["sql_consultas"]["buckets"]["+Inf"], 1)
+        self.assertEqual(datas["sql_consultas"]["soma"], 1)
+
+    async def test_counts_queries_of_async_views_under_asgi(self):
+        response = await self.async_client.get(
+            reverse("listar-minhas-reservas"), {"numero_apartamento": 101}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('desc="1 consultas"', response["Server-Timing"])
@@ -0,0 +1,21 @@
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    # assertNumQueries pins an exact count; a budget only fails when an
+    # endpoint gets more expensive, e.g. a query per day or per row
+    def assertQueryBudget(self, budget: int, func, *args, using=DEFAULT_DB_ALIAS, **kwargs):
+        with CaptureQueriesContext(connections[using]) as context:
+            result = func(*args, **kwargs)
+
+        consultas = len(context.captured_queries)
+        if consultas > budget:
+            self.fail(
+                f"{consultas} consultas, orçamento {budget}:\n"
+                + "\n".join(
+                    f"{indice}. {query['sql']}"
+                    for indice, query in enumerate(context.captured_queries, start=1)
+                )
+            )
+        return result
@@ -0,0 +1,138 @@
+from datetime import date, time, timedelta
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from apps.core.availability import AvailabilityService
+from apps.core.models import Apartamento, Configuracao, Disponibilidade, Reserva
+
+
+class AvailabilityServiceTestCase(TestCase):
+    def setUp(self):
+        self.apartamento = Apartamento.objects.create(numero=101, responsavel="João")
+        self.config = Configuracao.objects.create(
+            hora_inicio=time(7, 0),
+            hora_fim=time(19, 0),
+            duracao_reserva_minutos=120,
+            quantidade_agendamento_por_apartamento=2,
+        )
+
+    def test_get_slots_marks_reserved_slot_unavailable(self):
+        today = date.today()
+        Reserva.objects.create(
+            data=today,
+            hora=time(9, 0),
+            hora_saida=time(11, 0),
+            apartamento=self.apartamento,
+            andar=0,
+        )
+
+        slots = AvailabilityService.get_slots(today, 0)
+        slots_by_start = {slot["start"]: slot for slot in slots}
+
+        self.assertEqual(len(slots), 7)
+        self.assertFalse(slots_by_start["09:00"]["available"])
+        self.assertTrue(slots_by_start["11:00"]["available"])
+        self.assertEqual(slots_by_start["09:00"]["end"], "11:00")
+
+    def test_get_slots_range_isolates_days_and_floors(self):
+        today = date.today()
+        tomorrow = today + timedelta(days=1)
+        Reserva.objects.create(
+            data=tomorrow,
+            hora=time(7, 0),
+            hora_saida=time(9, 0),
+            apartamento=self.apartamento,
+            andar=1,
+        )
+
+        slots_por_dia = AvailabilityService.get_slots_range(today, tomorrow, 1)
+
+        self.assertTrue(slots_por_dia[today][0]["available"])
+        self.assertFalse(slots_por_dia[tomorrow][0]["available"])
+        self.assertTrue(AvailabilityService.get_slots(tomorrow, 0)[0]["available"])
+
+    def test_get_dates_returns_current_week(self):
+        datas = AvailabilityService.get_dates(0)
+
+        self.assertEqual(len(datas), 7)
+        self.assertEqual(datas[0]["data"].weekday(), 0)
+        self.assertEqual(datas[-1]["data"].weekday(), 6)
+
+    def test_get_dates_query_count_is_constant(self):
+        for dia in AvailabilityService.get_week_dates():
+            Reserva.objects.create(
+                data=dia,
+                hora=time(9, 0),
+                hora_saida=time(11, 0),
+                apartamento=self.apartamento,
+                andar=0,
+            )
+
+        AvailabilityService.get_dates(0)
+
+        # the configuration is served from memory, leaving a single range query
+        with self.assertNumQueries(1):
+            AvailabilityService.get_dates(0)
+
+
+class DisponibilidadeTestCase(TestCase):
+    def setUp(self):
+        self.apartamento = Apartamento.objects.create(numero=101, responsavel="João")
+        self.today = date.today()
+
+    def create_reserva(self, hora: time, andar: int = 0) -> Reserva:
+        return Reserva.objects.create(
+            data=self.today,
+            hora=hora,
+            hora_saida=time(hora.hour + 2, 0),
+            apartamento=self.apartamento,
+            andar=andar,
+        )
+
+    def get_ocupados(self, andar: int = 0) -> int:
+        return Disponibilidade.objects.get(data=self.today, andar=andar).ocupados
+
+    def test_reservation_write_sets_and_clears_bits(self):
+        reserva = self.create_reserva(time(9, 0))
+        self.create_reserva(time(13, 0))
+
+        self.assertEqual(
+            self.get_ocupados(),
+            Disponibilidade.bit(time(9, 0)) | Disponibilidade.bit(time(13, 0)),
+        )
+
+        reserva.delete()
+
+        self.assertEqual(self.get_ocupados(), Disponibilidade.bit(time(13, 0)))
+
+    def test_moving_reservation_moves_bit(self):
+        reserva = self.create_reserva(time(9, 0))
+        reserva = Reserva.objects.get(pk=reserva.pk)
+
+        reserva.andar = 1
+        reserva.save()
+
+        self.assertEqual(self.get_ocupados(andar=0), 0)
+        self.assertEqual(self.get_ocupados(andar=1), Disponibilidade.bit(time(9, 0)))
+
+    def test_rebuild_command_repairs_divergence(self):
+        self.create_reserva(time(9, 0))
+        Disponibilidade.objects.update(ocupados=0)
+
+        with self.assertRaises(CommandError):
+            call_command("rebuild_disponibilidade", "--check", stdout=StringIO())
+
+        call_command("rebuild_disponibilidade", stdout=StringIO())
+        call_command("rebuild_disponibilidade", "--check", stdout=StringIO())
+
+        self.assertEqual(self.get_ocupados(), Disponibilidade.bit(time(9, 0)))
+
+    def test_rebuild_command_runs_system_checks(self):
+        # manage.py runs the system checks before handle(), unlike a plain
+        # call_command
+        self.create_reserva(time(9, 0))
+
+        call_command("rebuild_disponibilidade", skip_checks=False, stdout=StringIO())
+        call_command("rebuild_disponibilidade", "--check", skip_checks=False, stdout=StringIO())
@@ -0,0 +1,73 @@
+from datetime import date, time
+
+from django.test import TestCase
+
+from apps.core.availability import AvailabilityService
+from apps.core.models import Apartamento, Configuracao, CotaApartamento, OcupacaoSlot
+from apps.core.services import ConfiguracaoService, ReservaService, ReservaValidationError
+
+
+class CounterTestCase(TestCase):
+    def setUp(self):
+        self.config = Configuracao.objects.create(
+            quantidade_agendamento_por_apartamento=2, capacidade_por_slot=3
+        )
+        for numero in (101, 102, 103, 104):
+            Apartamento.objects.create(numero=numero, responsavel="")
+        self.today = date.today()
+
+    def get_slot(self, hora: time) -> dict:
+        slots = AvailabilityService.get_slots(self.today, 0)
+        return next(slot for slot in slots if slot["start"] == f"{hora:%H:%M}")
+
+    def test_shared_slot_accepts_up_to_capacity(self):
+        for numero in (101, 102):
+            ReservaService.create_reserva(self.today, time(9, 0), numero, 0)
+            self.assertTrue(self.get_slot(time(9, 0))["available"])
+
+        ReservaService.create_reserva(self.today, time(9, 0), 103, 0)
+        self.assertFalse(self.get_slot(time(9, 0))["available"])
+
+        with self.assertRaises(ReservaValidationError):
+            ReservaService.create_reserva(self.today, time(9, 0), 104, 0)
+
+        self.assertEqual(
+            OcupacaoSlot.objects.get(data=self.today, hora=time(9, 0), andar=0).quantidade,
+            3,
+        )
+
+    def test_rejected_booking_does_not_consume_quota(self):
+        for numero in (101, 102, 103):
+            ReservaService.create_reserva(self.today, time(9, 0), numero, 0)
+
+        with self.assertRaises(ReservaValidationError):
+            ReservaService.create_reserva(self.today, time(9, 0), 104, 0)
+
+        self.assertFalse(CotaApartamento.objects.filter(apartamento__numero=104).exists())
+
+    def test_delete_releases_counters(self):
+        reservas = [
+            ReservaService.create_reserva(self.today, time(9, 0), numero, 0)
+            for numero in (101, 102, 103)
+        ]
+
+        reservas[0].delete()
+
+        self.assertTrue(self.get_slot(time(9, 0))["available"])
+        self.assertEqual(
+            CotaApartamento.objects.get(apartamento__numero=101, data=self.today).quantidade,
+            0,
+        )
+
+    def test_capacity_change_refreshes_availability(self):
+        ReservaService.create_reserva(self.today, time(9, 0), 101, 0)
+        self.assertTrue(self.get_slot(time(9, 0))["available"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.config.capacidade_por_slot = 1
+            self.config.save()
+            # rebuilt once the change is committed
+            self.assertTrue(self.get_slot(time(9, 0))["available"])
+
+        self.assertFalse(self.get_slot(time(9, 0))["available"])
+        self.assertEqual(ConfiguracaoService.get_configuracao().capacidade_por_slot, 1)
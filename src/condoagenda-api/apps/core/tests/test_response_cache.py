@@ -0,0 +1,89 @@
+import tempfile
+from datetime import date, datetime, time
+from datetime import timezone as dt_timezone
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from apps.core.availability import AvailabilityService
+from apps.core.models import Apartamento, Configuracao, Reserva
+from apps.core.response_cache import ResponseCache
+
+
+class ResponseCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.apartamento = Apartamento.objects.create(numero=101, responsavel="João")
+        self.config = Configuracao.objects.create(duracao_reserva_minutos=120)
+        self.today = date.today()
+
+    def get_slots(self):
+        return self.client.get(
+            "/api/reservas/listar/", {"data": str(self.today), "andar": 0}
+        )
+
+    def test_second_request_is_a_hit(self):
+        self.get_slots()
+
+        with self.assertNumQueries(0):
+            response = self.get_slots()
+
+        self.assertEqual(len(response.data["slots"]), 7)
+        self.assertEqual(ResponseCache.stats()["hits"], 1)
+        self.assertEqual(ResponseCache.stats()["misses"], 1)
+
+    def test_reservation_write_invalidates_cached_slots(self):
+        self.get_slots()
+        self.client.get("/api/reservas/listar/datas/", {"andar": 0})
+
+        Reserva.objects.create(
+            data=self.today,
+            hora=time(9, 0),
+            hora_saida=time(11, 0),
+            apartamento=self.apartamento,
+            andar=0,
+        )
+
+        slots = {slot["start"]: slot for slot in self.get_slots().data["slots"]}
+        datas = self.client.get("/api/reservas/listar/datas/", {"andar": 0}).data
+        quantidade = {
+            item["data"]: item["quantidade_slots_disponiveis"] for item in datas["datas"]
+        }
+
+        self.assertFalse(slots["09:00"]["available"])
+        self.assertEqual(quantidade[str(self.today)], 6)
+
+    def test_keys_follow_the_local_day(self):
+        # 01:00 UTC on a monday is still sunday in São Paulo
+        agora = datetime(2026, 10, 19, 1, 0, tzinfo=dt_timezone.utc)
+        with mock.patch("django.utils.timezone.now", return_value=agora):
+            inicio_semana = AvailabilityService.get_week_dates()[0]
+            key = ResponseCache.get_dates_key(inicio_semana, 0)
+            cache.set(key, {"datas": []})
+            ResponseCache.invalidate(date(2026, 10, 18), 0)
+
+        self.assertEqual(inicio_semana, date(2026, 10, 12))
+        self.assertIsNone(cache.get(key))
+
+    def test_configuration_change_switches_keys(self):
+        key = ResponseCache.get_slots_key(self.today, 0)
+
+        self.config.duracao_reserva_minutos = 60
+        self.config.save()
+
+        self.assertNotEqual(ResponseCache.get_slots_key(self.today, 0), key)
+
+    def test_works_with_file_backend(self):
+        with tempfile.TemporaryDirectory() as location:
+            backend = {
+                "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                "LOCATION": location,
+            }
+            with override_settings(CACHES={"default": backend}):
+                first = self.get_slots().data
+                second = self.get_slots().data
+
+        self.assertEqual(first, second)
@@ -0,0 +1,147 @@
+from datetime import date, time
+
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+
+from apps.core.availability import AvailabilityService
+from apps.core.intervals import Intervalo, IntervalIndex
+from apps.core.models import (
+    Apartamento,
+    Configuracao,
+    DataBloqueada,
+    RegraAndar,
+    Reserva,
+)
+from apps.core.services import ConfiguracaoService, ReservaService, ReservaValidationError
+
+
+class IntervalIndexTestCase(TestCase):
+    def test_finds_overlaps_and_free_seats(self):
+        index = IntervalIndex(
+            [
+                Intervalo.from_horas(time(9, 0), time(11, 0), 0, 1),
+                Intervalo.from_horas(time(13, 0), time(15, 0), 0, 2),
+                Intervalo.from_horas(time(23, 0), time(1, 0), 0, 3),
+            ]
+        )
+
+        self.assertEqual([i.chave for i in index.overlapping(600, 720)], [1])
+        self.assertEqual(index.overlapping(660, 780), [])
+        self.assertEqual([i.chave for i in index.overlapping(1400, 1410)], [3])
+
+        self.assertIsNone(index.vaga_livre(600, 720, 1))
+        self.assertEqual(index.vaga_livre(600, 720, 2), 1)
+        self.assertEqual(index.vaga_livre(600, 720, 1, ignorar=1), 0)
+
+        index.remove(1, 540)
+        self.assertEqual(index.vaga_livre(600, 720, 1), 0)
+
+
+class RegraAndarTestCase(TestCase):
+    def test_horarios_must_be_on_the_half_hour_grid(self):
+        RegraAndar(andar=0, horarios_permitidos=["07:00", "10:30"]).full_clean()
+
+        with self.assertRaises(ValidationError) as context:
+            RegraAndar(andar=0, horarios_permitidos=["07:00", "10:15"]).full_clean()
+        self.assertIn("10:15", str(context.exception))
+
+        with self.assertRaises(ValidationError):
+            RegraAndar(andar=0, horarios_permitidos=["25:00"]).full_clean()
+
+    def test_durations_must_be_on_the_half_hour_grid(self):
+        RegraAndar(andar=0, duracao_reserva_minutos=90).full_clean()
+        RegraAndar(andar=0, duracao_reserva_minutos=None).full_clean()
+
+        for duracao in (45, 0):
+            with self.subTest(duracao=duracao), self.assertRaises(ValidationError) as context:
+                RegraAndar(andar=0, duracao_reserva_minutos=duracao).full_clean()
+            self.assertIn("duracao_reserva_minutos", context.exception.message_dict)
+
+        with self.assertRaises(ValidationError) as context:
+            Configuracao(duracao_reserva_minutos=100).full_clean()
+        self.assertIn("duracao_reserva_minutos", context.exception.message_dict)
+
+
+class RegrasReservaTestCase(TestCase):
+    def setUp(self):
+        self.config = Configuracao.objects.create(
+            duracao_reserva_minutos=120, quantidade_agendamento_por_apartamento=3
+        )
+        Apartamento.objects.create(numero=101, responsavel="João")
+        Apartamento.objects.create(numero=102, responsavel="Maria")
+        self.today = date.today()
+
+    def test_rejects_overlap_across_different_starts(self):
+        ReservaService.create_reserva(self.today, time(9, 0), 101, 0)
+        RegraAndar.objects.create(
+            andar=0, duracao_reserva_minutos=60, horarios_permitidos=["10:00", "12:00"]
+        )
+
+        with self.assertRaises(ReservaValidationError) as context:
+            ReservaService.create_reserva(self.today, time(10, 0), 102, 0)
+        self.assertEqual(context.exception.field, "hora")
+
+        reserva = ReservaService.create_reserva(self.today, time(12, 0), 102, 0)
+        self.assertEqual(reserva.hora_saida, time(13, 0))
+
+    def test_floor_rule_replaces_grid(self):
+        RegraAndar.objects.create(
+            andar=1, duracao_reserva_minutos=90, horarios_permitidos=["08:00", "18:30"]
+        )
+
+        regras = ConfiguracaoService.get_regras()
+        self.assertEqual(
+            [slot.inicio_str for slot in regras.template(1).reservaveis], ["08:00", "18:30"]
+        )
+        self.assertEqual(len(regras.template(0).reservaveis), 7)
+
+        ReservaService.validate_horario(self.today, time(8, 0), 1)
+        with self.assertRaises(ReservaValidationError) as context:
+            ReservaService.validate_horario(self.today, time(9, 0), 1)
+        self.assertIn("08:00, 18:30", context.exception.message)
+
+        self.assertEqual(
+            ReservaService.get_hora_saida(self.today, time(18, 30), 1), time(20, 0)
+        )
+
+    def test_blocked_date_rejects_bookings_and_closes_grid(self):
+        DataBloqueada.objects.create(data=self.today, andar=0, motivo="Manutenção")
+
+        with self.assertRaises(ReservaValidationError) as context:
+            ReservaService.validate_horario(self.today, time(9, 0), 0)
+        self.assertIn("Manutenção", context.exception.message)
+        ReservaService.validate_horario(self.today, time(9, 0), 1)
+
+        self.assertFalse(
+            any(slot["available"] for slot in AvailabilityService.get_slots(self.today, 0))
+        )
+        self.assertTrue(
+            any(slot["available"] for slot in AvailabilityService.get_slots(self.today, 1))
+        )
+
+    def test_assigns_seats_up_to_capacity(self):
+        self.config.capacidade_por_slot = 2
+        self.config.save()
+
+        primeira = ReservaService.create_reserva(self.today, time(9, 0), 101, 0)
+        segunda = ReservaService.create_reserva(self.today, time(9, 0), 102, 0)
+        self.assertEqual((primeira.vaga, segunda.vaga), (0, 1))
+
+        with self.assertRaises(ReservaValidationError):
+            ReservaService.create_reserva(self.today, time(9, 0), 101, 0)
+
+        slots = {
+            slot["start"]: slot["available"]
+            for slot in AvailabilityService.get_slots(self.today, 0)
+        }
+        self.assertFalse(slots["09:00"])
+
+        primeira.delete()
+        direta = Reserva.objects.create(
+            data=self.today,
+            hora=time(9, 0),
+            hora_saida=time(11, 0),
+            apartamento_id=primeira.apartamento_id,
+            andar=0,
+        )
+        self.assertEqual(direta.vaga, 0)
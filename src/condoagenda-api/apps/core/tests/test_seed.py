@@ -0,0 +1,90 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.test import TestCase
+
+from apps.core.models import Apartamento, Configuracao, CotaApartamento, Reserva
+from apps.core.services import ApartamentoService
+from apps.remimders.models import LembreteOutbox
+
+
+class SeedReservasTestCase(TestCase):
+    def setUp(self):
+        Configuracao.objects.create(
+            duracao_reserva_minutos=120,
+            capacidade_por_slot=2,
+            quantidade_agendamento_por_apartamento=2,
+        )
+        Apartamento.objects.create(numero=101, responsavel="João")
+
+    def seed(self, *args):
+        call_command(
+            "seed_reservas",
+            "--apartamentos=20",
+            "--anos=0.1",
+            "--ocupacao=1",
+            *args,
+            stdout=StringIO(),
+        )
+
+    def test_respects_capacity_and_quota(self):
+        self.seed()
+
+        self.assertEqual(Apartamento.objects.count(), 20)
+        self.assertIsNotNone(ApartamentoService.get_id(210))
+        self.assertTrue(Reserva.objects.exists())
+
+        por_slot = Reserva.objects.values("data", "andar", "hora").annotate(
+            quantidade=Count("id")
+        )
+        self.assertLessEqual(max(item["quantidade"] for item in por_slot), 2)
+        self.assertFalse(
+            Reserva.objects.values("data", "andar", "hora", "vaga")
+            .annotate(quantidade=Count("id"))
+            .filter(quantidade__gt=1)
+            .exists()
+        )
+        self.assertFalse(CotaApartamento.objects.filter(quantidade__gt=2).exists())
+        # seeded phone numbers are fake
+        self.assertFalse(LembreteOutbox.objects.exists())
+
+        call_command("rebuild_disponibilidade", "--check", stdout=StringIO())
+
+    def test_is_repeatable_and_additive(self):
+        self.seed("--andares", "1", "--seed", "7")
+        primeira = list(Reserva.objects.values_list("data", "hora", "apartamento__numero"))
+        Reserva.objects.all().delete()
+
+        self.seed("--andares", "1", "--seed", "7")
+        self.assertEqual(
+            list(Reserva.objects.values_list("data", "hora", "apartamento__numero")),
+            primeira,
+        )
+        self.assertEqual(set(Reserva.objects.values_list("andar", flat=True)), {1})
+
+        self.seed("--andares", "1")
+        call_command("rebuild_disponibilidade", "--check", stdout=StringIO())
+
+    def test_benchmark_covers_every_endpoint(self):
+        self.seed("--ocupacao=0.3")
+
+        with tempfile.TemporaryDirectory() as pasta:
+            output = Path(pasta) / "benchmark.json"
+            call_command(
+                "benchmark_api", "--repeticoes=2", f"--output={output}", stdout=StringIO()
+            )
+            resultado = json.loads(output.read_text())
+
+        self.assertEqual(resultado["banco"], connection.vendor)
+        endpoints = resultado["endpoints"]
+        self.assertIn("eventos-disponibilidade", resultado["ignorados"])
+        self.assertEqual(endpoints["criar-reserva"]["status"], 201)
+        self.assertEqual(endpoints["liberar-reserva-temporaria"]["status"], 204)
+        self.assertEqual(endpoints["listar-datas-disponiveis"]["erros"], 0)
+        self.assertEqual(endpoints["listar-datas-disponiveis"]["consultas"], 0)
+        self.assertEqual(Reserva.objects.count(), resultado["dados"]["reservas"])
@@ -1,7 +1,12 @@
 from datetime import date, time, timedelta
 from django.test import TestCase
-from apps.core.models import Apartamento, Configuracao, Reserva
-from apps.core.services import ReservaService, ReservaValidationError
+from apps.core.models import Apartamento, Configuracao
+from apps.core.services import (
+    ApartamentoService,
+    ConfiguracaoService,
+    ReservaService,
+    ReservaValidationError,
+)
 
 
 class ReservaServiceTestCase(TestCase):
@@ -32,12 +37,7 @@ class ReservaServiceTestCase(TestCase):
         next_week_date = date.today() + timedelta(days=8)
         
         with self.assertRaises(ReservaValidationError) as context:
-            ReservaService.validate_reserva(
-                next_week_date,
-                time(9, 0),
-                self.apartamento,
-                0
-            )
+            ReservaService.validate_horario(next_week_date, time(9, 0), 0)
         
         self.assertIn("semana atual", context.exception.message)
     
@@ -45,12 +45,7 @@ class ReservaServiceTestCase(TestCase):
         past_date = date.today() - timedelta(days=1)
         
         with self.assertRaises(ReservaValidationError) as context:
-            ReservaService.validate_reserva(
-                past_date,
-                time(9, 0),
-                self.apartamento,
-                0
-            )
+            ReservaService.validate_horario(past_date, time(9, 0), 0)
         
         self.assertIn("semana atual", context.exception.message.lower())
     
@@ -58,61 +53,30 @@ class ReservaServiceTestCase(TestCase):
         today = date.today()
         
         with self.assertRaises(ReservaValidationError) as context:
-            ReservaService.validate_reserva(
-                today,
-                time(8, 0),
-                self.apartamento,
-                0
-            )
+            ReservaService.validate_horario(today, time(8, 0), 0)
         
         self.assertIn("ímpares", context.exception.message)
     
     def test_cannot_book_duplicate_slot(self):
         today = date.today()
         
-        Reserva.objects.create(
-            data=today,
-            hora=time(9, 0),
-            apartamento=self.apartamento,
-            andar=0
-        )
+        ReservaService.create_reserva(today, time(9, 0), self.apartamento.numero, 0)
         
         apartamento2 = Apartamento.objects.create(numero=102, responsavel="Maria")
         
         with self.assertRaises(ReservaValidationError) as context:
-            ReservaService.validate_reserva(
-                today,
-                time(9, 0),
-                apartamento2,
-                0
-            )
+            ReservaService.create_reserva(today, time(9, 0), apartamento2.numero, 0)
         
         self.assertIn("Já existe uma reserva", context.exception.message)
     
     def test_cannot_exceed_max_reservations_per_day(self):
         today = date.today()
         
-        Reserva.objects.create(
-            data=today,
-            hora=time(9, 0),
-            apartamento=self.apartamento,
-            andar=0
-        )
-        
-        Reserva.objects.create(
-            data=today,
-            hora=time(11, 0),
-            apartamento=self.apartamento,
-            andar=1
-        )
+        ReservaService.create_reserva(today, time(9, 0), self.apartamento.numero, 0)
+        ReservaService.create_reserva(today, time(11, 0), self.apartamento.numero, 1)
         
         with self.assertRaises(ReservaValidationError) as context:
-            ReservaService.validate_reserva(
-                today,
-                time(13, 0),
-                self.apartamento,
-                0
-            )
+            ReservaService.create_reserva(today, time(13, 0), self.apartamento.numero, 0)
         
         self.assertIn("limite", context.exception.message)
     
@@ -152,3 +116,53 @@ class ReservaServiceTestCase(TestCase):
         self.assertIsNotNone(reserva1.id)
         self.assertIsNotNone(reserva2.id)
 
+
+class ConfiguracaoServiceTestCase(TestCase):
+    def setUp(self):
+        self.config = Configuracao.objects.create(duracao_reserva_minutos=120)
+
+    def test_get_configuracao_is_served_from_memory(self):
+        ConfiguracaoService.get_configuracao()
+
+        with self.assertNumQueries(0):
+            config = ConfiguracaoService.get_configuracao()
+
+        self.assertEqual(config.pk, self.config.pk)
+
+    def test_saving_configuracao_invalidates_cache(self):
+        ConfiguracaoService.get_configuracao()
+        version = ConfiguracaoService.get_version()
+
+        self.config.duracao_reserva_minutos = 60
+        self.config.save()
+
+        self.assertNotEqual(ConfiguracaoService.get_version(), version)
+        self.assertEqual(ConfiguracaoService.get_configuracao().duracao_reserva_minutos, 60)
+
+
+class ApartamentoServiceTestCase(TestCase):
+    def setUp(self):
+        self.apartamento = Apartamento.objects.create(numero=101, responsavel="João")
+
+    def test_get_id_is_served_from_memory(self):
+        ApartamentoService.get_id(101)
+
+        with self.assertNumQueries(0):
+            apartamento_id = ApartamentoService.get_id(101)
+
+        self.assertEqual(apartamento_id, self.apartamento.pk)
+        self.assertIsNone(ApartamentoService.get_id(999))
+
+    def test_apartment_changes_invalidate_cache(self):
+        ApartamentoService.get_id(101)
+
+        self.apartamento.numero = 201
+        self.apartamento.save()
+        novo = Apartamento.objects.create(numero=102, responsavel="Maria")
+
+        self.assertIsNone(ApartamentoService.get_id(101))
+        self.assertEqual(ApartamentoService.get_id(201), self.apartamento.pk)
+        self.assertEqual(ApartamentoService.get_id(102), novo.pk)
+
+        novo.delete()
+        self.assertIsNone(ApartamentoService.get_id(102))
@@ -0,0 +1,54 @@
+from datetime import time
+
+from django.test import TestCase
+
+from apps.core.models import Configuracao
+from apps.core.services import ConfiguracaoService, ReservaService, ReservaValidationError
+
+
+class SlotTemplateTestCase(TestCase):
+    def setUp(self):
+        self.config = Configuracao.objects.create(duracao_reserva_minutos=120)
+
+    def test_compiles_slots_with_rendered_strings(self):
+        template = ConfiguracaoService.get_regras().template(0)
+
+        self.assertEqual(
+            [(slot.inicio_str, slot.fim_str) for slot in template.slots][:2],
+            [("07:00", "09:00"), ("09:00", "11:00")],
+        )
+        self.assertEqual(len(template.reservaveis), 7)
+        self.assertEqual(template.format_hora(time(21, 0)), "21:00")
+
+    def test_template_is_compiled_once_per_version(self):
+        template = ConfiguracaoService.get_regras().template(0)
+
+        with self.assertNumQueries(0):
+            self.assertIs(ConfiguracaoService.get_regras().template(0), template)
+
+        self.config.duracao_reserva_minutos = 60
+        self.config.save()
+
+        template = ConfiguracaoService.get_regras().template(0)
+        self.assertEqual(len(template.slots), 13)
+        self.assertEqual(
+            [slot.inicio_str for slot in template.reservaveis][:3],
+            ["07:00", "09:00", "11:00"],
+        )
+
+    def test_validation_follows_template(self):
+        hoje = ReservaService.get_current_week_range()[1]
+
+        ReservaService.validate_horario(hoje, time(9, 0), 0)
+        with self.assertRaises(ReservaValidationError) as context:
+            ReservaService.validate_horario(hoje, time(9, 15), 0)
+        self.assertIn("ímpares", context.exception.message)
+
+        with self.assertRaises(ReservaValidationError) as context:
+            ReservaService.validate_horario(hoje, time(21, 0), 0)
+        self.assertIn("entre", context.exception.message)
+
+    def test_hora_saida_comes_from_template(self):
+        hoje = ReservaService.get_current_week_range()[1]
+
+        self.assertEqual(ReservaService.get_hora_saida(hoje, time(9, 0), 0), time(11, 0))
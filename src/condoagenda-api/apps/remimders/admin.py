@@ -0,0 +1,10 @@
+from django.contrib import admin
+
+from .models import LembreteOutbox
+
+
+@admin.register(LembreteOutbox)
+class LembreteOutboxAdmin(admin.ModelAdmin):
+    list_display = ("reserva", "tipo", "estado", "tentativas", "disponivel_em", "ultimo_erro")
+    list_filter = ("estado", "tipo")
+    raw_id_fields = ("reserva",)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class RemimdersConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.remimders"
+
+    def ready(self):
+        from apps.remimders import signals  # noqa: F401
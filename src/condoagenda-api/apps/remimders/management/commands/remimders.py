@@ -1,10 +1,17 @@
 import asyncio
-from datetime import datetime
-from django.core.management.base import BaseCommand
+from datetime import timedelta
+from typing import Dict, List, Tuple
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
 from asgiref.sync import sync_to_async
-from apps.core.models import Reserva, Configuracao
+from apps.core.models import Reserva
+from apps.core.services import ConfiguracaoService
+from apps.core.rules import RegrasReserva
 
+from apps.remimders.models import LembreteOutbox
+from apps.remimders.scheduler import LembreteScheduler
+from apps.remimders.services import LembreteService, OutboxService
 from apps.remimders.whatsapp.client import WhatsAppClient
 
 import os
@@ -24,110 +31,206 @@ class Command(BaseCommand):
             api_key=EVOLUTION_API_KEY,
             default_instance=EVOLUTION_DEFAULT_INSTANCE,
         )
-
-    async def send_entrada_reminders(self, config: Configuracao):
-        now = timezone.now()
-
-        reservas = await sync_to_async(list)(
-            Reserva.objects.filter(
-                enviar_lembrete=True,
-                lembrete_entrada_enviado=False,
-            )
+        # coalescing ratio: reminders sent per Evolution call
+        self.lembretes = 0
+        self.mensagens = 0
+
+    def entrada_message(self, reserva: Reserva, regras: RegrasReserva) -> str:
+        template = regras.template(reserva.andar)
+        return (
+            f"🏊 Lembrete de Reserva\n\n"
+            f"Sua reserva no {reserva.get_andar_display()} está próxima!\n"
+            f"Data: {reserva.data.strftime('%d/%m/%Y')}\n"
+            f"Horário de entrada: {template.format_hora(reserva.hora)}\n"
+            f"Apartamento: {reserva.apartamento.numero}"
         )
 
-        for reserva in reservas:
-            reserva_datetime = timezone.make_aware(
-                datetime.combine(reserva.data, reserva.hora)
-            )
-
-            time_diff = (reserva_datetime - now).total_seconds() / 60
-
-            if 0 <= time_diff <= config.tempo_lembrete_entrada_minutos:
-                apartamento_numero = await sync_to_async(
-                    lambda: reserva.apartamento.numero
-                )()
-                andar_display = await sync_to_async(reserva.get_andar_display)()
-
-                message = (
-                    f"🏊 Lembrete de Reserva\n\n"
-                    f"Sua reserva no {andar_display} está próxima!\n"
-                    f"Data: {reserva.data.strftime('%d/%m/%Y')}\n"
-                    f"Horário de entrada: {reserva.hora.strftime('%H:%M')}\n"
-                    f"Apartamento: {apartamento_numero}"
-                )
+    def saida_message(self, reserva: Reserva, regras: RegrasReserva) -> str:
+        template = regras.template(reserva.andar)
+        return (
+            f"⏰ Lembrete de Saída\n\n"
+            f"Sua reserva no {reserva.get_andar_display()} está próxima do fim!\n"
+            f"Horário de saída: {template.format_hora(reserva.hora_saida)}\n"
+            f"Por favor, organize-se para liberar o espaço."
+        )
 
+    def digest_message(self, itens: List[LembreteOutbox], regras: RegrasReserva) -> str:
+        mensagens = {
+            LembreteOutbox.Tipo.ENTRADA: self.entrada_message,
+            LembreteOutbox.Tipo.SAIDA: self.saida_message,
+        }
+        partes = [mensagens[item.tipo](item.reserva, regras) for item in itens]
+        if len(partes) == 1:
+            return partes[0]
+        return f"🔔 Você tem {len(partes)} lembretes\n\n" + "\n\n".join(partes)
+
+    async def deliver(
+        self, itens: List[LembreteOutbox], regras: RegrasReserva
+    ) -> Tuple[List[LembreteOutbox], List[LembreteOutbox]]:
+        # one message per phone number, at most `concorrencia` requests in
+        # flight; failed items keep their error in ultimo_erro
+        grupos: Dict[str, List[LembreteOutbox]] = {}
+        for item in sorted(itens, key=lambda item: item.momento):
+            grupos.setdefault(item.reserva.phone_number or f"#{item.id}", []).append(item)
+
+        self.lembretes += len(itens)
+        self.mensagens += len(grupos)
+        semaforo = asyncio.Semaphore(self.concorrencia)
+
+        async def enviar(grupo: List[LembreteOutbox]) -> bool:
+            async with semaforo:
                 try:
-                    await self.whatsapp_client.send_plain_text_message(
-                        message=message, phone_number=reserva.phone_number
-                    )
-                    reserva.lembrete_entrada_enviado = True
-                    await sync_to_async(reserva.save)()
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            f"Lembrete de entrada enviado para reserva #{reserva.id}"
-                        )
+                    resposta = await self.whatsapp_client.send_plain_text_message(
+                        message=self.digest_message(grupo, regras),
+                        phone_number=grupo[0].reserva.phone_number,
                     )
+                    erro = "" if resposta.ok else resposta.message
                 except Exception as e:
-                    self.stdout.write(
-                        self.style.ERROR(
-                            f"Erro ao enviar lembrete de entrada para reserva #{reserva.id}: {e}"
-                        )
+                    erro = str(e) or type(e).__name__
+
+            for item in grupo:
+                item.ultimo_erro = erro[:255]
+            if erro:
+                reservas = ", ".join(f"#{item.reserva_id}" for item in grupo)
+                self.stdout.write(
+                    self.style.ERROR(
+                        f"Erro ao enviar {len(grupo)} lembrete(s) das reservas {reservas} "
+                        f"(tentativa {grupo[0].tentativas}): {erro}"
                     )
-
-    async def send_saida_reminders(self, config: Configuracao):
-        now = timezone.now()
-
-        reservas = await sync_to_async(list)(
-            Reserva.objects.filter(
-                enviar_lembrete=True,
-                lembrete_saida_enviado=False,
-            ).exclude(hora_saida__isnull=True)
-        )
-
-        for reserva in reservas:
-            reserva_saida_datetime = timezone.make_aware(
-                datetime.combine(reserva.data, reserva.hora_saida)
+                )
+            return not erro
+
+        resultados = await asyncio.gather(*(enviar(grupo) for grupo in grupos.values()))
+        enviados, falhas = [], []
+        for grupo, ok in zip(grupos.values(), resultados):
+            (enviados if ok else falhas).extend(grupo)
+        return enviados, falhas
+
+    async def send_reminders(self, itens: List[LembreteOutbox], regras: RegrasReserva):
+        enviados, falhas = await self.deliver(itens, regras)
+        await sync_to_async(OutboxService.record)(enviados, falhas, timezone.now())
+
+        if enviados:
+            self.stdout.write(self.style.SUCCESS(f"{len(enviados)} lembrete(s) enviado(s)"))
+        desistidos = sum(item.estado == LembreteOutbox.Estado.FALHOU for item in falhas)
+        if desistidos:
+            self.stdout.write(
+                self.style.ERROR(f"{desistidos} lembrete(s) sem mais tentativas")
             )
 
-            time_diff = (reserva_saida_datetime - now).total_seconds() / 60
-
-            if 0 <= time_diff <= config.tempo_lembrete_saida_minutos:
-                andar_display = await sync_to_async(reserva.get_andar_display)()
-
-                message = (
-                    f"⏰ Lembrete de Saída\n\n"
-                    f"Sua reserva no {andar_display} está próxima do fim!\n"
-                    f"Horário de saída: {reserva.hora_saida.strftime('%H:%M')}\n"
-                    f"Por favor, organize-se para liberar o espaço."
-                )
-
-                try:
-                    await self.whatsapp_client.send_plain_text_message(
-                        reserva.phone_number, message
-                    )
-                    reserva.lembrete_saida_enviado = True
-                    await sync_to_async(reserva.save)()
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            f"Lembrete de saída enviado para reserva #{reserva.id}"
-                        )
-                    )
-                except Exception as e:
-                    self.stdout.write(
-                        self.style.ERROR(
-                            f"Erro ao enviar lembrete de saída para reserva #{reserva.id}: {e}"
-                        )
-                    )
+    def coalescing_ratio(self) -> float:
+        # reminders per Evolution call since the command started
+        return self.lembretes / self.mensagens if self.mensagens else 1.0
 
     async def process_reminders(self):
         try:
-            config, _ = await sync_to_async(Configuracao.objects.get_or_create)(id=1)
-            await self.send_entrada_reminders(config)
-            await self.send_saida_reminders(config)
+            agora = timezone.now()
+            _, config, regras = await sync_to_async(ConfiguracaoService.load)()
+
+            entradas_expiradas, saidas_expiradas = await sync_to_async(
+                LembreteService.expire
+            )(agora)
+            await sync_to_async(OutboxService.expire)(agora)
+            if entradas_expiradas or saidas_expiradas:
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"Lembretes expirados: {entradas_expiradas} de entrada, "
+                        f"{saidas_expiradas} de saída"
+                    )
+                )
+
+            # other workers claim their own batches meanwhile
+            lembretes, mensagens = self.lembretes, self.mensagens
+            while itens := await sync_to_async(OutboxService.claim)(
+                agora, config, self.lote, self.janela
+            ):
+                await self.send_reminders(itens, regras)
+
+            if self.mensagens > mensagens:
+                self.stdout.write(
+                    f"{self.lembretes - lembretes} lembrete(s) em "
+                    f"{self.mensagens - mensagens} mensagem(ns); agrupamento "
+                    f"{self.coalescing_ratio():.2f} lembrete(s) por mensagem"
+                )
         except Exception as e:
             self.stdout.write(self.style.ERROR(f"Erro ao processar lembretes: {e}"))
 
+    async def run_daemon(self, intervalo: float):
+        scheduler = LembreteScheduler()
+        await scheduler.load(timezone.now())
+        self.stdout.write(f"{len(scheduler)} lembrete(s) agendado(s)")
+
+        while True:
+            await asyncio.sleep(scheduler.seconds_until_next(timezone.now(), intervalo))
+
+            agora = timezone.now()
+            try:
+                await scheduler.refresh(agora)
+            except Exception as e:
+                # keeps the current heap and tries again on the next wake
+                self.stdout.write(self.style.ERROR(f"Erro ao atualizar lembretes: {e}"))
+
+            vencidos = scheduler.pop_due(agora)
+            if vencidos:
+                await self.process_reminders()
+                scheduler.retry(vencidos, agora + timedelta(seconds=intervalo))
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concorrencia",
+            type=int,
+            default=20,
+            help="Mensagens enviadas ao mesmo tempo",
+        )
+        parser.add_argument(
+            "--lote",
+            type=int,
+            default=200,
+            help="Lembretes reservados por vez; outros processos pegam os demais",
+        )
+        parser.add_argument(
+            "--janela",
+            type=float,
+            default=120,
+            help=(
+                "Segundos de antecedência com que lembretes do mesmo telefone "
+                "entram na mesma mensagem"
+            ),
+        )
+        parser.add_argument(
+            "--daemon",
+            action="store_true",
+            help="Fica em execução e envia cada lembrete na hora, sem depender do cron",
+        )
+        parser.add_argument(
+            "--intervalo",
+            type=float,
+            default=30,
+            help="Segundos entre leituras de reservas novas ou alteradas (modo daemon)",
+        )
+
+    def configure(self, options: dict):
+        # the defaults live in add_arguments only
+        self.concorrencia = max(1, options["concorrencia"])
+        self.lote = max(1, options["lote"])
+        self.janela = timedelta(seconds=max(0, options["janela"]))
+
     def handle(self, *args, **options):
+        self.configure(options)
+        if options["daemon"]:
+            # the daemon notices configuracao changes through the version
+            # stamp, which a per-process cache never shares
+            if settings.LOCMEM_CACHE:
+                raise CommandError(
+                    "O modo daemon precisa de um CACHE_URL compartilhado (redis, memcached ou dbcache)"
+                )
+            self.stdout.write(self.style.NOTICE("Agendador de lembretes iniciado"))
+            try:
+                asyncio.run(self.run_daemon(options["intervalo"]))
+            except KeyboardInterrupt:
+                self.stdout.write(self.style.SUCCESS("Agendador encerrado"))
+            return
+
         self.stdout.write(self.style.NOTICE("Iniciando processamento de lembretes..."))
         asyncio.run(self.process_reminders())
         self.stdout.write(self.style.SUCCESS("Processamento concluído"))
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def enfileirar_pendentes(apps, schema_editor):
+    # reminders not yet sent or expired go to the outbox
+    Reserva = apps.get_model("core", "Reserva")
+    LembreteOutbox = apps.get_model("remimders", "LembreteOutbox")
+
+    agora = timezone.now()
+    pendentes = (
+        ("entrada", Reserva.objects.filter(
+            enviar_lembrete=True,
+            lembrete_entrada_enviado=False,
+            lembrete_entrada_expirado=False,
+            inicio_at__gte=agora,
+        )),
+        ("saida", Reserva.objects.filter(
+            enviar_lembrete=True,
+            lembrete_saida_enviado=False,
+            lembrete_saida_expirado=False,
+            fim_at__gte=agora,
+        )),
+    )
+    for tipo, reservas in pendentes:
+        LembreteOutbox.objects.bulk_create(
+            (
+                LembreteOutbox(reserva_id=pk, tipo=tipo)
+                for pk in reservas.values_list("id", flat=True).iterator(chunk_size=2000)
+            ),
+            batch_size=2000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('core', '0010_reserva_updated_at_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LembreteOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('entrada', 'Entrada'), ('saida', 'Saída')], max_length=10)),
+                ('estado', models.CharField(choices=[('pendente', 'Pendente'), ('enviado', 'Enviado'), ('expirado', 'Expirado'), ('falhou', 'Falhou')], default='pendente', max_length=10)),
+                ('tentativas', models.PositiveSmallIntegerField(default=0)),
+                ('disponivel_em', models.DateTimeField(default=django.utils.timezone.now)),
+                ('ultimo_erro', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('reserva', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lembretes', to='core.reserva')),
+            ],
+            options={
+                'verbose_name': 'Lembrete',
+                'verbose_name_plural': 'Lembretes',
+                'indexes': [models.Index(condition=models.Q(('estado', 'pendente')), fields=['disponivel_em'], name='lembrete_outbox_pendente_idx')],
+                'constraints': [models.UniqueConstraint(fields=('reserva', 'tipo'), name='unique_lembrete_outbox')],
+            },
+        ),
+        migrations.RunPython(enfileirar_pendentes, migrations.RunPython.noop),
+    ]
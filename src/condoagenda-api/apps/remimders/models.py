@@ -0,0 +1,60 @@
+from django.db import models
+from django.utils import timezone
+
+from apps.core.models import Reserva
+
+
+class LembreteOutbox(models.Model):
+    # one row per reminder, written in the same transaction as the
+    # reservation. workers claim due rows with SELECT ... FOR UPDATE SKIP
+    # LOCKED, so any number of them can run without sending twice
+    class Tipo(models.TextChoices):
+        ENTRADA = ("entrada", "Entrada")
+        SAIDA = ("saida", "Saída")
+
+    class Estado(models.TextChoices):
+        PENDENTE = ("pendente", "Pendente")
+        ENVIADO = ("enviado", "Enviado")
+        # the reminder time passed before it could be sent
+        EXPIRADO = ("expirado", "Expirado")
+        # dead letter: every attempt failed
+        FALHOU = ("falhou", "Falhou")
+
+    reserva = models.ForeignKey(Reserva, on_delete=models.CASCADE, related_name="lembretes")
+    tipo = models.CharField(max_length=10, choices=Tipo.choices)
+    estado = models.CharField(max_length=10, choices=Estado.choices, default=Estado.PENDENTE)
+
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    # not claimed before this: pushed forward while a worker holds the row
+    # and by the backoff after a failure
+    disponivel_em = models.DateTimeField(default=timezone.now)
+    ultimo_erro = models.CharField(max_length=255, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def momento(self):
+        if self.tipo == self.Tipo.ENTRADA:
+            return self.reserva.inicio_at
+        return self.reserva.fim_at
+
+    def __str__(self):
+        return f"#{self.reserva_id} {self.get_tipo_display()}: {self.get_estado_display()}"
+
+    class Meta:
+        verbose_name = "Lembrete"
+        verbose_name_plural = "Lembretes"
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=["reserva", "tipo"], name="unique_lembrete_outbox"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["disponivel_em"],
+                name="lembrete_outbox_pendente_idx",
+                condition=models.Q(estado="pendente"),
+            ),
+        ]
@@ -0,0 +1,148 @@
+import heapq
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from django.db.models import Max, Q
+
+from apps.core.models import Configuracao, Reserva
+from apps.core.services import ConfiguracaoService
+from apps.remimders.models import LembreteOutbox
+from apps.remimders.services import LembreteService
+
+# (reserva id, LembreteOutbox.Tipo)
+Chave = Tuple[int, str]
+
+
+class LembreteScheduler:
+    # fire times of the upcoming reminders in a heap, so the daemon sleeps
+    # until the next one instead of scanning the table. the heap is kept in
+    # sync by two cheap indexed reads per refresh: rows touched since the
+    # updated_at cursor, and reservations entering the loaded horizon.
+    # replaced entries stay in the heap and are skipped when popped
+    HORIZONTE = timedelta(hours=6)
+    # updated_at comes from each writer's clock and commits land late, so
+    # every refresh re-reads a little before the cursor
+    ATRASO = timedelta(minutes=1)
+
+    def __init__(self):
+        self.heap: List[Tuple[datetime, Chave]] = []
+        self.agendados: Dict[Chave, datetime] = {}
+        self.cursor: Optional[datetime] = None
+        self.carregado_ate: Optional[datetime] = None
+        self.versao: Optional[str] = None
+        self.config: Optional[Configuracao] = None
+
+    def __len__(self) -> int:
+        return len(self.agendados)
+
+    def schedule(self, chave: Chave, quando: datetime):
+        if self.agendados.get(chave) == quando:
+            return
+        self.agendados[chave] = quando
+        heapq.heappush(self.heap, (quando, chave))
+
+    def unschedule(self, chave: Chave):
+        self.agendados.pop(chave, None)
+
+    def retry(self, chaves: List[Chave], quando: datetime):
+        # popped reminders come back until a refresh sees them sent or
+        # expired, so a failed send is tried again while its window lasts
+        for chave in chaves:
+            self.schedule(chave, quando)
+
+    def apply(self, reserva: Reserva, limite: datetime):
+        # the entrada fires as soon as it enters its window, i.e.
+        # tempo_lembrete_entrada_minutos before the start; same for saidas.
+        # fire times past the horizon are left to the horizon read
+        pendentes = (
+            (
+                LembreteOutbox.Tipo.ENTRADA,
+                reserva.enviar_lembrete
+                and not reserva.lembrete_entrada_enviado
+                and not reserva.lembrete_entrada_expirado,
+                reserva.inicio_at
+                - timedelta(minutes=self.config.tempo_lembrete_entrada_minutos),
+            ),
+            (
+                LembreteOutbox.Tipo.SAIDA,
+                reserva.enviar_lembrete
+                and not reserva.lembrete_saida_enviado
+                and not reserva.lembrete_saida_expirado,
+                reserva.fim_at - timedelta(minutes=self.config.tempo_lembrete_saida_minutos),
+            ),
+        )
+        for tipo, pendente, quando in pendentes:
+            if pendente and quando <= limite:
+                self.schedule((reserva.id, tipo), quando)
+            else:
+                self.unschedule((reserva.id, tipo))
+
+    def firing_between(self, desde: datetime, ate: datetime) -> Q:
+        # reminders firing in (desde, ate]; the ranges stay on the partial
+        # indexes of inicio_at and fim_at
+        entrada = timedelta(minutes=self.config.tempo_lembrete_entrada_minutos)
+        saida = timedelta(minutes=self.config.tempo_lembrete_saida_minutos)
+        return (
+            LembreteService.entrada_pendente()
+            & Q(inicio_at__gt=desde + entrada, inicio_at__lte=ate + entrada)
+        ) | (
+            LembreteService.saida_pendente()
+            & Q(fim_at__gt=desde + saida, fim_at__lte=ate + saida)
+        )
+
+    async def load(self, agora: datetime):
+        self.versao, self.config, _ = await ConfiguracaoService.aload()
+        self.heap = []
+        self.agendados = {}
+
+        ultimo = await Reserva.objects.aaggregate(ultimo=Max("updated_at"))
+        self.cursor = ultimo["ultimo"] or agora
+
+        # anything still inside its window is due right away
+        entrada = timedelta(minutes=self.config.tempo_lembrete_entrada_minutos)
+        saida = timedelta(minutes=self.config.tempo_lembrete_saida_minutos)
+        self.carregado_ate = agora + self.HORIZONTE
+        async for reserva in Reserva.objects.filter(
+            self.firing_between(agora - max(entrada, saida), self.carregado_ate)
+        ):
+            self.apply(reserva, self.carregado_ate)
+
+    async def refresh(self, agora: datetime):
+        # a new configuracao may move every fire time
+        if await ConfiguracaoService.aget_version() != self.versao:
+            await self.load(agora)
+            return
+
+        limite = agora + self.HORIZONTE
+        cursor = self.cursor
+        async for reserva in Reserva.objects.filter(
+            Q(updated_at__gt=cursor - self.ATRASO)
+            | self.firing_between(self.carregado_ate, limite)
+        ):
+            self.apply(reserva, limite)
+            self.cursor = max(self.cursor, reserva.updated_at)
+        self.carregado_ate = limite
+
+    def next_deadline(self) -> Optional[datetime]:
+        while self.heap:
+            quando, chave = self.heap[0]
+            if self.agendados.get(chave) == quando:
+                return quando
+            heapq.heappop(self.heap)
+        return None
+
+    def pop_due(self, agora: datetime) -> List[Chave]:
+        vencidos = []
+        while (quando := self.next_deadline()) is not None and quando <= agora:
+            _, chave = heapq.heappop(self.heap)
+            del self.agendados[chave]
+            vencidos.append(chave)
+        return vencidos
+
+    def seconds_until_next(self, agora: datetime, intervalo: float) -> float:
+        # sleeps until the next reminder, waking at least every `intervalo`
+        # seconds to pick up new and changed reservations
+        quando = self.next_deadline()
+        if quando is None:
+            return intervalo
+        return max(0.0, min(intervalo, (quando - agora).total_seconds()))
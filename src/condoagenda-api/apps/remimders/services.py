@@ -0,0 +1,174 @@
+from datetime import datetime, timedelta
+from typing import Iterable, List, Tuple
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from apps.core.models import Configuracao, Reserva
+from apps.remimders.models import LembreteOutbox
+
+
+class LembreteService:
+    # the filters match the partial indexes on Reserva, so both lookups only
+    # touch reservations still waiting for a reminder
+
+    @staticmethod
+    def entrada_pendente() -> Q:
+        return Q(
+            enviar_lembrete=True,
+            lembrete_entrada_enviado=False,
+            lembrete_entrada_expirado=False,
+        )
+
+    @staticmethod
+    def saida_pendente() -> Q:
+        return Q(
+            enviar_lembrete=True,
+            lembrete_saida_enviado=False,
+            lembrete_saida_expirado=False,
+        )
+
+    @staticmethod
+    def expire(agora: datetime) -> Tuple[int, int]:
+        # reminders whose moment has passed are never sent; flagging them
+        # keeps them out of the partial indexes
+        atualizado = timezone.now()
+        entradas = Reserva.objects.filter(
+            LembreteService.entrada_pendente(), inicio_at__lt=agora
+        ).update(lembrete_entrada_expirado=True, updated_at=atualizado)
+        saidas = Reserva.objects.filter(
+            LembreteService.saida_pendente(), fim_at__lt=agora
+        ).update(lembrete_saida_expirado=True, updated_at=atualizado)
+        return entradas, saidas
+
+    @staticmethod
+    def mark_sent(ids: List[int], **flags) -> int:
+        # a single UPDATE for the whole run; flags don't touch availability,
+        # so skipping the Reserva signals is fine
+        if not ids:
+            return 0
+        return Reserva.objects.filter(id__in=ids).update(**flags, updated_at=timezone.now())
+
+
+class OutboxService:
+    # a claimed row is left alone this long; a worker that dies mid-send
+    # gives it back when the lease runs out
+    PRAZO = timedelta(minutes=5)
+    BACKOFF = timedelta(seconds=30)
+    BACKOFF_MAXIMO = timedelta(minutes=10)
+    MAX_TENTATIVAS = 5
+
+    @staticmethod
+    def enqueue(reservas: Iterable[Reserva]) -> int:
+        # rows written as already sent or expired (e.g. seeded history)
+        # have nothing left to send
+        itens = []
+        for reserva in reservas:
+            if not reserva.enviar_lembrete:
+                continue
+            if not (reserva.lembrete_entrada_enviado or reserva.lembrete_entrada_expirado):
+                itens.append(LembreteOutbox(reserva=reserva, tipo=LembreteOutbox.Tipo.ENTRADA))
+            if not (reserva.lembrete_saida_enviado or reserva.lembrete_saida_expirado):
+                itens.append(LembreteOutbox(reserva=reserva, tipo=LembreteOutbox.Tipo.SAIDA))
+        LembreteOutbox.objects.bulk_create(itens, batch_size=1000, ignore_conflicts=True)
+        return len(itens)
+
+    @staticmethod
+    def due(agora: datetime, config: Configuracao, adiantamento: timedelta = timedelta(0)) -> Q:
+        # the window is read from the reservation, so moved reservations and
+        # new reminder times need no outbox update. `adiantamento` stretches
+        # it to reminders coming due a little later
+        fim_entrada = (
+            agora + timedelta(minutes=config.tempo_lembrete_entrada_minutos) + adiantamento
+        )
+        fim_saida = agora + timedelta(minutes=config.tempo_lembrete_saida_minutos) + adiantamento
+        return Q(
+            estado=LembreteOutbox.Estado.PENDENTE,
+            disponivel_em__lte=agora,
+            reserva__enviar_lembrete=True,
+        ) & (
+            Q(tipo=LembreteOutbox.Tipo.ENTRADA, reserva__inicio_at__range=(agora, fim_entrada))
+            | Q(tipo=LembreteOutbox.Tipo.SAIDA, reserva__fim_at__range=(agora, fim_saida))
+        )
+
+    @staticmethod
+    def claim(
+        agora: datetime,
+        config: Configuracao,
+        limite: int,
+        janela: timedelta = timedelta(0),
+    ) -> List[LembreteOutbox]:
+        # rows locked by another worker are skipped instead of waited on;
+        # the lease is committed before any message goes out
+        pendentes = (
+            LembreteOutbox.objects.select_for_update(skip_locked=True, of=("self",))
+            .select_related("reserva__apartamento")
+            .order_by("disponivel_em")
+        )
+        with transaction.atomic():
+            itens = list(pendentes.filter(OutboxService.due(agora, config))[:limite])
+
+            # reminders of the same phone numbers due within `janela` go out
+            # now, in the same digest
+            telefones = {item.reserva.phone_number for item in itens} - {""}
+            if telefones and janela:
+                ids = {item.id for item in itens}
+                itens += [
+                    item
+                    for item in pendentes.filter(
+                        OutboxService.due(agora, config, janela),
+                        reserva__phone_number__in=telefones,
+                    )
+                    if item.id not in ids
+                ]
+
+            if itens:
+                LembreteOutbox.objects.filter(id__in=[item.id for item in itens]).update(
+                    tentativas=F("tentativas") + 1,
+                    disponivel_em=agora + OutboxService.PRAZO,
+                    updated_at=timezone.now(),
+                )
+
+        for item in itens:
+            item.tentativas += 1
+        return itens
+
+    @staticmethod
+    def backoff(tentativas: int) -> timedelta:
+        return min(OutboxService.BACKOFF * 2 ** (tentativas - 1), OutboxService.BACKOFF_MAXIMO)
+
+    @staticmethod
+    def record(enviados: List[LembreteOutbox], falhas: List[LembreteOutbox], agora: datetime):
+        # failed items carry their error in ultimo_erro
+        with transaction.atomic():
+            if enviados:
+                LembreteOutbox.objects.filter(id__in=[item.id for item in enviados]).update(
+                    estado=LembreteOutbox.Estado.ENVIADO, ultimo_erro="", updated_at=agora
+                )
+                LembreteService.mark_sent(
+                    [item.reserva_id for item in enviados if item.tipo == LembreteOutbox.Tipo.ENTRADA],
+                    lembrete_entrada_enviado=True,
+                )
+                LembreteService.mark_sent(
+                    [item.reserva_id for item in enviados if item.tipo == LembreteOutbox.Tipo.SAIDA],
+                    lembrete_saida_enviado=True,
+                )
+
+            for item in falhas:
+                if item.tentativas >= OutboxService.MAX_TENTATIVAS:
+                    item.estado = LembreteOutbox.Estado.FALHOU
+                else:
+                    item.disponivel_em = agora + OutboxService.backoff(item.tentativas)
+                item.updated_at = agora
+            LembreteOutbox.objects.bulk_update(
+                falhas, ["estado", "disponivel_em", "ultimo_erro", "updated_at"]
+            )
+
+    @staticmethod
+    def expire(agora: datetime) -> int:
+        return LembreteOutbox.objects.filter(
+            Q(tipo=LembreteOutbox.Tipo.ENTRADA, reserva__inicio_at__lt=agora)
+            | Q(tipo=LembreteOutbox.Tipo.SAIDA, reserva__fim_at__lt=agora),
+            estado=LembreteOutbox.Estado.PENDENTE,
+        ).update(estado=LembreteOutbox.Estado.EXPIRADO, updated_at=timezone.now())
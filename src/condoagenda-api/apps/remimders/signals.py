@@ -0,0 +1,16 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from apps.core.models import Reserva, reservas_criadas
+from apps.remimders.services import OutboxService
+
+
+@receiver(post_save, sender=Reserva)
+def reserva_created(sender, instance: Reserva, created: bool, **kwargs):
+    if created:
+        OutboxService.enqueue([instance])
+
+
+@receiver(reservas_criadas, sender=Reserva)
+def reservas_created(sender, reservas, **kwargs):
+    OutboxService.enqueue(reservas)
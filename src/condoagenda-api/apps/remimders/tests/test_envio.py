@@ -0,0 +1,154 @@
+import asyncio
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+import httpx
+from asgiref.sync import async_to_sync
+from django.core.management.base import OutputWrapper
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.core.models import Apartamento, Configuracao, Reserva
+from apps.core.services import ConfiguracaoService
+from apps.remimders.management.commands import remimders
+from apps.remimders.models import LembreteOutbox
+from apps.remimders.whatsapp.client import WhatsAppClient
+
+
+class EnvioLembretesTestCase(TestCase):
+    TOTAL = 300
+    FALHA = "5511900000007"
+
+    def setUp(self):
+        Configuracao.objects.create(
+            duracao_reserva_minutos=120,
+            tempo_lembrete_entrada_minutos=5,
+            tempo_lembrete_saida_minutos=10,
+        )
+        ConfiguracaoService.load()
+        apartamentos = Apartamento.objects.bulk_create(
+            [Apartamento(numero=101 + n, responsavel=f"Morador {n}") for n in range(10)]
+        )
+
+        inicio = timezone.localtime().replace(second=0, microsecond=0) + timedelta(minutes=3)
+        fim = inicio + timedelta(hours=2)
+        Reserva.objects.bulk_create(
+            [
+                Reserva(
+                    data=inicio.date(),
+                    hora=inicio.time(),
+                    hora_saida=fim.time(),
+                    apartamento=apartamentos[n % 10],
+                    andar=0,
+                    vaga=n,
+                    phone_number=f"55119{n:08d}",
+                )
+                for n in range(self.TOTAL)
+            ]
+        )
+
+        self.em_andamento = self.maximo = 0
+        self.numeros = []
+        client = WhatsAppClient(
+            base_url="http://evolution",
+            api_key="chave",
+            default_instance="condominio",
+            transport=httpx.MockTransport(self.evolution),
+        )
+        with mock.patch.object(remimders, "WhatsAppClient", return_value=client):
+            self.command = remimders.Command()
+        self.command.stdout = OutputWrapper(StringIO())
+        parser = self.command.create_parser("manage.py", "remimders")
+        self.command.configure(vars(parser.parse_args(["--concorrencia=25", "--lote=500"])))
+
+    async def evolution(self, request: httpx.Request) -> httpx.Response:
+        # fake Evolution API with some latency
+        self.em_andamento += 1
+        self.maximo = max(self.maximo, self.em_andamento)
+        await asyncio.sleep(0.01)
+        self.em_andamento -= 1
+
+        numero = json.loads(request.content)["number"]
+        self.numeros.append(numero)
+        return httpx.Response(500 if numero == self.FALHA else 201)
+
+    def test_sends_concurrently_and_marks_in_bulk(self):
+        # expire (3), one claim (due rows, same phones within the window and
+        # the lease), the outbox, reservation and retry updates, the empty
+        # claim ending the loop, and savepoints
+        with self.assertNumQueries(16):
+            async_to_sync(self.command.process_reminders)()
+
+        self.assertEqual(len(self.numeros), self.TOTAL)
+        self.assertEqual(self.maximo, 25)
+        self.assertEqual(
+            Reserva.objects.filter(lembrete_entrada_enviado=True).count(), self.TOTAL - 1
+        )
+        falha = LembreteOutbox.objects.get(
+            reserva__phone_number=self.FALHA, tipo=LembreteOutbox.Tipo.ENTRADA
+        )
+        self.assertFalse(falha.reserva.lembrete_entrada_enviado)
+        self.assertEqual(falha.estado, LembreteOutbox.Estado.PENDENTE)
+        self.assertEqual(falha.tentativas, 1)
+        self.assertGreater(falha.disponivel_em, timezone.now())
+        self.assertIn(f"{self.TOTAL - 1} lembrete(s) enviado(s)", self.command.stdout._out.getvalue())
+
+    def test_groups_reminders_per_phone(self):
+        Reserva.objects.all().delete()
+        self.numeros.clear()
+        apartamento = Apartamento.objects.get(numero=101)
+        agora = timezone.localtime().replace(second=0, microsecond=0)
+
+        def reserva(minutos: int, phone_number: str, vaga: int) -> Reserva:
+            inicio = agora + timedelta(minutes=minutos)
+            return Reserva(
+                data=inicio.date(),
+                hora=inicio.time(),
+                hora_saida=(inicio + timedelta(hours=2)).time(),
+                apartamento=apartamento,
+                andar=0,
+                vaga=vaga,
+                phone_number=phone_number,
+            )
+
+        Reserva.objects.bulk_create(
+            [
+                # saida in 5 minutes, next entrada in 3, another in 7
+                reserva(-115, "5511911111111", 0),
+                reserva(3, "5511911111111", 1),
+                reserva(7, "5511911111111", 2),
+                reserva(3, "5511922222222", 3),
+                # outside the 2 minute window
+                reserva(9, "5511922222222", 4),
+            ]
+        )
+
+        async_to_sync(self.command.process_reminders)()
+
+        self.assertCountEqual(self.numeros, ["5511911111111", "5511922222222"])
+        self.assertEqual(
+            LembreteOutbox.objects.filter(estado=LembreteOutbox.Estado.ENVIADO).count(), 4
+        )
+        saida = self.command.stdout._out.getvalue()
+        self.assertIn("4 lembrete(s) em 2 mensagem(ns)", saida)
+        self.assertEqual(self.command.coalescing_ratio(), 2.0)
+
+    def test_digest_joins_the_reminders(self):
+        entrada = LembreteOutbox(
+            tipo=LembreteOutbox.Tipo.ENTRADA, reserva=Reserva.objects.order_by("id")[1]
+        )
+        saida = LembreteOutbox(
+            tipo=LembreteOutbox.Tipo.SAIDA, reserva=Reserva.objects.order_by("id")[0]
+        )
+        _, _, regras = ConfiguracaoService.load()
+
+        mensagem = self.command.digest_message([saida, entrada], regras)
+        self.assertTrue(mensagem.startswith("🔔 Você tem 2 lembretes"))
+        self.assertIn(self.command.saida_message(saida.reserva, regras), mensagem)
+        self.assertIn(self.command.entrada_message(entrada.reserva, regras), mensagem)
+        self.assertEqual(
+            self.command.digest_message([entrada], regras),
+            self.command.entrada_message(entrada.reserva, regras),
+        )
@@ -0,0 +1,81 @@
+from datetime import date, datetime, time
+
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.core.batch import ReservaBatchService
+from apps.core.models import Apartamento, Configuracao, Reserva
+from apps.remimders.services import LembreteService
+
+
+class LembreteServiceTestCase(TestCase):
+    def setUp(self):
+        self.config = Configuracao.objects.create(
+            duracao_reserva_minutos=120,
+            tempo_lembrete_entrada_minutos=5,
+            tempo_lembrete_saida_minutos=10,
+        )
+        self.apartamento = Apartamento.objects.create(numero=101, responsavel="João")
+        self.agora = timezone.make_aware(datetime(2026, 3, 10, 8, 57))
+
+    def reserva(self, hora: time, hora_saida: time, **kwargs) -> Reserva:
+        return Reserva.objects.create(
+            data=self.agora.date(),
+            hora=hora,
+            hora_saida=hora_saida,
+            apartamento=self.apartamento,
+            andar=0,
+            **kwargs,
+        )
+
+    def test_periodo_follows_data_and_hora(self):
+        reserva = self.reserva(time(23, 0), time(1, 0))
+
+        self.assertEqual(
+            reserva.inicio_at, timezone.make_aware(datetime(2026, 3, 10, 23, 0))
+        )
+        self.assertEqual(reserva.fim_at, timezone.make_aware(datetime(2026, 3, 11, 1, 0)))
+
+        reserva.hora, reserva.hora_saida = time(9, 0), time(11, 0)
+        reserva.save(update_fields=["hora", "hora_saida"])
+        reserva.refresh_from_db()
+        self.assertEqual(reserva.inicio_at, timezone.make_aware(datetime(2026, 3, 10, 9, 0)))
+
+    def test_batch_writes_set_periodo(self):
+        hoje = date.today()
+        operacao = {"data": hoje, "hora": time(9, 0), "andar": 0}
+
+        resultados = ReservaBatchService.apply(
+            [(0, {"op": "criar", "numero_apartamento": 101, **operacao})]
+        )
+        reserva = Reserva.objects.get(id=resultados[0]["id"])
+        self.assertEqual(reserva.inicio_at, timezone.make_aware(datetime.combine(hoje, time(9, 0))))
+
+        ReservaBatchService.apply(
+            [(0, {"op": "mover", "id": reserva.id, **operacao, "hora": time(13, 0)})]
+        )
+        reserva.refresh_from_db()
+        self.assertEqual(reserva.fim_at, timezone.make_aware(datetime.combine(hoje, time(15, 0))))
+
+    def test_expires_missed_reminders_in_bulk(self):
+        perdida = self.reserva(time(7, 0), time(8, 0))
+        enviada = self.reserva(
+            time(8, 0),
+            time(8, 30),
+            lembrete_entrada_enviado=True,
+            lembrete_saida_enviado=True,
+        )
+        futura = self.reserva(time(9, 0), time(11, 0))
+
+        with self.assertNumQueries(2):
+            self.assertEqual(LembreteService.expire(self.agora), (1, 1))
+
+        perdida.refresh_from_db()
+        self.assertTrue(perdida.lembrete_entrada_expirado)
+        self.assertTrue(perdida.lembrete_saida_expirado)
+        enviada.refresh_from_db()
+        self.assertFalse(enviada.lembrete_entrada_expirado)
+        futura.refresh_from_db()
+        self.assertFalse(futura.lembrete_entrada_expirado)
+
+        self.assertEqual(LembreteService.expire(self.agora), (0, 0))
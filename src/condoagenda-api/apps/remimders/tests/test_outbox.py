@@ -0,0 +1,136 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.core.models import Apartamento, Configuracao, Reserva
+from apps.remimders.models import LembreteOutbox
+from apps.remimders.services import OutboxService
+
+
+class OutboxServiceTestCase(TestCase):
+    def setUp(self):
+        self.config = Configuracao.objects.create(
+            duracao_reserva_minutos=120,
+            tempo_lembrete_entrada_minutos=5,
+            tempo_lembrete_saida_minutos=10,
+        )
+        self.apartamento = Apartamento.objects.create(numero=101, responsavel="João")
+        # whole minutes, like every reservation
+        self.inicio = timezone.localtime().replace(second=0, microsecond=0)
+
+    def reserva(self, minutos: int, **kwargs) -> Reserva:
+        inicio = self.inicio + timedelta(minutes=minutos)
+        fim = inicio + timedelta(hours=2)
+        return Reserva(
+            data=inicio.date(),
+            hora=inicio.time(),
+            hora_saida=fim.time(),
+            apartamento=self.apartamento,
+            andar=0,
+            **kwargs,
+        )
+
+    def test_created_reservations_are_enqueued(self):
+        salva = self.reserva(60)
+        salva.save()
+        em_massa, _ = Reserva.objects.bulk_create(
+            [self.reserva(180), self.reserva(300, enviar_lembrete=False)]
+        )
+
+        self.assertCountEqual(
+            LembreteOutbox.objects.values_list("reserva_id", "tipo", "estado"),
+            [
+                (salva.id, "entrada", "pendente"),
+                (salva.id, "saida", "pendente"),
+                (em_massa.id, "entrada", "pendente"),
+                (em_massa.id, "saida", "pendente"),
+            ],
+        )
+
+        # saving again does not enqueue twice
+        salva.enviar_lembrete = False
+        salva.save()
+        self.assertEqual(LembreteOutbox.objects.filter(reserva=salva).count(), 2)
+
+    def test_claims_only_the_reminder_windows(self):
+        entrada, _, saida, _, _ = Reserva.objects.bulk_create(
+            [
+                self.reserva(3, vaga=0),
+                self.reserva(30, vaga=1),
+                # ends in 5 minutes
+                self.reserva(-115, vaga=2),
+                self.reserva(3, vaga=3, enviar_lembrete=False),
+                self.reserva(3, vaga=4, lembrete_entrada_enviado=True),
+            ]
+        )
+
+        itens = OutboxService.claim(timezone.now(), self.config, 10)
+
+        self.assertCountEqual(
+            [(item.reserva_id, item.tipo) for item in itens],
+            [(entrada.id, LembreteOutbox.Tipo.ENTRADA), (saida.id, LembreteOutbox.Tipo.SAIDA)],
+        )
+
+    def test_claims_never_overlap(self):
+        Reserva.objects.bulk_create([self.reserva(3, vaga=vaga) for vaga in range(5)])
+        agora = timezone.now()
+
+        primeiro = OutboxService.claim(agora, self.config, 3)
+        segundo = OutboxService.claim(agora, self.config, 3)
+
+        self.assertEqual(len(primeiro), 3)
+        self.assertEqual(len(segundo), 2)
+        self.assertFalse({item.id for item in primeiro} & {item.id for item in segundo})
+        self.assertEqual(OutboxService.claim(agora, self.config, 3), [])
+
+        # the lease runs out if a worker never reports back; by then the
+        # entrada window has moved, so the check looks at the rows directly
+        self.assertFalse(
+            LembreteOutbox.objects.filter(
+                tipo=LembreteOutbox.Tipo.ENTRADA, disponivel_em__lt=agora + OutboxService.PRAZO
+            ).exists()
+        )
+
+    def test_failures_back_off_then_dead_letter(self):
+        # starts far enough ahead for every retry to fall in its window
+        self.config.tempo_lembrete_entrada_minutos = 60
+        self.reserva(50).save()
+        agora = timezone.now()
+
+        for tentativa in range(1, OutboxService.MAX_TENTATIVAS + 1):
+            (item,) = OutboxService.claim(agora, self.config, 10)
+            self.assertEqual(item.tentativas, tentativa)
+            item.ultimo_erro = "Erro try sending message again!"
+            OutboxService.record([], [item], agora)
+            self.assertEqual(OutboxService.claim(agora, self.config, 10), [])
+            agora += OutboxService.backoff(tentativa)
+
+        item.refresh_from_db()
+        self.assertEqual(item.estado, LembreteOutbox.Estado.FALHOU)
+        self.assertEqual(item.ultimo_erro, "Erro try sending message again!")
+        self.assertEqual(OutboxService.claim(agora, self.config, 10), [])
+        self.assertEqual(OutboxService.backoff(10), OutboxService.BACKOFF_MAXIMO)
+
+    def test_record_marks_outbox_and_reservation(self):
+        # ends in 5 minutes
+        reserva = self.reserva(-115)
+        reserva.save()
+        agora = timezone.now()
+
+        (item,) = OutboxService.claim(agora, self.config, 10)
+        self.assertEqual(item.tipo, LembreteOutbox.Tipo.SAIDA)
+        OutboxService.record([item], [], agora)
+
+        item.refresh_from_db()
+        self.assertEqual(item.estado, LembreteOutbox.Estado.ENVIADO)
+        reserva.refresh_from_db()
+        self.assertTrue(reserva.lembrete_saida_enviado)
+        self.assertFalse(reserva.lembrete_entrada_enviado)
+
+        # the entrada was missed
+        self.assertEqual(OutboxService.expire(agora), 1)
+        self.assertEqual(
+            reserva.lembretes.get(tipo=LembreteOutbox.Tipo.ENTRADA).estado,
+            LembreteOutbox.Estado.EXPIRADO,
+        )
@@ -0,0 +1,98 @@
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.core.models import Apartamento, Configuracao, Reserva
+from apps.core.services import ConfiguracaoService
+from apps.remimders.models import LembreteOutbox
+from apps.remimders.scheduler import LembreteScheduler
+
+Tipo = LembreteOutbox.Tipo
+
+
+class LembreteSchedulerTestCase(TestCase):
+    def setUp(self):
+        self.config = Configuracao.objects.create(
+            duracao_reserva_minutos=120,
+            tempo_lembrete_entrada_minutos=5,
+            tempo_lembrete_saida_minutos=10,
+        )
+        self.apartamento = Apartamento.objects.create(numero=101, responsavel="João")
+        # whole minutes, like every reservation
+        self.agora = timezone.localtime().replace(second=0, microsecond=0)
+
+    def reserva(self, minutos: int, **kwargs) -> Reserva:
+        inicio = self.agora + timedelta(minutes=minutos)
+        fim = inicio + timedelta(hours=2)
+        return Reserva.objects.create(
+            data=inicio.date(),
+            hora=inicio.time(),
+            hora_saida=fim.time(),
+            apartamento=self.apartamento,
+            andar=0,
+            **kwargs,
+        )
+
+    async def test_loads_reminders_within_the_horizon(self):
+        proxima = await sync_to_async(self.reserva)(30)
+        await sync_to_async(self.reserva)(60 * 24 * 2)
+
+        scheduler = LembreteScheduler()
+        await scheduler.load(self.agora)
+
+        self.assertEqual(
+            scheduler.agendados,
+            {
+                (proxima.id, Tipo.ENTRADA): proxima.inicio_at - timedelta(minutes=5),
+                (proxima.id, Tipo.SAIDA): proxima.fim_at - timedelta(minutes=10),
+            },
+        )
+        self.assertEqual(scheduler.seconds_until_next(self.agora, 3600), 25 * 60)
+        self.assertEqual(scheduler.seconds_until_next(self.agora, 30), 30)
+
+    async def test_refresh_follows_changes(self):
+        cancelada = await sync_to_async(self.reserva)(30)
+        scheduler = LembreteScheduler()
+        await scheduler.load(self.agora)
+
+        nova = await sync_to_async(self.reserva)(20)
+        cancelada.enviar_lembrete = False
+        await sync_to_async(cancelada.save)()
+        await scheduler.refresh(self.agora)
+
+        self.assertEqual(
+            sorted(scheduler.agendados), [(nova.id, Tipo.ENTRADA), (nova.id, Tipo.SAIDA)]
+        )
+        self.assertEqual(
+            scheduler.next_deadline(), nova.inicio_at - timedelta(minutes=5)
+        )
+
+    async def test_pops_due_reminders_once(self):
+        reserva = await sync_to_async(self.reserva)(3)
+        scheduler = LembreteScheduler()
+        await scheduler.load(self.agora)
+
+        self.assertEqual(scheduler.pop_due(self.agora), [(reserva.id, Tipo.ENTRADA)])
+        self.assertEqual(scheduler.pop_due(self.agora), [])
+
+        scheduler.retry([(reserva.id, Tipo.ENTRADA)], self.agora + timedelta(seconds=30))
+        self.assertEqual(
+            scheduler.pop_due(self.agora + timedelta(minutes=1)), [(reserva.id, Tipo.ENTRADA)]
+        )
+
+    async def test_reloads_when_the_configuration_changes(self):
+        reserva = await sync_to_async(self.reserva)(30)
+        scheduler = LembreteScheduler()
+        await scheduler.load(self.agora)
+
+        self.config.tempo_lembrete_entrada_minutos = 15
+        await sync_to_async(self.config.save)()
+        await sync_to_async(ConfiguracaoService.invalidate)()
+        await scheduler.refresh(self.agora)
+
+        self.assertEqual(
+            scheduler.agendados[(reserva.id, Tipo.ENTRADA)],
+            reserva.inicio_at - timedelta(minutes=15),
+        )
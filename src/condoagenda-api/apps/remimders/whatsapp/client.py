@@ -1,4 +1,5 @@
 from enum import Enum
+from typing import Optional
 
 import httpx
 
@@ -27,8 +28,14 @@ class GetQRCodeResponse:
 
 
 class WhatsAppClient:
-    def __init__(self, base_url: str, api_key: str, default_instance: str):
-        self._client = httpx.AsyncClient(base_url=base_url)
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        default_instance: str,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self._client = httpx.AsyncClient(base_url=base_url, transport=transport)
         self._client.headers = {
             "apiKey": api_key,
             "Content-type": "application/json",
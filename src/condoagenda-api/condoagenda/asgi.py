@@ -5,6 +5,9 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+The availability event stream (/api/reservas/eventos/) is an async streaming
+view and is only served through this entry point.
 """
 
 import os
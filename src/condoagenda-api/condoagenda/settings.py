@@ -14,6 +14,8 @@ from pathlib import Path
 import environ
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 
 env = environ.Env(DEBUG=(bool, False))
 
@@ -46,6 +48,7 @@ INSTALLED_APPS = [
 INSTALLED_APPS.extend(APPS_NAME)
 
 MIDDLEWARE = [
+    "apps.core.instrumentation.MetricasMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -77,6 +80,18 @@ WSGI_APPLICATION = "condoagenda.wsgi.application"
 
 DATABASES = {"default": env.db()}
 
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://")}
+
+# the configuracao/apartment version stamps, the ETags and the cached
+# responses are shared through this cache. locmem lives in one process, so
+# with several workers an invalidation never reaches the others
+LOCMEM_CACHE = CACHES["default"]["BACKEND"].endswith(".LocMemCache")
+if LOCMEM_CACHE and env.int("WEB_CONCURRENCY", default=1) > 1:
+    raise ImproperlyConfigured(
+        "CACHE_URL must point to a shared cache (redis, memcached or dbcache) "
+        "when WEB_CONCURRENCY is above 1"
+    )
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
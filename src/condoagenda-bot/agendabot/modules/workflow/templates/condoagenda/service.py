@@ -1,6 +1,6 @@
 from dataclasses import Field
 import logging
-from datetime import date, time
+from datetime import date, datetime, time
 from typing import Optional
 
 import httpx
@@ -42,6 +42,14 @@ class CriarReservaResponse(BaseModel):
     is_success: bool
     message: str | None = None
 
+
+class ReservaTemporariaResponse(BaseModel):
+    token: str | None = None
+    expira_em: datetime | None = None
+    error: Optional[str] = None
+    # someone else took the slot (409), as opposed to any other error
+    ocupado: bool = False
+
 class MinhaReserva(BaseModel):
     data: date
     hora: time
@@ -52,6 +60,22 @@ class MinhasReservasResponse(BaseModel):
     error: Optional[str] = None
 
 
+def error_detail(response: httpx.Response) -> Optional[str]:
+    # DRF answers {"detail": "..."} or {"campo": ["..."]}
+    try:
+        body = response.json()
+    except ValueError:
+        return None
+
+    if isinstance(body, dict):
+        if "detail" in body:
+            return str(body["detail"])
+        body = next(iter(body.values()), None)
+    if isinstance(body, list):
+        body = body[0] if body else None
+    return str(body) if body else None
+
+
 def format_date_to_api(date: date) -> str:
     return date.strftime("%Y-%m-%d")
 
@@ -63,6 +87,49 @@ def format_time_to_api(time: time) -> str:
 class CondoAgendaApiService:
     BASE_URL = "http://localhost:8000/api"
     TIMEOUT_IN_SECONDS = 10
+    MAX_CACHED_RESPONSES = 500
+
+    # (url, params) -> (etag, json body) of the last 200 response, replayed
+    # when the API answers 304 Not Modified
+    _cached_responses: dict[tuple, tuple[str, dict]] = {}
+
+    # (apartamento, data, hora, andar) -> token of the hold taken when the
+    # summary was shown, consumed by criar_reserva
+    _holds: dict[tuple, str] = {}
+
+    @staticmethod
+    def _hold_key(reservation: Reservation) -> tuple:
+        return (
+            reservation.apartamento,
+            reservation.data,
+            reservation.hora,
+            reservation.andar,
+        )
+
+    @staticmethod
+    async def _get_json(
+        client: httpx.AsyncClient, url: str, params: dict
+    ) -> dict:
+        cache_key = (url, tuple(sorted(params.items())))
+        cached = CondoAgendaApiService._cached_responses.get(cache_key)
+        headers = {"If-None-Match": cached[0]} if cached else {}
+
+        response = await client.get(url, params=params, headers=headers)
+        if cached and response.status_code == httpx.codes.NOT_MODIFIED:
+            return cached[1]
+
+        response.raise_for_status()
+        data = response.json()
+
+        etag = response.headers.get("ETag")
+        if etag:
+            cached_responses = CondoAgendaApiService._cached_responses
+            cached_responses.pop(cache_key, None)
+            if len(cached_responses) >= CondoAgendaApiService.MAX_CACHED_RESPONSES:
+                cached_responses.pop(next(iter(cached_responses)))
+            cached_responses[cache_key] = (etag, data)
+
+        return data
 
     @staticmethod
     async def listar_horarios_disponiveis(
@@ -72,12 +139,11 @@ class CondoAgendaApiService:
             async with httpx.AsyncClient(
                 timeout=CondoAgendaApiService.TIMEOUT_IN_SECONDS
             ) as client:
-                response = await client.get(
+                data = await CondoAgendaApiService._get_json(
+                    client,
                     f"{CondoAgendaApiService.BASE_URL}/reservas/listar/",
                     params={"data": format_date_to_api(date), "andar": andar},
                 )
-                response.raise_for_status()
-                data = response.json()
                 logger.info(f"Horários disponíveis: {data}")
                 return ListarHorariosResponse(**data)
 
@@ -99,12 +165,11 @@ class CondoAgendaApiService:
             async with httpx.AsyncClient(
                 timeout=CondoAgendaApiService.TIMEOUT_IN_SECONDS
             ) as client:
-                response = await client.get(
+                data = await CondoAgendaApiService._get_json(
+                    client,
                     f"{CondoAgendaApiService.BASE_URL}/reservas/listar/datas/",
                     params={"andar": andar},
                 )
-                response.raise_for_status()
-                data = response.json()
                 datas = data["datas"]
                 logger.info(f"Datas disponíveis: {datas}")
                 return ListarDatasDisponiveisResponse(datas=[DataDisponivel(**data) for data in datas])
@@ -115,6 +180,55 @@ class CondoAgendaApiService:
             logger.error(f"Erro inesperado ao buscar datas disponíveis: {str(e)}")
             return ListarDatasDisponiveisResponse(datas=[], error="Erro inesperado ao buscar datas disponíveis")
 
+    @staticmethod
+    async def reservar_temporariamente(
+        reservation: Reservation,
+    ) -> ReservaTemporariaResponse:
+        # holds the slot while the user reads the summary, so the final
+        # confirmation doesn't lose it to someone else
+        try:
+            payload = {
+                "data": format_date_to_api(reservation.data),
+                "hora": format_time_to_api(reservation.hora),
+                "numero_apartamento": reservation.apartamento,
+                "andar": reservation.andar,
+            }
+
+            async with httpx.AsyncClient(
+                timeout=CondoAgendaApiService.TIMEOUT_IN_SECONDS
+            ) as client:
+                response = await client.post(
+                    f"{CondoAgendaApiService.BASE_URL}/reservas/holds/",
+                    json=payload,
+                )
+
+                response.raise_for_status()
+                hold = ReservaTemporariaResponse(**response.json())
+                CondoAgendaApiService._holds[
+                    CondoAgendaApiService._hold_key(reservation)
+                ] = hold.token
+                return hold
+
+        except httpx.HTTPStatusError as e:
+            logger.error(f"Erro ao reservar horário: {str(e)}")
+            if e.response.status_code == httpx.codes.CONFLICT:
+                return ReservaTemporariaResponse(
+                    error="Horário indisponível", ocupado=True
+                )
+            if e.response.is_client_error:
+                return ReservaTemporariaResponse(
+                    error=error_detail(e.response) or "Não foi possível reservar o horário"
+                )
+            return ReservaTemporariaResponse(
+                error="Não foi possível reservar o horário agora. Tente novamente em instantes."
+            )
+
+        except Exception as e:
+            logger.error(f"Erro inesperado ao reservar horário: {str(e)}")
+            return ReservaTemporariaResponse(
+                error="Não foi possível reservar o horário agora. Tente novamente em instantes."
+            )
+
     @staticmethod
     async def criar_reserva(reservation: Reservation) -> CriarReservaResponse:
         try:
@@ -124,6 +238,11 @@ class CondoAgendaApiService:
                 "numero_apartamento": reservation.apartamento,
                 "andar": reservation.andar,
             }
+            hold = CondoAgendaApiService._holds.pop(
+                CondoAgendaApiService._hold_key(reservation), None
+            )
+            if hold:
+                payload["hold"] = hold
 
             async with httpx.AsyncClient(
                 timeout=CondoAgendaApiService.TIMEOUT_IN_SECONDS
@@ -155,12 +274,11 @@ class CondoAgendaApiService:
             async with httpx.AsyncClient(
                 timeout=CondoAgendaApiService.TIMEOUT_IN_SECONDS
             ) as client:
-                response = await client.get(
+                data = await CondoAgendaApiService._get_json(
+                    client,
                     f"{CondoAgendaApiService.BASE_URL}/reservas/listar/minhas-reservas/",
                     params={"numero_apartamento": numero_apartamento},
                 )
-                response.raise_for_status()
-                data = response.json()
                 reservas = data["reservas"]
                 logger.info(f"Minhas reservas: {reservas}")
                 return MinhasReservasResponse(reservas=[MinhaReserva(**reserva) for reserva in reservas])
@@ -1,4 +1,4 @@
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
 from enum import StrEnum, unique
 
 from agendabot.modules.workflow.core import (
@@ -16,7 +16,7 @@ from agendabot.modules.workflow.interfaces.orchestrator_event_handler import (
 )
 from agendabot.modules.workflow.orchestrator import WorkflowOrchestrator
 
-from .service import CondoAgendaApiService
+from .service import CondoAgendaApiService, Reservation
 
 
 @unique
@@ -95,6 +95,27 @@ async def load_resumo_agendamento(
 
     resume_message = f"*Apartamento:* {apartamento}\n\n✅ {data}\n✅ {hora}\n\n*Confirme abaixo se está tudo certo.*"
 
+    if apartamento and data and hora:
+        day, month = data.split("/")
+        hour, minute = hora.split(":")
+        hold = await CondoAgendaApiService.reservar_temporariamente(
+            Reservation(
+                data=datetime(
+                    year=datetime.now().year, month=int(month), day=int(day)
+                ).date(),
+                hora=time(hour=int(hour), minute=int(minute)),
+                apartamento=int(apartamento),
+                andar=0,
+            )
+        )
+        if hold.ocupado:
+            resume_message = (
+                f"⚠️ O horário {hora} de {data} acabou de ser reservado.\n\n"
+                "*Escolha Reiniciar para ver os horários disponíveis.*"
+            )
+        elif hold.error:
+            resume_message = f"⚠️ {hold.error}\n\n*Escolha Reiniciar para tentar de novo.*"
+
     step = WorkflowStepFactory().create_send_message(
         id=CondoAgendaSteps.AGENDAMENTO_RESUMO,
         name="Resumo do Agendamento",